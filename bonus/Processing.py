@@ -1,7 +1,3 @@
-import os
-
-from termcolor import colored
-
 def read_stage_file(stage_file, testing = False): # Returns player location as well as array-fied stage file
     '''
     Reads a file and returns 1 of 2 objects:
@@ -38,57 +34,36 @@ def read_stage_file(stage_file, testing = False): # Returns player location as w
 
     return (player_x, player_y), stage
 
-def determine_if_high_score(new_score, stage_name):
-    score_file = "scoreboard/score-" + stage_name.split("/")[-1]
-    is_high_score = False
-
-    if os.path.exists(score_file):
-        with open(score_file, 'r') as f:
-            leaderboard = [(i.split()) for i in f.readlines()]
-
-            current_top_score = int(leaderboard[0][0])
-            if new_score <= current_top_score:
-                is_high_score = True 
-    else:
-        is_high_score = True
-
-    return is_high_score
-
-def update_scoreboard(new_score, player_name, stage_name):
-    score_file = "scoreboard/score-" + stage_name.split("/")[-1]
+def scoreboard_module():
+    '''Returns the Scoreboard module, which is only imported (along with sqlite3) once a scoreboard is used, so games start faster.'''
+    try:
+        from bonus import Scoreboard
+    except ImportError as m:
+        import Scoreboard
+    return Scoreboard
 
-    if os.path.exists(score_file):
-        with open(score_file, 'r') as f:
-            leaderboard = [(i.split()) for i in f.readlines()]
-            leaderboard.append((new_score, player_name))
-            leaderboard.sort(key=lambda x: int(x[0]))
-
-        with open(score_file, 'w') as f:
-            f.writelines([f'{i[0]} {" ".join(i[1:])}\n' for i in leaderboard])
-    else:
-        x = open(score_file, "x")
-        
-        with open(score_file, 'w') as f:
-            f.write(f'{new_score} {player_name}\n')
- 
-def print_scoreboard(stage_name):
-    score_file = "scoreboard/score-" + stage_name.split("/")[-1]
-
-    if os.path.exists(score_file):
-        with open(score_file, 'r') as f:
-            leaderboard = f.readlines()
-            leaderboard.sort(key=lambda x: int(x[0]))
-
-        rank = 1
-        print("\n" + f"{colored("Leaderboard".center(31), "yellow", attrs=["bold"])}" + "\nRank |       Name       | Score  ")
-        for i in leaderboard:
-            dummy = i.split()
-            score, name = dummy[0], " ".join(dummy[1:])
-
-            rank_string = f"[{rank}]".ljust(5)
-            name_string = f"{name[:13] + ("..." if len(name) > 14 else "")}".center(16)
-            print(f"{rank_string}| {name_string} | " + f"{score}".center(5))
-            rank += 1
-
-
-            
+def determine_if_high_score(new_score, stage_name):
+    '''Returns True if new_score (a number of moves) ties or beats the best score on the scoreboard of the stage.'''
+    with scoreboard_module().open_scoreboard() as scoreboard:
+        best = scoreboard.best(stage_name)
+    return best is None or new_score <= best
+
+def update_scoreboard(new_score, player_name, stage_name, inputs = None):
+    '''Adds a score to the scoreboard of the stage and returns its rank. inputs (the strings entered to set it) are stored with it.'''
+    Scoreboard = scoreboard_module()
+    digest = None if inputs is None else Scoreboard.stage_hash(stage_name)
+    with Scoreboard.open_scoreboard() as scoreboard:
+        return scoreboard.add(stage_name, new_score, player_name, inputs, digest)
+
+def print_scoreboard(stage_name, limit = 10, offset = 0):
+    '''Prints a page of the scoreboard of the stage: limit entries, starting after the first offset.'''
+    from termcolor import colored # only needed when the scoreboard is shown
+
+    with scoreboard_module().open_scoreboard() as scoreboard:
+        leaderboard = scoreboard.top(stage_name, limit, offset)
+
+    print("\n" + f"{colored("Leaderboard".center(31), "yellow", attrs=["bold"])}" + "\nRank |       Name       | Score  ")
+    for rank, score, name in leaderboard:
+        rank_string = f"[{rank}]".ljust(5)
+        name_string = f"{name[:13] + ("..." if len(name) > 14 else "")}".center(16)
+        print(f"{rank_string}| {name_string} | " + f"{score}".center(5))
@@ -0,0 +1,159 @@
+import glob, hashlib, os, sqlite3, zlib
+
+SCOREBOARD_DIRECTORY = "scoreboard"
+SCOREBOARD_FILE = os.path.join(SCOREBOARD_DIRECTORY, "scores.db")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY AUTOINCREMENT, stage TEXT NOT NULL, score INTEGER NOT NULL, name TEXT NOT NULL,
+    moves BLOB, stage_hash TEXT);
+CREATE INDEX IF NOT EXISTS scores_by_stage ON scores (stage, score);
+CREATE INDEX IF NOT EXISTS scores_by_name ON scores (stage, name, score);
+CREATE TABLE IF NOT EXISTS imported (score_file TEXT PRIMARY KEY);
+'''
+# columns added to the scores table after it was first released, with their types
+ADDED_COLUMNS = {"moves": "BLOB", "stage_hash": "TEXT"}
+
+def stage_hash(stage_file):
+    '''Returns the SHA-256 hex digest of the contents of stage_file, which identifies the exact stage a score was set on.'''
+    with open(stage_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def pack_moves(inputs):
+    '''Compresses the inputs of a game (the strings entered at every prompt, in order) for the moves column.'''
+    return zlib.compress("".join(a + "\n" for a in inputs).encode(), 9)
+
+def unpack_moves(moves):
+    '''Returns the list of inputs compressed by pack_moves.'''
+    return zlib.decompress(moves).decode().split("\n")[:-1]
+
+def stage_key(stage_name):
+    '''Returns the name a stage is filed under in the scoreboard: the name of its stage file, as in the old score-*.txt files.'''
+    return stage_name.replace("\\", "/").split("/")[-1]
+
+class Scoreboard:
+    '''
+    The scores of every stage, kept in a SQLite database.
+
+    Scores are numbers of moves, so the lowest score ranks first, and players with the same score rank in the order they finished.
+    Entries are indexed by (stage, score), so adding a score and reading a page of the best scores of a stage do not read the rest
+    of the scoreboard. The database is in WAL mode and every write is a transaction of its own, so many players can finish at the
+    same time (each connection waits up to timeout seconds for the others).
+
+    Attributes:
+        - path (str) - path of the database file
+        - db (sqlite3.Connection) - the open connection to it
+    '''
+    def __init__(self, path=SCOREBOARD_FILE, timeout=30):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(scores)")}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                try:
+                    self.db.execute(f"ALTER TABLE scores ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError:
+                    pass # another player added it first
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def add(self, stage_name, score, name, inputs=None, digest=None):
+        '''
+        Adds a score to the scoreboard of a stage and returns its rank there. If the inputs of the game are given, they are stored
+        (see pack_moves) with digest, the stage_hash of the stage file, so that the score can be checked later (see Verify.py).
+        '''
+        stage = stage_key(stage_name)
+        moves = None if inputs is None else pack_moves(inputs)
+        with self.transaction():
+            entry = self.db.execute("INSERT INTO scores (stage, score, name, moves, stage_hash) VALUES (?, ?, ?, ?, ?)",
+                (stage, int(score), name, moves, digest)).lastrowid
+            return self.entry_rank(stage, int(score), entry)
+
+    def best(self, stage_name):
+        '''Returns the best (lowest) score of a stage, or None if nobody has finished it.'''
+        row = self.db.execute("SELECT MIN(score) FROM scores WHERE stage = ?", (stage_key(stage_name),)).fetchone()
+        return row[0]
+
+    def top(self, stage_name, limit=10, offset=0):
+        '''Returns a page of the scoreboard of a stage as a list of (rank, score, name), starting after the first offset entries.'''
+        rows = self.db.execute("SELECT score, name FROM scores WHERE stage = ? ORDER BY score, id LIMIT ? OFFSET ?",
+            (stage_key(stage_name), limit, offset))
+        return [(offset + n + 1, score, name) for n, (score, name) in enumerate(rows)]
+
+    def rank(self, stage_name, name):
+        '''Returns the rank of the best score of the player called name on a stage, or None if they are not on its scoreboard.'''
+        stage = stage_key(stage_name)
+        with self.transaction(write=False):
+            row = self.db.execute("SELECT score, MIN(id) FROM scores WHERE stage = ? AND name = ? AND score = "
+                "(SELECT MIN(score) FROM scores WHERE stage = ? AND name = ?)", (stage, name, stage, name)).fetchone()
+            return None if row[0] is None else self.entry_rank(stage, *row)
+
+    def entry_rank(self, stage, score, entry):
+        '''Returns the rank of the entry with the given id and score on the scoreboard of stage.'''
+        better = self.db.execute("SELECT COUNT(*) FROM scores WHERE stage = ? AND (score < ? OR (score = ? AND id < ?))",
+            (stage, score, score, entry)).fetchone()[0]
+        return better + 1
+
+    def entries(self):
+        '''Yields every entry of the scoreboard as a tuple (id, stage, score, name, moves, stage_hash), grouped by stage hash.'''
+        yield from self.db.execute("SELECT id, stage, score, name, moves, stage_hash FROM scores ORDER BY stage_hash, id")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def transaction(self, write=True):
+        '''
+        Returns a context manager for a transaction, so the statements in it all see the same scoreboard. A write transaction holds
+        the write lock from the start, so other players finishing at the same time wait for it instead of failing halfway.
+        '''
+        return Transaction(self.db, "IMMEDIATE" if write else "DEFERRED")
+
+    def import_text_files(self, directory=SCOREBOARD_DIRECTORY):
+        '''
+        Adds the scores of the old score-<stage file> text files in directory (one "score name" per line) to the scoreboard.
+
+        Every file is only imported once, even if this is called again or by many players at the same time. Returns the number of
+        scores added.
+        '''
+        added = 0
+        for score_file in sorted(glob.glob(os.path.join(directory, "score-*.txt"))):
+            stage = os.path.basename(score_file)[len("score-"):]
+            with self.transaction():
+                if self.db.execute("INSERT OR IGNORE INTO imported VALUES (?)", (os.path.basename(score_file),)).rowcount == 0:
+                    continue
+                with open(score_file) as f:
+                    entries = [line.split(maxsplit=1) for line in f if line.strip()]
+                entries = [(stage, int(entry[0]), entry[1].strip() if len(entry) > 1 else "") for entry in entries]
+                entries.sort(key=lambda entry: entry[1]) # the files were not always sorted
+                self.db.executemany("INSERT INTO scores (stage, score, name) VALUES (?, ?, ?)", entries)
+                added += len(entries)
+        return added
+
+class Transaction:
+    '''Runs the statements of a with block as one transaction of db (BEGIN mode), rolled back if the block raises.'''
+    def __init__(self, db, mode):
+        self.db = db
+        self.mode = mode
+
+    def __enter__(self):
+        self.db.execute(f"BEGIN {self.mode}")
+
+    def __exit__(self, exc_type, *exc_info):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+def open_scoreboard(path=SCOREBOARD_FILE):
+    '''Opens the scoreboard at path, importing the old text files next to it the first time.'''
+    scoreboard = Scoreboard(path)
+    scoreboard.import_text_files(os.path.dirname(path) or ".")
+    return scoreboard
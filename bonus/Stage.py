@@ -1,5 +1,5 @@
 import sys
-from copy import deepcopy
+from copy import copy
 try:
     from bonus.Status import Status
 except ModuleNotFoundError as m:
@@ -36,10 +36,10 @@ class Stage:
     
     def initialize_state(self, grid, pl):
         '''Initializes the game state.'''
-        self.grid = deepcopy(grid)
+        self.grid = [row[:] for row in grid] # the tiles are str, so copying the rows is enough
         self.rows = len(self.grid)
         self.cols = len(self.grid[0])
-        self.pl = deepcopy(pl)
+        self.pl = copy(pl)
         self.grid[self.pl.y][self.pl.x] = "L"
         self.outcome = Status.ONGOING
         self.mushrooms = 0
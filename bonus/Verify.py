@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
+try:
+    from bonus.Stage import Stage
+    from bonus.Player import Player
+    from bonus.Status import Status
+    from bonus.Processing import read_stage_file
+    from bonus.Scoreboard import Scoreboard, stage_hash, unpack_moves
+except ModuleNotFoundError as m:
+    from Stage import Stage
+    from Player import Player
+    from Status import Status
+    from Processing import read_stage_file
+    from Scoreboard import Scoreboard, stage_hash, unpack_moves
+
+# the Stages loaded by a worker process of verify_scoreboard, keyed by stage file
+worker_stages = {}
+
+def replay_problem(stage, inputs, score):
+    '''
+    Plays the inputs of a game on stage as the game loop of shroom_raider.py does (one call to Stage.move per input) and returns why
+    they do not set the given score, or "" if they do: the stage must be cleared by the last input and not before, in score inputs.
+    '''
+    if len(inputs) != score:
+        return f"{len(inputs)} inputs stored for a score of {score}"
+    stage.initialize_state(stage.original_grid, stage.original_pl)
+    for n, a in enumerate(inputs):
+        if stage.outcome != Status.ONGOING:
+            return f"the game ended after input {n}"
+        if a.upper() == "E":
+            return f"the game was quit at input {n + 1}"
+        stage.move(a, stage.pl.y, stage.pl.x)
+    return "" if stage.outcome == Status.WIN else "the inputs do not clear the stage"
+
+def verify_chunk(task):
+    '''
+    Replays a chunk of scoreboard entries of one stage file in a worker process of verify_scoreboard.
+
+    task is a pair (stage file, list of (id, score, moves)). Returns a list of (id, problem) as in replay_problem. Entries with the
+    same moves and score are only replayed once.
+    '''
+    stage_file, entries = task
+    stage = worker_stages.get(stage_file)
+    if stage is None:
+        player, grid = read_stage_file(stage_file)
+        stage = worker_stages[stage_file] = Stage(grid, Player(*player))
+    problems, results = [], {}
+    for entry, score, moves in entries:
+        problem = results.get((score, moves))
+        if problem is None:
+            problem = results[score, moves] = replay_problem(stage, unpack_moves(moves), score)
+        problems.append((entry, problem))
+    return problems
+
+def verify_scoreboard(scoreboard_file, stage_files, workers=None, chunk_size=512):
+    '''
+    Replays every entry of the scoreboard in scoreboard_file on the stage file with the stage hash stored with it, using a pool of
+    worker processes, and yields (id, stage, score, name, problem) for every entry. problem is "" if the replay sets the stored
+    score, None if the entry has no moves (it was set before they were stored), and says what went wrong otherwise (including when
+    none of stage_files has the stage hash of the entry).
+
+    The entries are handed out in chunks of chunk_size entries of the same stage file, so every worker parses a stage file once and
+    then replays many entries on it.
+    '''
+    files = {}
+    for stage_file in stage_files:
+        files.setdefault(stage_hash(stage_file), stage_file)
+
+    with Scoreboard(scoreboard_file) as scoreboard:
+        entries = list(scoreboard.entries())
+    details = {entry[0]: entry[1:4] for entry in entries}
+    tasks = []
+    for digest, group in groupby(entries, key=lambda entry: entry[5]):
+        if digest is None or digest not in files:
+            problem = None if digest is None else "no stage file has the stage hash of this score"
+            for entry in group:
+                yield *entry[:4], problem
+            continue
+        replayable = ((entry[0], entry[2], entry[4]) for entry in group)
+        while chunk := list(islice(replayable, chunk_size)):
+            tasks.append((files[digest], chunk))
+
+    with ProcessPoolExecutor(workers) as pool:
+        for problems in pool.map(verify_chunk, tasks):
+            for entry, problem in problems:
+                yield entry, *details[entry], problem
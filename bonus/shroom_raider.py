@@ -1,5 +1,4 @@
-from termcolor import colored
-import argparse, sys
+import argparse, glob, os, sys, time
 
 from Player import Player
 from Stage import Stage
@@ -16,6 +15,7 @@ def main_menu(stage_file, moves, output_file):
     skipped = False
     first = True
     amount_moves = 0
+    inputs = [] # every string entered, kept with a high score so that it can be verified
     
     if moves:
         for move in moves:
@@ -25,7 +25,8 @@ def main_menu(stage_file, moves, output_file):
             level.move(a, level.pl.y, level.pl.x)
             first = False
     else:
-        
+        # the UI is only imported when the game is played interactively, so that -m runs start faster
+        from termcolor import colored
 
         while not skipped and level.outcome == Status.ONGOING:
             level.clear_modify(level.grid, first)
@@ -48,6 +49,7 @@ Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold
 {colored("Enter moves:", "green", attrs=["bold"])} """)
             
             amount_moves += 1
+            inputs.append(a)
             skipped = True if a.upper() == "E" else False
             
             level.move(a, level.pl.y, level.pl.x)
@@ -65,7 +67,7 @@ Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold
                     if x:
                         print(f"\nYou achieved a new {colored("highscore!", "yellow", attrs=["bold", "underline"])} with {amount_moves} {"moves" if amount_moves > 1 else "move"}\n")
                         name = input("Input your name to be on the leaderboard: ")
-                        update_scoreboard(amount_moves, name if name else "Guest", stage_file)
+                        update_scoreboard(amount_moves, name if name else "Guest", stage_file, inputs)
                         print_scoreboard(stage_file)
 
 
@@ -77,7 +79,23 @@ Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold
                 file.write("NOT CLEAR \n")
 
             file.write("\n".join(("".join(i) for i in level.grid)))
-            
+
+def verify_scores(scoreboard_file, stage_dir, workers):
+    from Verify import verify_scoreboard
+    from Scoreboard import SCOREBOARD_FILE
+    scoreboard_file = scoreboard_file or SCOREBOARD_FILE
+    started = time.perf_counter()
+    count = failed = unchecked = 0
+    for entry, stage, score, name, problem in verify_scoreboard(scoreboard_file, glob.glob(os.path.join(stage_dir, "*.txt")), workers):
+        count += 1
+        if problem is None:
+            unchecked += 1 # set before moves were stored with scores
+        elif problem:
+            failed += 1
+            print(f"[{entry}] {stage}: {score} by {name} - {problem}")
+    sys.stderr.write(f"[verify] {count - failed - unchecked} of {count} scores verified, {failed} failed and {unchecked} have no moves, in {time.perf_counter() - started:.2f}s\n")
+    return failed == 0
+
 def main():
     parser = argparse.ArgumentParser()
 
@@ -85,9 +103,18 @@ def main():
     parser.add_argument("-m", "--move", help="String of player moves")
     parser.add_argument("-f", "--stage", help="Use a stage file")
 
+    commands = parser.add_subparsers(dest="command")
+    verify = commands.add_parser("verify", help="Replays every score on the scoreboard and lists the ones the stored moves do not set")
+    verify.add_argument("stage_dir", nargs="?", default="stage-files", help="Directory of the stage files (*.txt) the scores were set on")
+    verify.add_argument("--scoreboard", help="Scoreboard database (scoreboard/scores.db if not given)")
+    verify.add_argument("--workers", type=int, help="Number of processes (one per CPU if not given)")
+
     args = parser.parse_args()
 
-    main_menu(args.stage, args.move, args.output)
+    if args.command == "verify":
+        sys.exit(0 if verify_scores(args.scoreboard, args.stage_dir, args.workers) else 1)
+    else:
+        main_menu(args.stage, args.move, args.output)
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
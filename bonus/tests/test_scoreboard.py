@@ -0,0 +1,50 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from bonus.Scoreboard import Scoreboard, open_scoreboard
+
+# To add a test case, add a new (score, name) pair here, in the order the players finish
+finishes = [(5, "Kim"), (3, "Lapu-lapu"), (5, "Aeri"), (1, "Ning"), (3, "Kim"), (9, "Guest")]
+
+@pytest.fixture
+def scoreboard(tmp_path):
+    with Scoreboard(str(tmp_path / "scores.db")) as scoreboard:
+        for score, name in finishes:
+            scoreboard.add("stage-files/stage1.txt", score, name)
+        yield scoreboard
+
+def ranked():
+    order = sorted(range(len(finishes)), key=lambda n: (finishes[n][0], n))
+    return [(rank + 1, *finishes[n]) for rank, n in enumerate(order)]
+
+def test_top_pages(scoreboard):
+    assert scoreboard.top("stage1.txt", limit=len(finishes)) == ranked()
+    assert scoreboard.top("stage1.txt", limit=2, offset=2) == ranked()[2:4]
+    assert scoreboard.top("stage2.txt") == []
+    assert scoreboard.best("stage1.txt") == 1 and scoreboard.best("stage2.txt") is None
+
+def test_rank(scoreboard):
+    assert scoreboard.rank("stage1.txt", "Kim") == 3
+    assert scoreboard.rank("stage1.txt", "Guest") == len(finishes)
+    assert scoreboard.rank("stage1.txt", "Nobody") is None
+    assert scoreboard.add("stage1.txt", 3, "Late") == 4
+
+def test_concurrent_finishes(tmp_path):
+    path = str(tmp_path / "scores.db")
+    Scoreboard(path).close()
+    def finish(n):
+        with Scoreboard(path) as scoreboard:
+            return scoreboard.add("stage1.txt", n % 7, f"player {n}")
+    with ThreadPoolExecutor(8) as pool:
+        ranks = list(pool.map(finish, range(200)))
+    with Scoreboard(path) as scoreboard:
+        assert len(scoreboard) == 200
+        top = scoreboard.top("stage1.txt", limit=200)
+    assert [score for _, score, _ in top] == sorted(n % 7 for n in range(200))
+    assert all(1 <= rank <= 200 for rank in ranks)
+
+def test_text_files_are_imported_once(tmp_path):
+    (tmp_path / "score-stage1.txt").write_text("3 Lapu-lapu\n1 Kim Minjeong\n9 Uchinaga Aeri\n")
+    with open_scoreboard(str(tmp_path / "scores.db")) as scoreboard:
+        assert scoreboard.top("stage1.txt") == [(1, 1, "Kim Minjeong"), (2, 3, "Lapu-lapu"), (3, 9, "Uchinaga Aeri")]
+    with open_scoreboard(str(tmp_path / "scores.db")) as scoreboard:
+        assert len(scoreboard) == 3
@@ -0,0 +1,16 @@
+import os, subprocess, sys
+
+BONUS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# modules that only the scoreboard, the terminal UI or the verify command need; a -m or -o run must not import them
+UI_MODULES = ("termcolor", "Scoreboard", "sqlite3", "_sqlite3", "Verify", "concurrent.futures")
+
+def imported_modules(module):
+    '''Imports module in a new interpreter with -X importtime and returns the names of every module it imported.'''
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BONUS_DIR, capture_output=True,
+        text=True, check=True)
+    return [line.split("|")[2].strip() for line in result.stderr.splitlines() if line.startswith("import time:")]
+
+def test_headless_start():
+    names = imported_modules("shroom_raider")
+    assert "shroom_raider" in names
+    assert not [name for name in names if name.split(".")[0] in UI_MODULES or name in UI_MODULES]
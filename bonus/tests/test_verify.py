@@ -0,0 +1,31 @@
+import pytest
+from bonus.Scoreboard import Scoreboard, stage_hash, pack_moves, unpack_moves
+from bonus.Verify import verify_scoreboard
+
+# To add a test case, add a new (inputs, score, expected problem) here; the stage is the one written by the scores fixture
+test_cases = [(["D", "D"], 2, ""), (["dd"], 1, ""), (["DD"], 2, "1 inputs stored for a score of 2"),
+    (["DD", "A"], 2, "the game ended after input 1"), (["D"], 1, "the inputs do not clear the stage"),
+    (["D", "e", "D"], 3, "the game was quit at input 2"), (["", "Dx", "D"], 3, "")]
+
+@pytest.fixture
+def scores(tmp_path):
+    (tmp_path / "stage.txt").write_text("1 3\nL.+")
+    (tmp_path / "old.txt").write_text("1 3\nL+.")
+    with Scoreboard(str(tmp_path / "scores.db")) as scoreboard:
+        for n, (inputs, score, problem) in enumerate(test_cases):
+            scoreboard.add("stage.txt", score, f"player {n}", inputs, stage_hash(tmp_path / "stage.txt"))
+        scoreboard.add("stage.txt", 1, "edited", ["D"], stage_hash(tmp_path / "old.txt"))
+        scoreboard.add("stage.txt", 1, "imported")
+    (tmp_path / "old.txt").write_text("1 3\n+L.")
+    return tmp_path
+
+@pytest.mark.parametrize("inputs", [[], [""], ["W", "", "asd!"]])
+def test_moves_round_trip(inputs):
+    assert unpack_moves(pack_moves(inputs)) == inputs
+
+def test_every_entry_is_checked(scores):
+    results = {name: problem for entry, stage, score, name, problem in
+        verify_scoreboard(str(scores / "scores.db"), [scores / "stage.txt", scores / "old.txt"], workers=2, chunk_size=2)}
+    assert results.pop("edited") == "no stage file has the stage hash of this score"
+    assert results.pop("imported") is None
+    assert results == {f"player {n}": problem for n, (inputs, score, problem) in enumerate(test_cases)}
@@ -0,0 +1,208 @@
+try:
+    from main.Stage import TREE, MUSHROOM, ROCK, WATER, AXE, FLAMETHROWER, ChangeTracker, find_all, neighbours
+    from main.Status import Status
+except ModuleNotFoundError as m:
+    from Stage import TREE, MUSHROOM, ROCK, WATER, AXE, FLAMETHROWER, ChangeTracker, find_all, neighbours
+    from Status import Status
+
+# tiles of the items that can cut trees
+ITEM_TILES = (AXE, FLAMETHROWER)
+# whether the Player might cross each tile code, by whether trees can be cut and whether water can be crossed (dead rocks aside)
+CROSSABLE = {(trees_cut, water_crossable): bytes(not (tile == TREE and not trees_cut or tile == WATER and not water_crossable)
+    for tile in range(256)) for trees_cut in (False, True) for water_crossable in (False, True)}
+
+class Analyzer:
+    '''
+    Works out whether every mushroom left in a Stage can still be collected, so that a game that can no longer be won can be reported
+    as Status.UNWINNABLE before it is played out.
+
+    The analysis over-approximates what the Player can do, so a game is only reported unwinnable if it really is (without undoing or
+    resetting it):
+        - a rock is dead if it can never move again: both along a row and along a column, one of its neighbours is the edge of the
+          stage, another dead rock, or a tree that can never be cut. Dead rocks are found with a worklist that starts from the rocks
+          next to an edge or to such a tree, and only goes back to the rocks next to each rock found dead, which catches the simple
+          deadlocks;
+        - trees can be crossed if the Player holds an item or can reach one without crossing a tree (every tree then counts as
+          crossable); otherwise they can never be cut;
+        - water can be crossed if any rock can still move (it might be pushed in to pave it);
+        - every other rock, tile and mushroom can be crossed.
+    A flood fill from the Player over the cells that can be crossed gives the reachable cells, and any mushroom outside them can never
+    be collected.
+
+    update reads the cells written since it last ran from the journal of the stage (with a ChangeTracker) and only redoes the parts of
+    the analysis they can change:
+        - a rock pushed into a new cell is checked with the worklist, and the reachable cells are only flooded again if it made a rock
+          dead, or if a cell became crossable or stopped being so (e.g. water, once no rock can move);
+        - when trees count as crossable only because an item can be reached, that is checked again with a flood that stops at the
+          first item reached, but only if an item was taken, a rock died or water appeared;
+        - collecting mushrooms and walking around only updates unreachable.
+    The analysis is run again from scratch if the journal cannot tell what changed (after a restore, or a reset of a stage whose
+    history was forgotten), if a dead rock moved or a tree was written (an undo or a cut), or if whether the Player holds or stands
+    on an item changed in a way that can make trees walls again.
+
+    Attributes:
+        - stage (Stage) - the stage being analyzed
+        - tracker (ChangeTracker) - follows the cells written in the stage since the last update
+        - cells (bytearray or None) - the cells of the stage as of the last update
+        - items (set of int) - the cells of the items in cells
+        - holding (bool) - whether the Player held or stood on an item then
+        - rock_count (int) - the number of rocks then
+        - reachable (bytearray) - 1 for every cell the Player might still reach, 0 for the others
+        - dead_rocks (set of int) - the cells of the rocks that can never move again
+        - walled_rocks (set of int or None) - the cells of the rocks that could never move again if trees were walls (dead_rocks itself
+          if trees_cut is False); None while holding, as it is only needed to check trees_cut
+        - trees_cut (bool) - whether trees were counted as crossable
+        - water_crossable (bool) - whether water was counted as crossable
+        - unreachable (set of int) - the cells of the mushrooms left that can never be collected
+    '''
+    def __init__(self, stage):
+        self.stage = stage
+        self.tracker = ChangeTracker(stage)
+        self.cells = None
+        self.analyze()
+
+    @property
+    def unwinnable(self):
+        '''Whether the game is still going on but can no longer be won.'''
+        return self.stage.outcome == Status.ONGOING and bool(self.unreachable)
+
+    def status(self):
+        '''Returns the outcome of the stage, or Status.UNWINNABLE if it is still going on but can no longer be won.'''
+        return Status.UNWINNABLE if self.unwinnable else self.stage.outcome
+
+    def has_item(self):
+        '''Whether the Player holds an item or stands on one (an item under the Player is hidden by the L tile).'''
+        stage = self.stage
+        return bool(stage.pl.inv) or stage.curr_tile in ("x", "*") or stage.last_tile in ("x", "*")
+
+    def update(self):
+        '''Brings the analysis up to date with the stage after any number of moves (or undos, resets and restores). Returns status().'''
+        stage = self.stage
+        written = self.tracker.written_cells()
+        holding = self.has_item()
+        if written is None or len(self.cells) != len(stage.cells) or (holding != self.holding and not (holding and self.trees_cut)):
+            self.analyze()
+            return self.status()
+        if holding != self.holding:
+            self.holding, self.walled_rocks = True, None
+        cells, items, dead, walled = self.cells, self.items, self.dead_rocks, self.walled_rocks
+        crossable = CROSSABLE[self.trees_cut, self.water_crossable]
+        added, mushrooms = [], []
+        reflood = recheck = item_added = False
+        for i in written:
+            old, new = cells[i], stage.cells[i]
+            if old == new:
+                continue
+            if (TREE in (old, new) and not holding) or (old == ROCK and (i in dead or (walled is not None and i in walled))):
+                self.analyze()
+                return self.status()
+            cells[i] = new
+            if new == ROCK:
+                added.append(i)
+            if old in ITEM_TILES:
+                items.discard(i)
+                recheck = True
+            if new in ITEM_TILES:
+                items.add(i)
+                item_added = True
+            if new == WATER:
+                recheck = True
+            if crossable[old] != crossable[new]:
+                reflood = True
+            if MUSHROOM in (old, new):
+                mushrooms.append(i)
+
+        rocks = len(stage.rocks)
+        if added and self.find_dead_rocks(list(added), dead, self.trees_cut):
+            reflood = True
+        if walled is not None and walled is not dead:
+            water_crossable = len(walled) < self.rock_count
+            if added and self.find_dead_rocks(list(added), walled, False):
+                recheck = True
+            if water_crossable and len(walled) >= rocks:
+                recheck = True # if trees were walls, no rock could move any more, so water would be a wall too
+        self.rock_count = rocks
+        if (recheck and self.trees_cut and not holding
+                and not any(self.flood(walled, False, items)[i] for i in items)):
+            self.analyze() # the items that made trees crossable may be out of reach now
+            return self.status()
+        if reflood or (len(dead) < rocks) != self.water_crossable or not self.reachable[stage.pl.y * stage.cols + stage.pl.x]:
+            self.water_crossable = len(dead) < rocks
+            self.reachable = self.flood(dead, self.trees_cut)
+            self.unreachable = {i for i in find_all(cells, MUSHROOM) if not self.reachable[i]}
+            if not self.trees_cut and any(self.reachable[i] for i in items):
+                self.analyze()
+        else:
+            for i in mushrooms:
+                if cells[i] == MUSHROOM and not self.reachable[i]:
+                    self.unreachable.add(i) # brought back by an undo
+                else:
+                    self.unreachable.discard(i) # collected, so it was reachable after all
+            if item_added and not self.trees_cut and any(self.reachable[i] for i in items):
+                self.analyze()
+        return self.status()
+
+    def analyze(self):
+        '''Analyzes the stage from scratch.'''
+        stage = self.stage
+        self.tracker.mark()
+        cells = self.cells = bytearray(stage.cells)
+        self.items = set(find_all(cells, AXE) + find_all(cells, FLAMETHROWER))
+        self.holding = self.trees_cut = self.has_item()
+        self.rock_count = len(stage.rocks)
+        self.dead_rocks = set()
+        self.find_dead_rocks(self.rocks_at_walls(), self.dead_rocks, self.trees_cut)
+        self.walled_rocks = None if self.holding else self.dead_rocks
+        self.reachable = self.flood(self.dead_rocks, self.trees_cut)
+        if not self.trees_cut and any(self.reachable[i] for i in self.items):
+            self.trees_cut = True
+            self.dead_rocks = set()
+            self.find_dead_rocks(self.rocks_at_walls(), self.dead_rocks, True)
+            self.reachable = self.flood(self.dead_rocks, True)
+        self.water_crossable = len(self.dead_rocks) < self.rock_count
+        self.unreachable = {i for i in find_all(cells, MUSHROOM) if not self.reachable[i]}
+
+    def flood(self, dead, trees_cut, until=()):
+        '''
+        Returns a bytearray holding 1 for every cell the Player might reach if the rocks in dead can never move again, counting trees as
+        crossable if trees_cut is True, and 0 for the others. Stops as soon as a cell in until is reached.
+        '''
+        cells, cols = self.cells, self.stage.cols
+        crossable = CROSSABLE[trees_cut, len(dead) < len(self.stage.rocks)]
+        reachable = bytearray(len(cells))
+        start = self.stage.pl.y * cols + self.stage.pl.x
+        reachable[start] = 1
+        stack = [start]
+        while stack:
+            for j in neighbours(stack.pop(), cols):
+                if 0 <= j < len(cells) and not reachable[j] and crossable[cells[j]] and j not in dead:
+                    reachable[j] = 1
+                    if j in until:
+                        return reachable
+                    stack.append(j)
+        return reachable
+
+    def rocks_at_walls(self):
+        '''Returns the rocks next to the edge of the stage or to a tree, the only ones that can be dead while no other rock is.'''
+        cells, cols = self.cells, self.stage.cols
+        return [i for i in self.stage.rocks if any(j < 0 or j >= len(cells) or cells[j] == TREE for j in neighbours(i, cols))]
+
+    def find_dead_rocks(self, queue, dead, trees_cut):
+        '''
+        Adds to dead the rocks in queue that can never move again (see the class docstring), counting trees as walls unless trees_cut
+        is True. Every rock added is a new wall for the rocks next to it, which are queued again. Returns whether any rock was added.
+        '''
+        cells, cols = self.cells, self.stage.cols
+        def wall(j):
+            return j < 0 or j >= len(cells) or j in dead or (cells[j] == TREE and not trees_cut)
+        found = False
+        while queue:
+            i = queue.pop()
+            if i in dead or cells[i] != ROCK:
+                continue
+            up, down, left, right = around = neighbours(i, cols)
+            if (wall(up) or wall(down)) and (wall(left) or wall(right)):
+                dead.add(i)
+                found = True
+                queue.extend(j for j in around if 0 <= j < len(cells) and cells[j] == ROCK and j not in dead)
+        return found
@@ -0,0 +1,200 @@
+try:
+    import numpy as np
+except ModuleNotFoundError as m:
+    np = None # the batch simulator is optional; the game itself does not need NumPy
+try:
+    from main.Stage import Stage, EMPTY, PLAYER, TREE, MUSHROOM, ROCK, WATER, PAVED, AXE, FLAMETHROWER, neighbours
+    from main.Status import Status
+except ModuleNotFoundError as m:
+    from Stage import Stage, EMPTY, PLAYER, TREE, MUSHROOM, ROCK, WATER, PAVED, AXE, FLAMETHROWER, neighbours
+    from Status import Status
+
+# row and column offsets of the moves, as in Stage.can_move_here
+DIRECTIONS = {ord("W"): (-1, 0), ord("A"): (0, -1), ord("S"): (1, 0), ord("D"): (0, 1)}
+# codes of the Status values in BatchStage.outcome
+STATUSES = [Status.ONGOING, Status.WIN, Status.LOSE]
+ONGOING, WIN, LOSE = range(3)
+
+class BatchStage:
+    '''
+    Plays many copies (lanes) of the same Stage side by side, for replaying thousands of move sequences at once.
+
+    The tiles of all lanes are held in a single (lanes, rows, cols) uint8 array and every move is applied to all the lanes that are
+    still playing with masked NumPy updates. Each lane ends up exactly as a fresh Stage of the same stage would after the same calls
+    to Stage.move, quirks included. Only scorching is done one lane at a time, and a lane whose moves include !, U or R is handed to a
+    Stage of its own (which then plays all its later moves), since those moves need the history of the lane.
+
+    Attributes:
+        - stage (Stage) - the stage being played; only its original state is used
+        - cells (numpy.ndarray) - the tiles of every lane, as in Stage.cells
+        - under (numpy.ndarray) - for every lane and cell, the tile under the rock in that cell (as Stage.under_rock)
+        - x, y (numpy.ndarray) - position of the Player in every lane
+        - inv (numpy.ndarray) - code of the item held in every lane, 0 if none
+        - outcome (numpy.ndarray) - code of the Status of every lane (see STATUSES)
+        - mushrooms (numpy.ndarray) - count of mushrooms collected in every lane
+        - curr_tile, last_tile (numpy.ndarray) - codes of the curr_tile and last_tile of every lane
+        - played (list of list of str) - the move sequences given to every lane so far
+        - stages (dict) - maps a lane that is played by its own Stage to that Stage
+    '''
+    def __init__(self, stage, lanes):
+        if np is None:
+            raise ModuleNotFoundError("the batch simulator needs NumPy (pip install numpy)")
+        self.stage = stage
+        start = bytearray(stage.original_cells)
+        start[stage.original_pl.y * stage.cols + stage.original_pl.x] = PLAYER
+        self.cells = np.tile(np.frombuffer(bytes(start), dtype=np.uint8).reshape(1, stage.rows, stage.cols), (lanes, 1, 1))
+        self.under = np.full((lanes, stage.rows * stage.cols), EMPTY, dtype=np.uint8)
+        self.x = np.full(lanes, stage.original_pl.x, dtype=np.int64)
+        self.y = np.full(lanes, stage.original_pl.y, dtype=np.int64)
+        self.inv = np.zeros(lanes, dtype=np.uint8)
+        self.outcome = np.full(lanes, ONGOING, dtype=np.uint8)
+        self.mushrooms = np.zeros(lanes, dtype=np.int64)
+        self.curr_tile = np.full(lanes, EMPTY, dtype=np.uint8)
+        self.last_tile = np.full(lanes, EMPTY, dtype=np.uint8)
+        self.played = [[] for _ in range(lanes)]
+        self.stages = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def move(self, move_sequences):
+        '''Plays move_sequences[n] in lane n for every lane, as one call to Stage.move would.'''
+        if len(move_sequences) != len(self):
+            raise ValueError(f"expected {len(self)} move sequences, got {len(move_sequences)}")
+        length = max(map(len, move_sequences), default=0)
+        moves = np.zeros((len(self), length), dtype=np.uint8) # 0 once a lane stops reading its moves
+        for lane, move_sequence in enumerate(move_sequences):
+            self.played[lane].append(move_sequence)
+            valid = ""
+            for move in move_sequence:
+                move = move.upper()
+                if move not in Stage.VALID_MOVES:
+                    break
+                valid += move
+            if lane in self.stages or "!" in valid or "U" in valid or "R" in valid:
+                self.play_alone(lane)
+            elif valid:
+                moves[lane, :len(valid)] = np.frombuffer(valid.encode(), dtype=np.uint8)
+
+        flat = self.cells.reshape(len(self), -1)
+        start = self.y * self.stage.cols + self.x
+        moved = np.zeros(len(self), dtype=bool) # whether the lane played a move that starts a turn
+        for step in range(length):
+            lanes = np.flatnonzero((moves[:, step] != 0) & (self.outcome == ONGOING))
+            if not len(lanes):
+                break
+            moved[lanes] = True
+            step_moves = moves[lanes, step]
+            self.pick_up(lanes[step_moves == ord("P")], flat)
+            for move, (dy, dx) in DIRECTIONS.items():
+                self.walk(lanes[step_moves == move], dy, dx, flat)
+
+        # update the state of the grid as at the end of Stage.move
+        self.outcome[self.mushrooms == self.stage.win_condition] = WIN
+        for lane in self.stages:
+            moved[lane] = False
+        lanes = np.flatnonzero(moved)
+        origin = start[lanes]
+        free = flat[lanes, origin] != ROCK
+        flat[lanes[free], origin[free]] = self.last_tile[lanes[free]]
+        here = self.y[lanes] * self.stage.cols + self.x[lanes]
+        self.last_tile[lanes] = flat[lanes, here]
+        flat[lanes, here] = PLAYER
+        for lane, stage in self.stages.items():
+            self.copy_stage(lane, stage)
+
+    def pick_up(self, lanes, flat):
+        '''Plays P in lanes.'''
+        lanes = lanes[(self.curr_tile[lanes] != EMPTY) & (self.curr_tile[lanes] != PAVED) & (self.inv[lanes] == 0)]
+        self.inv[lanes] = self.curr_tile[lanes]
+        flat[lanes, self.y[lanes] * self.stage.cols + self.x[lanes]] = EMPTY
+        self.curr_tile[lanes] = EMPTY
+        self.last_tile[lanes] = EMPTY
+
+    def walk(self, lanes, dy, dx, flat):
+        '''Plays the move towards (dy, dx) in lanes, as Stage.move and Stage.can_move_here do.'''
+        if not len(lanes):
+            return
+        rows, cols = self.stage.rows, self.stage.cols
+        y, x = np.clip(self.y[lanes] + dy, 0, rows - 1), np.clip(self.x[lanes] + dx, 0, cols - 1)
+        i = y * cols + x
+        i_chk = np.clip(y + dy, 0, rows - 1) * cols + np.clip(x + dx, 0, cols - 1)
+        tile, tile_chk, inv = flat[lanes, i], flat[lanes, i_chk], self.inv[lanes]
+
+        can_move = np.isin(tile, (EMPTY, PAVED, AXE, FLAMETHROWER, PLAYER))
+
+        chop = (tile == TREE) & (inv == AXE)
+        flat[lanes[chop], i[chop]] = EMPTY
+        burn = (tile == TREE) & (inv == FLAMETHROWER)
+        for lane, start in zip(lanes[burn], i[burn]):
+            self.scorch(flat[lane], start)
+        self.inv[lanes[chop | burn]] = 0
+        can_move |= chop | burn
+
+        water = tile == WATER
+        self.outcome[lanes[water]] = LOSE
+        can_move |= water
+
+        rock = tile == ROCK
+        push = rock & np.isin(tile_chk, (EMPTY, PAVED, PLAYER))
+        sink = rock & (tile_chk == WATER)
+        flat[lanes[push | sink], i[push | sink]] = self.under[lanes[push | sink], i[push | sink]]
+        self.under[lanes[push], i_chk[push]] = tile_chk[push]
+        flat[lanes[push], i_chk[push]] = ROCK
+        flat[lanes[sink], i_chk[sink]] = PAVED
+        can_move |= push | sink
+
+        mushroom = tile == MUSHROOM
+        self.mushrooms[lanes[mushroom]] += 1
+        self.outcome[lanes[mushroom & (self.mushrooms[lanes] == self.stage.win_condition)]] = WIN
+        flat[lanes[mushroom], i[mushroom]] = EMPTY
+        can_move |= mushroom
+
+        self.y[lanes[can_move]] = y[can_move]
+        self.x[lanes[can_move]] = x[can_move]
+        tile = flat[lanes, self.y[lanes] * cols + self.x[lanes]]
+        self.curr_tile[lanes] = np.where(tile != PLAYER, tile, self.curr_tile[lanes])
+
+    def scorch(self, cells, start):
+        '''Burns the trees connected to the tree in cell start of the tiles of one lane, as Stage.scorch does.'''
+        cells[start] = EMPTY
+        stack = [int(start)]
+        while stack:
+            for j in neighbours(stack.pop(), self.stage.cols):
+                if 0 <= j < len(cells) and cells[j] == TREE:
+                    cells[j] = EMPTY
+                    stack.append(j)
+
+    def play_alone(self, lane):
+        '''Hands lane over to a Stage of its own, which replays every move sequence given to the lane so far.'''
+        stage = self.stages.get(lane)
+        if stage is None:
+            stage = self.stages[lane] = self.stage.fresh()
+            for move_sequence in self.played[lane][:-1]:
+                stage.move(move_sequence, stage.pl.y, stage.pl.x)
+        stage.move(self.played[lane][-1], stage.pl.y, stage.pl.x)
+
+    def copy_stage(self, lane, stage):
+        '''Copies the state of the Stage playing lane into the arrays.'''
+        self.cells[lane] = np.frombuffer(bytes(stage.cells), dtype=np.uint8).reshape(stage.rows, stage.cols)
+        self.under[lane] = np.frombuffer(bytes(stage.under_rock), dtype=np.uint8)
+        self.x[lane], self.y[lane] = stage.pl.x, stage.pl.y
+        self.inv[lane] = next((ord(tile) for tile, emoji in Stage.EMOJIS.items() if emoji == stage.pl.inv), 0)
+        self.outcome[lane] = STATUSES.index(stage.outcome)
+        self.mushrooms[lane] = stage.mushrooms
+        self.curr_tile[lane], self.last_tile[lane] = ord(stage.curr_tile), ord(stage.last_tile)
+
+    def grid(self, lane):
+        '''Returns the tiles of lane as a grid (2D list of str), as Stage.grid does.'''
+        return [list(row.tobytes().decode()) for row in self.cells[lane]]
+
+    def statuses(self):
+        '''Returns the Status of every lane.'''
+        return [STATUSES[code] for code in self.outcome]
+
+    def snapshot(self, lane):
+        '''Returns the Stage.snapshot of the game in lane (without a Zobrist hash).'''
+        rocks = np.flatnonzero(self.cells[lane].reshape(-1) == ROCK)
+        return (self.cells[lane].tobytes(), int(self.x[lane]), int(self.y[lane]),
+            Stage.EMOJIS[chr(self.inv[lane])] if self.inv[lane] else "", STATUSES[self.outcome[lane]], int(self.mushrooms[lane]),
+            chr(self.curr_tile[lane]), chr(self.last_tile[lane]), frozenset((int(i), int(self.under[lane, i])) for i in rocks), None)
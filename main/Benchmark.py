@@ -0,0 +1,205 @@
+import io, json, os, platform, subprocess, sys, tempfile, time
+try:
+    from main.Stage import Stage
+    from main.Player import Player
+    from main.Processing import read_stage_file
+    from main.Renderer import Renderer
+    from main.Generator import StageGenerator
+    from main.Status import Status
+    from main.Engine import play_moves
+except ModuleNotFoundError as m:
+    from Stage import Stage
+    from Player import Player
+    from Processing import read_stage_file
+    from Renderer import Renderer
+    from Generator import StageGenerator
+    from Status import Status
+    from Engine import play_moves
+
+MAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+SMALL_STAGE = os.path.join(MAIN_DIR, "stage-files", "stage1.txt")
+# layout of the results files; results of different versions are not compared
+RESULTS_VERSION = 1
+# largest slowdown per operation, as a fraction, that compare_results does not report as a regression
+DEFAULT_THRESHOLD = 0.25
+
+def load(stage_file):
+    '''Returns a Stage of stage_file, parsed with read_stage_file as the tests do.'''
+    (x, y), grid = read_stage_file(stage_file)
+    return Stage(grid, Player(x, y))
+
+def timed(function, *args):
+    '''Calls function and returns the seconds it took.'''
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+def prepare_files(directory, size, seed=0):
+    '''
+    Writes the stages of the benchmarks to directory and returns a dict mapping their names to their stage files, along with the
+    moves played on them (under "<name> moves"):
+        - small: the shipped stage1.txt
+        - huge: a size x size stage from StageGenerator, carved so that its moves walk across it, up to the one that would clear it
+        - forest: a size x size stage of trees, but for the Player, a flamethrower to its right and a mushroom in the far corner (so
+          that the game goes on), so that nearly all of it burns at once
+        - walk, push, pickup: single rows of 10 * size cells along which the Player walks, pushes a rock, or picks up axes and
+          mushrooms and chops the tree between them
+    '''
+    files = {"small": SMALL_STAGE, "small moves": ""}
+    def write(name, rows, moves=""):
+        files[name] = os.path.join(directory, f"{name}.txt")
+        files[f"{name} moves"] = moves
+        with open(files[name], "w") as file:
+            file.write(f"{len(rows)} {len(rows[0])}\n" + "\n".join(rows))
+
+    generator = StageGenerator(size, size, seed, cluster=0.7, rocks=0.05, water=0.05, mushrooms=size // 2, carve=True, wander=size // 20)
+    files["huge"] = os.path.join(directory, "huge.txt")
+    generator.write(files["huge"])
+    moves, stage = "".join(generator.moves()), template(files, "huge")
+    for n, move in enumerate(moves):
+        stage.move(move, stage.pl.y, stage.pl.x)
+        if stage.outcome != Status.ONGOING:
+            break
+    files["huge moves"] = moves[:n] # the moves after the one that clears the stage would be ignored
+    write("forest", ["L*" + "T" * (size - 2)] + ["T" * size] * (size - 2) + ["T" * (size - 1) + "+"], "DP")
+    length = 10 * size
+    write("walk", ["L" + "." * (length - 2) + "+"], "D" * (length - 3))
+    write("push", ["LR" + "." * (length - 2) + "+"], "D" * (length - 3))
+    write("pickup", ["L" + "xT+" * (length // 3) + "+"], "DPDD" * (length // 3))
+    return files
+
+def template(files, name):
+    '''Returns a new Stage of the stage file files[name], parsing it only the first time (see Stage.fresh).'''
+    if f"{name} stage" not in files:
+        files[f"{name} stage"] = load(files[name])
+    return files[f"{name} stage"].fresh()
+
+def bench_parse(files, name):
+    return timed(read_stage_file, files[name]), 1
+
+def bench_init(files, name):
+    (x, y), grid = read_stage_file(files[name])
+    return timed(Stage, grid, Player(x, y)), 1
+
+def bench_reset(files, name):
+    '''Times the ! that undoes the moves of a stage.'''
+    stage = template(files, name)
+    play_moves(stage, files[f"{name} moves"])
+    return timed(stage.move, "!", stage.pl.y, stage.pl.x), 1
+
+def bench_moves(files, name):
+    moves = files[f"{name} moves"]
+    return timed(play_moves, template(files, name), moves), len(moves)
+
+def bench_scorch(files, name):
+    '''Times the move into the forest that burns it, counting every tree burned as an operation.'''
+    stage = template(files, name)
+    play_moves(stage, files[f"{name} moves"])
+    trees = stage.cells.count(b"T")
+    return timed(stage.move, "D", stage.pl.y, stage.pl.x), trees
+
+def bench_reset_scorched(files, name):
+    '''Times the ! that brings back a whole burned forest.'''
+    stage = template(files, name)
+    play_moves(stage, files[f"{name} moves"] + "D")
+    return timed(stage.move, "!", stage.pl.y, stage.pl.x), len(stage.cells)
+
+def bench_clear_modify(files, name):
+    '''Times Stage.clear_modify redrawing the whole stage, counting every cell as an operation.'''
+    stage = template(files, name)
+    grid = stage.grid
+    stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        return timed(stage.clear_modify, grid, False), len(stage.cells)
+    finally:
+        sys.stdout = stdout
+
+def bench_renderer(files, name):
+    '''Times Renderer drawing a move after the first frame, as the game does between two prompts.'''
+    stage = template(files, name)
+    renderer = Renderer(out=io.StringIO())
+    renderer.draw(stage, True)
+    play_moves(stage, files[f"{name} moves"][:1])
+    return timed(renderer.draw, stage, False), 1
+
+def bench_startup(files, module):
+    '''
+    Times importing module in a new interpreter, as reported by -X importtime (so without the start of the interpreter itself). The
+    time depends on whether the bytecode cache is warm, which the first repetition takes care of.
+    '''
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=MAIN_DIR, capture_output=True,
+        text=True, check=True)
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|") if line.startswith("import time:") else ("", "", "")
+        if name.strip() == module:
+            return int(cumulative) / 1e6, 1
+    raise RuntimeError(f"-X importtime did not report {module}")
+
+# every benchmark: its name, the function that measures one repetition of it and the stage (or, for startup, the module) it is given
+BENCHMARKS = (
+    ("parse/small", bench_parse, "small"), ("parse/huge", bench_parse, "huge"),
+    ("init/small", bench_init, "small"), ("init/huge", bench_init, "huge"),
+    ("reset/huge", bench_reset, "huge"), ("reset/walk", bench_reset, "walk"), ("reset/forest", bench_reset_scorched, "forest"),
+    ("move/walk", bench_moves, "walk"), ("move/push", bench_moves, "push"), ("move/pickup", bench_moves, "pickup"),
+    ("move/huge", bench_moves, "huge"),
+    ("scorch/forest", bench_scorch, "forest"),
+    ("render/clear_modify-small", bench_clear_modify, "small"), ("render/clear_modify-huge", bench_clear_modify, "huge"),
+    ("render/renderer-huge", bench_renderer, "huge"),
+    ("startup/engine", bench_startup, "Engine"), ("startup/shroom_raider", bench_startup, "shroom_raider"),
+)
+
+def run_benchmarks(size=1000, repeat=5, seed=0, only=None, report=None):
+    '''
+    Runs every benchmark whose name contains only (all of them if only is None) repeat times on stages of size x size cells, and
+    returns the results as a dict that write_results can save. Every benchmark keeps its fastest repetition, which is the least
+    disturbed by the rest of the machine. report, if given, is called with the name and result of every benchmark once it is done.
+    '''
+    results = {"version": RESULTS_VERSION, "python": platform.python_version(), "platform": platform.platform(), "size": size,
+        "repeat": repeat, "seed": seed, "benchmarks": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        files = prepare_files(directory, size, seed)
+        for name, function, stage in BENCHMARKS:
+            if only and only not in name:
+                continue
+            seconds, operations = min(function(files, stage) for _ in range(repeat))
+            result = results["benchmarks"][name] = {"seconds": seconds, "operations": operations,
+                "per_second": operations / seconds if seconds else float("inf")}
+            if report:
+                report(name, result)
+    return results
+
+def write_results(results, results_file):
+    with open(results_file, "w") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+def read_results(results_file):
+    with open(results_file) as file:
+        return json.load(file)
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    '''
+    Compares the benchmarks found in both results, by the seconds they took per operation. Returns a list of (name, baseline seconds
+    per operation, current seconds per operation, change, regressed) tuples, where change is the slowdown as a fraction (negative if
+    faster) and regressed is whether it is more than threshold. Raises ValueError if the results were not measured the same way.
+    '''
+    for key in ("version", "size", "seed"):
+        if baseline.get(key) != current.get(key):
+            raise ValueError(f"the results differ in {key} ({baseline.get(key)} and {current.get(key)}), so they cannot be compared")
+    rows = []
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["seconds"] / baseline["benchmarks"][name]["operations"]
+        after = result["seconds"] / result["operations"]
+        change = after / before - 1 if before else 0.0
+        rows.append((name, before, after, change, change > threshold))
+    return rows
+
+def format_comparison(rows, threshold=DEFAULT_THRESHOLD):
+    '''Returns the rows of compare_results as a table, one line each.'''
+    lines = [f"{'benchmark':<28}{'baseline/op':>14}{'current/op':>14}{'change':>10}"]
+    for name, before, after, change, regressed in rows:
+        flag = f"  REGRESSION (over {threshold:.0%})" if regressed else ""
+        lines.append(f"{name:<28}{before * 1e6:>12.3f}us{after * 1e6:>12.3f}us{change:>+10.1%}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,101 @@
+import json
+try:
+    from main.Engine import changed_cells, state_message
+except ModuleNotFoundError as m:
+    from Engine import changed_cells, state_message
+
+# compact separators, so that a response is as short as it can be
+encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+class BotSession:
+    '''
+    Plays a Stage for a bot that sends JSON commands, one per line (see serve_jsonl).
+
+    Every command is an object with a "cmd" and, optionally, an "id" that is copied into its response:
+        - {"cmd": "move", "moves": "WASD"} plays moves as one call to Stage.move, as a line entered at the prompt would be
+        - {"cmd": "reset"} puts the stage back into its original state
+        - {"cmd": "state"} only answers
+        - {"cmd": "snapshot"} saves the game state and answers with its number in "snapshot"
+        - {"cmd": "restore", "snapshot": n} puts back the state saved as snapshot n; with "forget": true, it is then dropped
+    Every response is the state_message of the stage (outcome, position, item and mushrooms). A command with "diff": true also gets
+    "changes", the [cell, tile] pairs of the cells it changed, and one with "grid": true gets "rows", "cols" and "cells", the whole
+    stage row after row; neither is computed otherwise. A command that cannot be played gets an "error" instead.
+
+    Attributes:
+        - stage (Stage) - the stage being played
+        - snapshots (dict) - maps the number of every saved snapshot to its Stage.snapshot
+        - snapshot_count (int) - number of snapshots saved so far, which numbers the next one
+    '''
+    def __init__(self, stage):
+        self.stage = stage
+        self.snapshots = {}
+        self.snapshot_count = 0
+
+    def handle(self, command):
+        '''Plays command (a dict) and returns its response (a dict).'''
+        stage = self.stage
+        cmd = command.get("cmd")
+        before = bytes(stage.cells) if command.get("diff") else None
+        response = {}
+        if cmd == "move":
+            moves = command.get("moves")
+            if not isinstance(moves, str):
+                return self.error(command, "move needs a string of moves")
+            stage.move(moves, stage.pl.y, stage.pl.x)
+        elif cmd == "reset":
+            stage.reset()
+        elif cmd == "snapshot":
+            self.snapshot_count += 1
+            self.snapshots[self.snapshot_count] = stage.snapshot()
+            response["snapshot"] = self.snapshot_count
+        elif cmd == "restore":
+            number = command.get("snapshot")
+            state = self.snapshots.get(number) if isinstance(number, int) else None
+            if state is None:
+                return self.error(command, f"there is no snapshot {number!r}")
+            stage.restore(state)
+            if command.get("forget"):
+                del self.snapshots[number]
+        elif cmd != "state":
+            return self.error(command, f"unknown command {cmd!r}")
+
+        if "id" in command:
+            response["id"] = command["id"]
+        if before is not None:
+            response["changes"] = changed_cells(before, stage.cells, stage.cols)
+        if command.get("grid"):
+            response.update(rows=stage.rows, cols=stage.cols, cells=stage.cells.decode())
+        return state_message(stage, **response)
+
+    def error(self, command, message):
+        '''Returns the response to a command that could not be played.'''
+        return {"id": command["id"], "error": message} if "id" in command else {"error": message}
+
+    def handle_line(self, line):
+        '''Plays the command on a line of JSON and returns its response as a line of JSON.'''
+        try:
+            command = json.loads(line)
+        except ValueError as e:
+            return encode({"error": f"not a JSON command: {e}"}) + "\n"
+        if not isinstance(command, dict):
+            return encode({"error": "a command must be a JSON object"}) + "\n"
+        return encode(self.handle(command)) + "\n"
+
+def serve_jsonl(stage, chunks, out):
+    '''
+    Plays the commands read from chunks (an iterable of bytes, such as the reads of a pipe) on stage and writes their responses to out
+    (a binary file), one line each, in order.
+
+    Bots can send many commands without waiting for their responses: all the complete lines of a chunk are played before the responses
+    are written out together, and out is flushed once per chunk rather than once per command.
+    '''
+    session = BotSession(stage)
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        out.write("".join(session.handle_line(line) for line in lines if line.strip()).encode())
+        out.flush()
+    if pending.strip():
+        out.write(session.handle_line(pending).encode())
+        out.flush()
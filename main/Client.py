@@ -0,0 +1,91 @@
+import json, socket
+try:
+    from main.Player import Player
+    from main.Stage import Stage
+    from main.Renderer import Renderer
+except ModuleNotFoundError as m:
+    from Player import Player
+    from Stage import Stage
+    from Renderer import Renderer
+
+class RemoteStage:
+    '''
+    The copy of a stage played on a GameServer that a client keeps, with what Renderer needs to draw it.
+
+    Attributes:
+        - rows, cols (int) - size of the stage
+        - cells (bytearray) - the tiles of the stage, as in Stage.cells
+        - pl (Player) - position and item of the Player
+        - outcome (str) - name of the Status of the game
+        - mushrooms (int) - count of mushrooms collected
+        - win_condition (int) - count of mushrooms in the stage
+    '''
+    def __init__(self, hello):
+        self.rows, self.cols = hello["rows"], hello["cols"]
+        self.cells = bytearray(hello["cells"].encode())
+        self.pl = Player(hello["x"], hello["y"])
+        self.update(hello)
+
+    def update(self, message):
+        '''Applies a message of the server: writes its changes and takes its state.'''
+        for i, tile in message.get("changes", ()):
+            self.cells[i] = ord(tile)
+        self.pl.x, self.pl.y, self.pl.inv = message["x"], message["y"], message["inv"]
+        self.outcome, self.mushrooms, self.win_condition = message["outcome"], message["mushrooms"], message["win_condition"]
+
+class Connection:
+    '''A connection to a GameServer, over TCP to (host, port) or over the Unix socket at path.'''
+    def __init__(self, host="127.0.0.1", port=8765, path=None, timeout=None):
+        if path:
+            self.socket = socket.socket(socket.AF_UNIX)
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout)
+        self.file = self.socket.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def receive(self):
+        '''Returns the next message of the server. Raises ConnectionError if the server closed the connection.'''
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the server closed the connection")
+        return json.loads(line)
+
+    def play(self, moves):
+        '''Sends a line of moves and returns the answer of the server.'''
+        self.file.write(moves.replace("\n", "").encode() + b"\n")
+        self.file.flush()
+        return self.receive()
+
+def play_remote(host="127.0.0.1", port=8765, path=None):
+    '''Plays a session on a GameServer in the terminal, drawing the stage with Stage.EMOJIS as the game does. E quits.'''
+    with Connection(host, port, path) as connection:
+        message = connection.receive()
+        if "error" in message:
+            print(message["error"])
+            return
+        stage, renderer, first = RemoteStage(message), Renderer(lines_below=3), True
+        while stage.outcome == "ONGOING":
+            renderer.draw(stage, first)
+            first = False
+            moves = input(f"\nMushrooms: {stage.mushrooms} / {stage.win_condition} 🍄   Holding: {stage.pl.inv}\n"
+                f"Moves ({', '.join(sorted(Stage.VALID_MOVES))}; E to quit): ")
+            if moves.upper() == "E":
+                return
+            message = connection.play(moves)
+            if "error" in message:
+                print(message["error"])
+                return
+            stage.update(message)
+        renderer.draw(stage, first)
+        print("\nYou won!" if stage.outcome == "WIN" else "\nYou lost!")
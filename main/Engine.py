@@ -0,0 +1,59 @@
+'''
+Headless entry point of Shroom Raider: the game engine without the terminal UI, the solver or the batch tools.
+
+Importing this module only loads Stage, Player, Status and the stage file readers, so scripts that play stages without a screen
+(graders, bots, batch runs) start as fast as possible.
+'''
+try:
+    from main.Stage import Stage, ChangeTracker
+    from main.Player import Player
+    from main.Status import Status
+    from main.Processing import read_stage_file, load_stage
+except ModuleNotFoundError as m:
+    from Stage import Stage, ChangeTracker
+    from Player import Player
+    from Status import Status
+    from Processing import read_stage_file, load_stage
+
+__all__ = ["Stage", "ChangeTracker", "Player", "Status", "read_stage_file", "load_stage", "play", "play_moves", "changed_cells",
+    "tracked_changes", "state_message"]
+
+def play(stage_file, moves, use_cache = True):
+    '''Plays the string moves on stage_file as the -m option does (one call to Stage.move per move) and returns the Stage.'''
+    return play_moves(load_stage(stage_file, use_cache), moves)
+
+def play_moves(stage, moves):
+    '''Plays the string moves on stage as the -m option does (one call to Stage.move per move) and returns stage.'''
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+    return stage
+
+def changed_cells(before, after, cols):
+    '''Returns the [cell, tile] pairs of the cells of after (a Stage.cells) that differ from before, comparing a row at a time.'''
+    changes = []
+    for start in range(0, len(after), cols):
+        if before[start:start + cols] != after[start:start + cols]:
+            changes.extend([i, chr(after[i])] for i in range(start, start + cols) if before[i] != after[i])
+    return changes
+
+def tracked_changes(tracker, known):
+    '''
+    Returns the [cell, tile] pairs of the cells of tracker.stage that differ from known (a bytearray copy of them, e.g. as a client
+    last saw them) and brings known up to date. Only the cells that the ChangeTracker reports as written are compared, unless it
+    cannot tell, in which case the whole stage is compared with changed_cells.
+    '''
+    cells = tracker.stage.cells
+    written = tracker.written_cells()
+    if written is None:
+        changes = changed_cells(known, cells, tracker.stage.cols)
+        tracker.mark()
+    else:
+        changes = [[i, chr(cells[i])] for i in sorted(written) if known[i] != cells[i]]
+    for i, tile in changes:
+        known[i] = ord(tile)
+    return changes
+
+def state_message(stage, **fields):
+    '''Returns the parts of the state of stage that are not in its cells, with fields, as a dict ready for JSON.'''
+    return dict(fields, x=stage.pl.x, y=stage.pl.y, inv=stage.pl.inv, outcome=stage.outcome.name, mushrooms=stage.mushrooms,
+        win_condition=stage.win_condition)
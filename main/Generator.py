@@ -0,0 +1,175 @@
+import random
+try:
+    from main.Stage import EMPTY, PLAYER, TREE, MUSHROOM, ROCK, WATER, AXE, FLAMETHROWER
+except ModuleNotFoundError as m:
+    from Stage import EMPTY, PLAYER, TREE, MUSHROOM, ROCK, WATER, AXE, FLAMETHROWER
+
+# densities are drawn with one random byte per cell, so they are rounded to the nearest multiple of 1/256
+RESOLUTION = 256
+
+def chance_table(chances, default=0):
+    '''
+    Returns a table for bytes.translate that turns uniformly random bytes into the values of chances, a list of (value, probability)
+    pairs, each with (about) its probability, and into default otherwise.
+    '''
+    table, start = bytearray([default]) * RESOLUTION, 0
+    for value, probability in chances:
+        end = min(RESOLUTION, start + round(probability * RESOLUTION))
+        table[start:end] = bytes([value]) * (end - start)
+        start = end
+    return bytes(table)
+
+class StageGenerator:
+    '''
+    Generates random stages of any size in the format read by read_stage_file, the same stage for the same seed.
+
+    The stage is written a row at a time, so only the row being drawn is held in memory besides the positions of the mushrooms and
+    items, and every row is drawn with a few operations on whole rows (random bytes mapped to tiles with bytes.translate, and the rows
+    of trees combined as integers with one byte per cell) rather than tile by tile:
+        - a cell starts a tree with probability forest, or continues the tree above it with probability cluster; trees then grow sideways
+          into every run of neighbours that continue them (each with probability cluster), so the higher cluster is, the larger the
+          groups of trees burned together by a flamethrower are;
+        - the other cells are rocks with probability rocks, water with probability water and empty otherwise;
+        - exactly mushrooms mushrooms, axes axes and flamethrowers flamethrowers are placed on cells picked at random, and the Player on
+          another one.
+    With carve, the stage is generated around a path that is sure to clear it: the path starts at the Player in the top row and goes
+    down the stage a row at a time, wandering up to wander columns sideways in every row. The cells of the path are empty and every
+    mushroom is placed on it, so walking the path (see moves) collects all of them whatever else is drawn around it.
+
+    Attributes:
+        - rows, cols (int) - size of the stage
+        - seed (int) - seed of the random numbers the stage is drawn with
+        - forest, cluster, rocks, water (float) - probabilities described above
+        - mushrooms, axes, flamethrowers (int) - counts of each placed
+        - carve (bool) - whether the stage is generated around a path that clears it
+        - wander (int) - most columns the path moves sideways in a row
+        - path (list of int) - if carve, the column where the path enters each row, then the column where it ends in the last one
+        - player (tuple) - the position (y, x) of the Player
+        - items (dict) - maps every row holding mushrooms or items to the (x, tile) pairs of them
+    '''
+    def __init__(self, rows, cols, seed=None, forest=0.15, cluster=0.5, rocks=0.03, water=0.03, mushrooms=10, axes=0,
+                 flamethrowers=0, carve=False, wander=3):
+        if rows < 1 or cols < 1:
+            raise ValueError("a stage needs at least 1 row and 1 column")
+        for name, probability in (("forest", forest), ("cluster", cluster), ("rocks", rocks), ("water", water)):
+            if not 0 <= probability <= 1:
+                raise ValueError(f"{name} must be between 0 and 1, not {probability}")
+        if cluster >= 1:
+            raise ValueError("cluster must be less than 1, or every row with a tree would be all trees")
+        if rocks + water > 1:
+            raise ValueError("rocks and water must add up to at most 1")
+        if min(mushrooms, axes, flamethrowers, wander) < 0:
+            raise ValueError("the counts of mushrooms and items and wander cannot be negative")
+        if mushrooms + axes + flamethrowers > rows * cols - 1:
+            raise ValueError(f"a {rows}x{cols} stage has room for {rows * cols - 1} mushrooms and items besides the Player")
+
+        self.rows, self.cols = rows, cols
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.forest, self.cluster, self.rocks, self.water = forest, cluster, rocks, water
+        self.mushrooms, self.axes, self.flamethrowers = mushrooms, axes, flamethrowers
+        self.carve, self.wander = carve, wander
+        self.rng = random.Random(self.seed)
+        self.path = self.draw_path() if carve else []
+        self.player, self.items = self.place_items()
+
+    def draw_path(self):
+        '''Returns the columns of the carved path (see the path attribute).'''
+        rng, cols = self.rng, self.cols
+        path = [rng.randrange(cols)]
+        for y in range(self.rows):
+            path.append(min(cols - 1, max(0, path[-1] + rng.randint(-self.wander, self.wander))))
+        return path
+
+    def path_cells(self, steps):
+        '''Returns the cells (y * cols + x) that are the given steps along the carved path, the Player's cell being step 0.'''
+        cells, steps, start = [], sorted(steps), 0
+        k = 0
+        for y in range(self.rows):
+            a, b = self.path[y], self.path[y + 1]
+            length = abs(b - a) + 1
+            while k < len(steps) and steps[k] < start + length:
+                offset = steps[k] - start
+                cells.append(y * self.cols + (a + offset if b >= a else a - offset))
+                k += 1
+            start += length
+        return cells
+
+    def place_items(self):
+        '''Picks the cells of the Player, the mushrooms and the items. Returns the Player's position and the items attribute.'''
+        rng, cells = self.rng, self.rows * self.cols
+        count = self.axes + self.flamethrowers
+        if self.carve:
+            player = self.path[0]
+            length = sum(abs(self.path[y + 1] - self.path[y]) + 1 for y in range(self.rows))
+            if self.mushrooms > length - 1:
+                raise ValueError(f"the carved path has room for {length - 1} mushrooms, not {self.mushrooms}")
+            mushrooms = self.path_cells(rng.sample(range(1, length), self.mushrooms))
+            # items go anywhere else; drawing as many extra cells as there are mushrooms leaves enough once those are skipped
+            taken = set(mushrooms)
+            others = [i + (i >= player) for i in rng.sample(range(cells - 1), count + self.mushrooms)]
+            others = [i for i in others if i not in taken][:count]
+        else:
+            player = rng.randrange(cells)
+            picked = [i + (i >= player) for i in rng.sample(range(cells - 1), self.mushrooms + count)]
+            mushrooms, others = picked[:self.mushrooms], picked[self.mushrooms:]
+
+        items = {}
+        tiles = [MUSHROOM] * len(mushrooms) + [AXE] * self.axes + [FLAMETHROWER] * self.flamethrowers
+        for i, tile in zip(mushrooms + others, tiles):
+            y, x = divmod(i, self.cols)
+            items.setdefault(y, []).append((x, tile))
+        return divmod(player, self.cols), items
+
+    def iter_rows(self):
+        '''Yields the rows of the stage (bytes), top to bottom.'''
+        rng, rows, cols = self.rng, self.rows, self.cols
+        start_table = chance_table([(0xFF, self.forest)])
+        cluster_table = chance_table([(0xFF, self.cluster)])
+        tile_table = chance_table([(ROCK, self.rocks), (WATER, self.water)], EMPTY)
+        def draw(table):
+            return int.from_bytes(rng.randbytes(cols).translate(table), "big")
+        tree_row = int.from_bytes(bytes([TREE]) * cols, "big")
+
+        above = 0 # the trees of the row above, 0xFF for every tree
+        for y in range(rows):
+            trees = draw(start_table) | (draw(cluster_table) & above)
+            spread = draw(cluster_table)
+            while True:
+                grown = trees | ((trees >> 8 | trees << 8) & spread)
+                if grown == trees:
+                    break
+                trees = grown
+            above = trees
+            row = bytearray(((draw(tile_table) & ~trees) | (tree_row & trees)).to_bytes(cols, "big"))
+
+            if self.carve:
+                a, b = sorted(self.path[y:y + 2])
+                row[a:b + 1] = bytes([EMPTY]) * (b - a + 1)
+            for x, tile in self.items.get(y, ()):
+                row[x] = tile
+            if y == self.player[0]:
+                row[self.player[1]] = PLAYER
+            yield bytes(row)
+
+    def write(self, stage_file):
+        '''Writes the stage to stage_file, with its "r c" header.'''
+        with open(stage_file, "wb") as file:
+            file.write(f"{self.rows} {self.cols}\n".encode())
+            for y, row in enumerate(self.iter_rows()):
+                if y:
+                    file.write(b"\n")
+                file.write(row)
+
+    def moves(self):
+        '''Yields the moves that walk the carved path, a row at a time. They clear the stage.'''
+        if not self.carve:
+            raise ValueError("only a stage generated with carve has a path that is sure to clear it")
+        for y in range(self.rows):
+            step = self.path[y + 1] - self.path[y]
+            yield ("D" if step > 0 else "A") * abs(step) + ("S" if y < self.rows - 1 else "")
+
+    def write_moves(self, moves_file):
+        '''Writes the moves that walk the carved path to moves_file, on one line.'''
+        with open(moves_file, "w") as file:
+            file.writelines(self.moves())
+            file.write("\n")
@@ -0,0 +1,136 @@
+import heapq
+from array import array
+from collections import deque
+try:
+    from main.Stage import MUSHROOM, TRIVIAL_TILES, ChangeTracker, neighbours
+except ModuleNotFoundError as m:
+    from Stage import MUSHROOM, TRIVIAL_TILES, ChangeTracker, neighbours
+
+# distance of the cells from which no mushroom can be walked to
+UNREACHABLE = (1 << 31) - 1
+# whether the Player can walk onto each tile code without pushing, cutting or losing anything
+WALKABLE = bytes(tile in TRIVIAL_TILES or tile == MUSHROOM for tile in range(256))
+# moves in the order they are tried when several lead as close to a mushroom, with the neighbours index they move to
+HINT_MOVES = (("W", 0), ("S", 1), ("A", 2), ("D", 3))
+
+class DistanceField:
+    '''
+    Distance from every cell of a Stage to the nearest mushroom, walking only over tiles the Player can walk onto (WALKABLE), which
+    backs the H (hint) command.
+
+    The field is built once with a breadth-first search from every mushroom at once. After that, update reads the cells written since
+    it last ran from the journal of the stage (with a ChangeTracker, as Analyzer does) and only fixes the distances around the ones
+    whose walkability changed (a rock pushed, a tree cut or burned, a mushroom collected, or anything undone):
+        - the distances that relied on a cell that is no longer walkable or no longer a mushroom are dropped: those of the cell and of
+          every cell whose distance is one more than that of a dropped neighbour;
+        - the dropped cells, the cells that became walkable and the new mushrooms are given the best distance their neighbours allow,
+          and a Dijkstra search from them spreads any distance that went down until nothing changes.
+    So an update costs time in the number of cells written since the last one and in the number of cells whose distance relied on
+    them, which is the whole area around the nearest mushroom when it is collected, but not in the size of the stage. The field is
+    built again from scratch when the journal cannot tell what changed (after a restore, for example).
+
+    Attributes:
+        - stage (Stage) - the stage the field is for
+        - tracker (ChangeTracker) - follows the cells written in the stage since the last update
+        - cells (bytearray) - the cells of the stage the field is up to date with
+        - dist (array) - the distance of every cell to the nearest mushroom, UNREACHABLE if there is none it can be walked to
+    '''
+    def __init__(self, stage):
+        self.stage = stage
+        self.tracker = ChangeTracker(stage)
+        self.rebuild()
+
+    def rebuild(self):
+        '''Builds the field from scratch.'''
+        cells, cols = self.stage.cells, self.stage.cols
+        self.tracker.mark()
+        self.cells = bytearray(cells)
+        dist = self.dist = array("i", [UNREACHABLE]) * len(cells)
+        queue = deque()
+        i = cells.find(MUSHROOM)
+        while i != -1:
+            dist[i] = 0
+            queue.append(i)
+            i = cells.find(MUSHROOM, i + 1)
+        while queue:
+            i = queue.popleft()
+            for j in neighbours(i, cols):
+                if 0 <= j < len(cells) and dist[j] == UNREACHABLE and WALKABLE[cells[j]]:
+                    dist[j] = dist[i] + 1
+                    queue.append(j)
+
+    def update(self):
+        '''Brings the field up to date with the stage after any number of moves (or undos, resets and restores).'''
+        written = self.tracker.written_cells()
+        if written is None:
+            self.rebuild()
+            return
+        cells, raised, lowered = self.stage.cells, [], []
+        for i in written:
+            old, new = self.cells[i], cells[i]
+            if old == new:
+                continue
+            self.cells[i] = new
+            if (WALKABLE[old] and not WALKABLE[new]) or (old == MUSHROOM and new != MUSHROOM):
+                raised.append(i)
+            if (WALKABLE[new] and not WALKABLE[old]) or (new == MUSHROOM and old != MUSHROOM):
+                lowered.append(i) # the others, e.g. the Player walking, change no distance
+        if raised or lowered:
+            self.repair(raised, lowered)
+
+    def best_distance(self, i):
+        '''Returns the distance cell i gets from its neighbours (or 0 if it is a mushroom), assuming it is walkable.'''
+        if self.cells[i] == MUSHROOM:
+            return 0
+        best = UNREACHABLE
+        for j in neighbours(i, self.stage.cols):
+            if 0 <= j < len(self.dist) and self.dist[j] < best:
+                best = self.dist[j]
+        return best + 1 if best != UNREACHABLE else UNREACHABLE
+
+    def repair(self, raised, lowered):
+        '''Fixes the distances after the cells in raised stopped being walkable or mushrooms and the cells in lowered started to.'''
+        cells, cols, dist = self.cells, self.stage.cols, self.dist
+        dropped = set(raised)
+        stack = list(raised)
+        while stack:
+            i = stack.pop()
+            for j in neighbours(i, cols):
+                if 0 <= j < len(dist) and j not in dropped and dist[i] != UNREACHABLE and dist[j] == dist[i] + 1:
+                    dropped.add(j)
+                    stack.append(j)
+        for i in dropped:
+            dist[i] = UNREACHABLE
+
+        heap = []
+        for i in dropped.union(lowered):
+            if WALKABLE[cells[i]]:
+                distance = self.best_distance(i)
+                if distance < dist[i]:
+                    dist[i] = distance
+                    heap.append((distance, i))
+        heapq.heapify(heap)
+        while heap:
+            distance, i = heapq.heappop(heap)
+            if distance > dist[i]:
+                continue
+            for j in neighbours(i, cols):
+                if 0 <= j < len(dist) and dist[j] > distance + 1 and WALKABLE[cells[j]]:
+                    dist[j] = distance + 1
+                    heapq.heappush(heap, (distance + 1, j))
+
+    def hint(self):
+        '''
+        Returns a pair (move, distance): the move that takes the Player one step closer to the nearest mushroom it can walk to, and the
+        number of moves it is away. Returns (None, None) if no mushroom can be walked to.
+        '''
+        self.update()
+        stage = self.stage
+        here = stage.pl.y * stage.cols + stage.pl.x
+        around = neighbours(here, stage.cols)
+        best_move, best = None, UNREACHABLE
+        for move, k in HINT_MOVES:
+            j = around[k]
+            if 0 <= j < len(self.dist) and self.dist[j] < best:
+                best_move, best = move, self.dist[j]
+        return (best_move, best + 1) if best_move else (None, None)
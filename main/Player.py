@@ -7,6 +7,8 @@ class Player():
         - y (int) - vertical position of the Player
         - inv (string) - the Player's currently held item
     """
+    __slots__ = ("x", "y", "inv")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -1,3 +1,18 @@
+import hashlib, mmap, os, struct
+from array import array
+try:
+    from main.Stage import Stage, ROCK, MUSHROOM, find_all, label_trees, group_trees
+    from main.Player import Player
+except ModuleNotFoundError as m:
+    from Stage import Stage, ROCK, MUSHROOM, find_all, label_trees, group_trees
+    from Player import Player
+
+CACHE_DIRECTORY = "__stagecache__"
+CACHE_MAGIC = b"SRC2"
+# magic, rows, columns, player x, player y, mushrooms, rocks, tree groups (with the empty group 0), trees; followed by the cells, the
+# rock cells, the tree labels and the tree groups (see write_stage_cache)
+CACHE_HEADER = struct.Struct("<4s8I")
+
 def read_stage_file(stage_file, testing = False): # Returns player location as well as array-fied stage file
     '''
     Reads a file and returns 1 of 2 objects:
@@ -6,30 +21,137 @@ def read_stage_file(stage_file, testing = False): # Returns player location as w
     2. a list of grids (2D lists of str) - if testing is True
         - Activates when testing = True and is intended to read a .txt file containing multiple grids.
     '''
-    f = open(stage_file)
-    if not testing: r, c = (int(i) for i in f.readline().split())
-    
-    player_found = False
-    player_x, player_y = 0, 0
-
-    if not testing:
-        stage = [list(row) for row in f.read().split('\n')]
-    else:
-        stages = [[list(row) for row in section.split('\n')] for section in f.read().split('\n\n')]
-        return stages
-
-    for row in stage:
-        for unit in row:
-            if unit == 'L':
-                player_found = True
-                break
-            elif not player_found:
-                player_x += 1
-
-        if not player_found:
-            player_x = 0
-            player_y += 1
-        else:
-            break
-
-    return (player_x, player_y), stage
+    if testing:
+        return list(iter_stage_grids(stage_file))
+
+    player, rows, cols, cells = read_stage_cells(stage_file)
+    stage = [list(cells[i:i + cols].decode()) for i in range(0, rows * cols, cols)]
+    return player, stage
+
+def read_stage_cells(stage_file):
+    '''
+    Reads a .txt file containing 1 grid (after its "r c" header) without building the grid, and returns a tuple
+    (player location, rows, cols, cells) where cells holds the tiles row after row, as in Stage.cells.
+
+    The file is memory-mapped so that only the tiles themselves are copied. Raises ValueError if the grid does not have r rows of
+    c tiles or has no player.
+    '''
+    with open(stage_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        start = m.find(b"\n") + 1
+        rows, cols = (int(i) for i in m[:start or len(m)].split())
+        cells = bytearray()
+        for y in range(rows):
+            if start == 0 or start > len(m):
+                raise ValueError(f"{stage_file}: the header says {rows} rows but the grid has {y}")
+            end = m.find(b"\n", start)
+            if end == -1:
+                end = len(m)
+            row_end = end - (m[end - 1:end] == b"\r") # the line break of files saved on Windows is \r\n
+            if row_end - start != cols:
+                raise ValueError(f"{stage_file}: the header says {cols} columns but row {y + 1} has {row_end - start}")
+            cells += m[start:row_end]
+            start = end + 1
+        if m[start:].strip():
+            raise ValueError(f"{stage_file}: the header says {rows} rows but the grid has more")
+
+    i = cells.find(b"L")
+    if i == -1:
+        raise ValueError(f"{stage_file}: the stage has no player (L)")
+    y, x = divmod(i, cols)
+    return (x, y), rows, cols, bytes(cells)
+
+def iter_stage_grids(stage_file):
+    '''
+    Yields the grids (2D lists of str) of a .txt file containing multiple grids separated by blank lines, one at a time.
+
+    The file is memory-mapped, so only the grid being yielded is held in memory. Files saved on Windows (with \r\n line breaks) are
+    read the same way.
+    '''
+    with open(stage_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        newline = b"\r\n" if m.find(b"\r\n") != -1 else b"\n"
+        start = 0
+        while start <= len(m):
+            end = m.find(newline * 2, start)
+            if end == -1:
+                end = len(m)
+            yield [list(row.decode()) for row in m[start:end].split(newline)]
+            start = end + 2 * len(newline)
+
+def stage_cache_path(stage_file, digest):
+    '''Returns the path of the cache entry of stage_file for the contents with the given digest.'''
+    directory, name = os.path.split(os.path.abspath(stage_file))
+    return os.path.join(directory, CACHE_DIRECTORY, f"{name}.{digest}.bin")
+
+def load_stage(stage_file, use_cache = True):
+    '''
+    Reads a .txt file containing 1 grid and returns the Stage it describes.
+
+    The parsed stage (tiles, player location, rocks, mushroom count and groups of trees) is saved in a cache entry next to the file,
+    named after the hash of its contents. Later calls map that entry into memory instead of parsing the file again, and editing the
+    file changes its hash, so the old entry is never used (it is deleted when the new one is written).
+    '''
+    if not use_cache:
+        player, rows, cols, cells = read_stage_cells(stage_file)
+        return Stage.from_cells(rows, cols, cells, Player(*player))
+
+    with open(stage_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        digest = hashlib.sha256(m).hexdigest()[:32]
+    cache_file = stage_cache_path(stage_file, digest)
+    try:
+        return read_stage_cache(cache_file)
+    except (OSError, ValueError, struct.error):
+        pass
+
+    player, rows, cols, cells = read_stage_cells(stage_file)
+    rocks = array("I", find_all(cells, ROCK))
+    labels, count = label_trees(cells, cols)
+    groups = group_trees(labels, count, cells)
+    try:
+        write_stage_cache(cache_file, player, rows, cols, cells, rocks, cells.count(MUSHROOM), labels, groups)
+    except OSError:
+        pass # the stage can still be played without a cache
+    return Stage.from_cells(rows, cols, cells, Player(*player), rocks=rocks, mushrooms=cells.count(MUSHROOM), tree_labels=labels,
+        tree_groups=groups)
+
+def write_stage_cache(cache_file, player, rows, cols, cells, rocks, mushrooms, labels, groups):
+    '''
+    Writes a cache entry for a parsed stage and deletes the entries of older versions of the same stage file. The tree groups are
+    saved as the cells of every tree, group after group, followed by the offset at which every group starts (and one past the last).
+    '''
+    directory, name = os.path.split(cache_file)
+    os.makedirs(directory, exist_ok=True)
+    temporary_file = cache_file + f".{os.getpid()}.tmp"
+    trees, offsets = array("I"), array("I", [0])
+    for group in groups:
+        trees.extend(group)
+        offsets.append(len(trees))
+    with open(temporary_file, "wb") as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, rows, cols, player[0], player[1], mushrooms, len(rocks), len(groups), len(trees)))
+        f.write(cells)
+        f.write(rocks.tobytes())
+        f.write(labels.tobytes())
+        f.write(trees.tobytes())
+        f.write(offsets.tobytes())
+    os.replace(temporary_file, cache_file) # readers never see a half-written entry
+
+    stage_name = name.rsplit(".", 2)[0]
+    for other in os.listdir(directory):
+        if other != name and other.endswith(".bin") and other.rsplit(".", 2)[0] == stage_name:
+            os.remove(os.path.join(directory, other))
+
+def read_stage_cache(cache_file):
+    '''Builds the Stage saved in a cache entry. Raises OSError if there is no entry and ValueError if it is not valid.'''
+    with open(cache_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        magic, rows, cols, x, y, mushrooms, rock_count, group_count, tree_count = CACHE_HEADER.unpack_from(m)
+        size = rows * cols
+        if magic != CACHE_MAGIC or len(m) != CACHE_HEADER.size + size + 4 * (rock_count + size + tree_count + group_count + 1):
+            raise ValueError(f"{cache_file} is not a valid stage cache entry")
+        start = CACHE_HEADER.size
+        cells = m[start:start + size]
+        rocks, labels, trees, offsets = array("I"), array("I"), array("I"), array("I")
+        start += size
+        for part, length in ((rocks, rock_count), (labels, size), (trees, tree_count), (offsets, group_count + 1)):
+            part.frombytes(m[start:start + 4 * length])
+            start += 4 * length
+    groups = [trees[offsets[k]:offsets[k + 1]].tolist() for k in range(group_count)]
+    return Stage.from_cells(rows, cols, cells, Player(x, y), rocks=rocks, mushrooms=mushrooms, tree_labels=labels, tree_groups=groups)
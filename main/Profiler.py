@@ -0,0 +1,158 @@
+import cProfile, functools, pstats, sys, time
+from collections import Counter
+from contextlib import contextmanager
+try:
+    from main.Stage import Stage, TREE, MUSHROOM, ROCK, WATER, clamp
+    from main.Renderer import Renderer
+except ModuleNotFoundError as m:
+    from Stage import Stage, TREE, MUSHROOM, ROCK, WATER, clamp
+    from Renderer import Renderer
+
+# the methods timed by Instrumentation, by class
+INSTRUMENTED = ((Stage, ("move", "run", "fast_forward", "step", "end_move", "can_move_here", "scorch", "chop", "split_trees",
+    "tree_index", "set_tile", "set_under_rock", "end_turn", "replay", "undo", "redo", "reset", "initialize_state", "snapshot", "restore",
+    "clear_modify")), (Renderer, ("draw",)))
+# row and column offsets of the moves, as in Stage.can_move_here
+DIRECTIONS = {"W": (-1, 0), "A": (0, -1), "S": (1, 0), "D": (0, 1)}
+# number of lines of cProfile statistics printed by profiled
+STATS_LINES = 30
+
+class Instrumentation:
+    '''
+    Counts the calls to the methods of Stage (and Renderer.draw) listed in INSTRUMENTED and the time spent in them, along with what
+    the moves did to the tiles they ran into (rock pushes, pavings, chops, burns, mushroom and item pickups, ...).
+
+    Nothing in Stage knows about it: while it is enabled, the methods are replaced on their classes by wrappers that count and time
+    them, and disabling it puts the original methods back. So a game played without it runs exactly the code it always does, at no
+    cost at all, and it can be turned on around any part of a program (it is also a context manager). The time of a method includes
+    the time of the methods it calls, as cProfile's cumulative time does.
+
+    Attributes:
+        - calls (Counter) - number of calls to every method, by "Class.method" name
+        - seconds (Counter) - seconds spent in every method, by the same names
+        - events (Counter) - number of times each thing happened to a tile (see count_tiles)
+        - originals (list) - the (class, name, method) of every method replaced while enabled
+    '''
+    def __init__(self):
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.events = Counter()
+        self.originals = []
+
+    @property
+    def enabled(self):
+        return bool(self.originals)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def enable(self):
+        '''Replaces the methods in INSTRUMENTED with wrappers that count and time them.'''
+        if self.enabled:
+            return
+        for cls, names in INSTRUMENTED:
+            for name in names:
+                method = cls.__dict__[name]
+                self.originals.append((cls, name, method))
+                if name == "can_move_here":
+                    method = self.count_tiles(method)
+                elif name == "step":
+                    method = self.count_pickups(method)
+                setattr(cls, name, self.timed(f"{cls.__name__}.{name}", method))
+
+    def disable(self):
+        '''Puts the original methods back.'''
+        while self.originals:
+            cls, name, method = self.originals.pop()
+            setattr(cls, name, method)
+
+    def timed(self, name, method):
+        '''Returns a wrapper of method that counts its calls and time under name.'''
+        calls, seconds, clock = self.calls, self.seconds, time.perf_counter
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - started
+                calls[name] += 1
+        return wrapper
+
+    def count_tiles(self, can_move_here):
+        '''Returns a wrapper of Stage.can_move_here that counts what happens to the tile the Player moves into.'''
+        events = self.events
+        @functools.wraps(can_move_here)
+        def wrapper(stage, direction, x, y):
+            dy, dx = DIRECTIONS.get(direction, (0, 0))
+            cols = stage.cols
+            ty, tx = clamp(y + dy, 0, stage.rows - 1), clamp(x + dx, 0, cols - 1)
+            tile, inv = stage.cells[ty * cols + tx], stage.pl.inv
+            beyond = stage.cells[clamp(ty + dy, 0, stage.rows - 1) * cols + clamp(tx + dx, 0, cols - 1)]
+            moved = can_move_here(stage, direction, x, y)
+            if not moved:
+                events["blocked moves"] += 1
+            elif tile == ROCK:
+                events["pavings" if beyond == WATER else "rock pushes"] += 1
+            elif tile == TREE:
+                events["chops" if inv in ("x", "🪓") else "burns"] += 1
+            elif tile == MUSHROOM:
+                events["mushroom pickups"] += 1
+            elif tile == WATER:
+                events["drownings"] += 1
+            return moved
+        return wrapper
+
+    def count_pickups(self, step):
+        '''Returns a wrapper of Stage.step that counts the items picked up with P.'''
+        events = self.events
+        @functools.wraps(step)
+        def wrapper(stage, move, y, x):
+            holding = stage.pl.inv
+            result = step(stage, move, y, x)
+            if move == "P" and stage.pl.inv != holding:
+                events["item pickups"] += 1
+            return result
+        return wrapper
+
+    def summary(self):
+        '''Returns the counts and times as a table, the slowest methods first, followed by the tile counts.'''
+        lines = [f"{'method':<28}{'calls':>12}{'total':>14}{'per call':>14}"]
+        for name, seconds in self.seconds.most_common():
+            calls = self.calls[name]
+            lines.append(f"{name:<28}{calls:>12}{seconds * 1000:>12.3f}ms{seconds / calls * 1e6:>12.3f}us")
+        if self.events:
+            lines.append("")
+            lines.extend(f"{event:<28}{count:>12}" for event, count in sorted(self.events.items()))
+        return "\n".join(lines) + "\n"
+
+@contextmanager
+def profiled(mode, profile_file=None, out=None):
+    '''
+    Profiles the code run in the with block, and then writes what was found to out (sys.stderr if None):
+        - with mode "summary", the Instrumentation summary;
+        - with mode "cprofile", the STATS_LINES functions with the most cumulative time according to cProfile. The statistics are also
+          saved to profile_file if given, for pstats or other viewers.
+    '''
+    if mode == "summary":
+        instrumentation = Instrumentation()
+        try:
+            with instrumentation:
+                yield instrumentation
+        finally:
+            (out or sys.stderr).write(instrumentation.summary())
+    elif mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            with profiler:
+                yield profiler
+        finally:
+            if profile_file:
+                profiler.dump_stats(profile_file)
+            pstats.Stats(profiler, stream=out or sys.stderr).sort_stats("cumulative").print_stats(STATS_LINES)
+    else:
+        raise ValueError(f"unknown profiling mode {mode!r}")
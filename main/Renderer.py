@@ -0,0 +1,98 @@
+import shutil, sys
+try:
+    from main.Stage import Stage, clamp
+except ModuleNotFoundError as m:
+    from Stage import Stage, clamp
+
+# emoji of every tile code stored in Stage.cells
+TILE_EMOJIS = {ord(tile): emoji for tile, emoji in Stage.EMOJIS.items()}
+
+def follow(position, start, size, total):
+    '''
+    Returns the first index of a viewport of size tiles along one axis (out of total tiles) so that position is inside it.
+
+    The viewport only moves when position gets within a quarter of its size from one of its edges, and it is then centred on position,
+    so walking back and forth does not scroll the screen on every move.
+    '''
+    margin = size // 4
+    if position < start + margin or position >= start + size - margin:
+        start = position - size // 2
+    return clamp(start, 0, total - size)
+
+class Renderer:
+    '''
+    Draws a Stage in the terminal, rewriting only the cells that changed since the last frame.
+
+    Only the part of the stage that fits in the terminal (the viewport) is drawn. It covers the whole stage if the stage is small enough,
+    and otherwise follows the Player (see follow). Every emoji is two columns wide, so the cell at (y, x) is written at column
+    2(x - left) + 1 of the (y - top)-th line of the frame. Between two frames the menu (lines_below lines) is printed under the grid;
+    it is cleared on every frame so that it can be printed again.
+
+    Attributes:
+        - lines_below (int) - number of lines printed under the grid between two frames
+        - frame (list of bytes or None) - the rows of the viewport drawn in the last frame; None when the next frame has to be drawn in full
+        - top (int) - row of the stage shown on the first line of the viewport
+        - left (int) - column of the stage shown on the first column of the viewport
+        - terminal_size (os.terminal_size) - the size of the terminal when the last frame was drawn
+        - row_cache (dict) - maps a row of the stage to the (left, tiles, line) triple it was last drawn with
+        - out (file or None) - where the frames are written; sys.stdout if None
+    '''
+    def __init__(self, lines_below=16, out=None):
+        self.lines_below = lines_below
+        self.frame = None
+        self.top = self.left = 0
+        self.terminal_size = None
+        self.row_cache = {}
+        self.out = out
+
+    def invalidate(self):
+        '''Makes the next frame a full redraw, e.g. after the stage is reset.'''
+        self.frame = None
+
+    def viewport_size(self, stage, terminal_size):
+        '''Returns the number of rows and columns of stage that fit in a terminal of terminal_size along with the menu.'''
+        return (min(stage.rows, max(1, terminal_size.lines - self.lines_below - 1)),
+            min(stage.cols, max(1, terminal_size.columns // 2)))
+
+    def draw(self, stage, first):
+        '''Draws the current state of stage. first is True if nothing has been drawn yet, so there is nothing to move the cursor over.'''
+        out = self.out or sys.stdout
+        terminal_size = shutil.get_terminal_size()
+        height, width = self.viewport_size(stage, terminal_size)
+        top = follow(stage.pl.y, self.top, height, stage.rows)
+        left = follow(stage.pl.x, self.left, width, stage.cols)
+        rows = [stage.cells[start:start + width] for start in range(top * stage.cols + left, (top + height) * stage.cols, stage.cols)]
+
+        full = (first or self.frame is None or terminal_size != self.terminal_size or (top, left) != (self.top, self.left)
+            or len(rows) != len(self.frame) or len(rows[0]) != len(self.frame[0]))
+        if full:
+            if not first:
+                out.write(f"\033[{len(self.frame or rows) + self.lines_below}F\033[J")
+            for y, tiles in enumerate(rows, top):
+                out.write(self.render_row(y, left, tiles) + "\n")
+        else:
+            out.write(f"\033[{height + self.lines_below}F") # move to the first line of the frame
+            line = 0
+            for r, (tiles, drawn) in enumerate(zip(rows, self.frame)):
+                if tiles == drawn:
+                    continue
+                if r > line:
+                    out.write(f"\033[{r - line}E")
+                    line = r
+                for x in range(width):
+                    if tiles[x] != drawn[x]:
+                        out.write(f"\033[{2 * x + 1}G{TILE_EMOJIS[tiles[x]]}")
+            out.write(f"\033[{height - line}E\033[J") # move below the frame and clear the menu
+        out.flush()
+        self.frame = rows
+        self.top, self.left = top, left
+        self.terminal_size = terminal_size
+
+    def render_row(self, y, left, tiles):
+        '''Returns the emoji line of tiles, the part of row y of the stage that starts at column left, reusing the last one if unchanged.'''
+        cached = self.row_cache.get(y)
+        if cached is not None and cached[0] == left and cached[1] == tiles:
+            return cached[2]
+        line = "".join(map(TILE_EMOJIS.__getitem__, tiles))
+        self.row_cache[y] = (left, tiles, line)
+        return line
@@ -0,0 +1,107 @@
+try:
+    from main.Stage import Stage
+    from main.Status import Status
+except ModuleNotFoundError as m:
+    from Stage import Stage
+    from Status import Status
+
+# stands for every invalid move when the moves are given one call at a time; they all do the same thing
+INVALID_MOVE = "?"
+
+def replayed_moves(move_sequence, single_call):
+    '''
+    Returns the moves of move_sequence that can change how it plays out, in upper case.
+
+    If single_call is True the sequence is played in a single call to Stage.move, which stops at the first invalid move. Otherwise
+    every move is a call of its own (as with the -m option), so invalid moves are kept but all become INVALID_MOVE.
+    '''
+    moves = []
+    for move in move_sequence:
+        move = move.upper()
+        if move not in Stage.VALID_MOVES:
+            if single_call:
+                break
+            move = INVALID_MOVE
+        moves.append(move)
+    return moves
+
+def build_trie(move_sequences, single_call=True):
+    '''
+    Returns the root of a trie of the replayed_moves of move_sequences.
+
+    Every node is a [children, ends] pair, where children maps a move to the next node and ends lists the indices of the sequences
+    that end at the node.
+    '''
+    root = [{}, []]
+    for index, move_sequence in enumerate(move_sequences):
+        node = root
+        for move in replayed_moves(move_sequence, single_call):
+            node = node[0].setdefault(move, [{}, []])
+        node[1].append(index)
+    return root
+
+def trie_ends(node):
+    '''Yields the indices of the sequences that end at node or below it.'''
+    stack = [node]
+    while stack:
+        children, ends = stack.pop()
+        yield from ends
+        stack.extend(children.values())
+
+def replay_batch(stage, move_sequences, single_call=True):
+    '''
+    Plays every sequence in move_sequences from the current state of stage, simulating each prefix they share only once.
+
+    The sequences are put in a trie (see build_trie) which is walked depth-first. The state of the stage is saved with
+    Stage.checkpoint at every node where the sequences part ways (or where one of them ends) and put back with Stage.rollback before
+    the next branch is played. With single_call, the moves of a node are played with Stage.step and a sequence that ends is finished
+    with Stage.end_move, so each one plays out exactly as stage.move(sequence, ...) would; otherwise each move is a call to Stage.move.
+    Once the game is won or lost, every sequence below the node ends there. The stage is left in the state it was given in.
+
+    Returns a triple (states, steps, scratch_steps) where states[i] is the Stage.snapshot after move_sequences[i], steps is the
+    number of moves simulated and scratch_steps is the number of moves that replaying every sequence on its own would simulate.
+    '''
+    states = [None] * len(move_sequences)
+    steps = scratch_steps = 0
+    start = stage.checkpoint()
+    # every entry is (checkpoint to roll back to first or None, move to play or None, node reached by it, depth, last move, y, x)
+    todo = [(None, None, build_trie(move_sequences, single_call), 0, "", stage.pl.y, stage.pl.x)]
+    while todo:
+        restore, move, node, depth, last_move, y, x = todo.pop()
+        if restore is not None:
+            stage.rollback(restore)
+        if move is not None:
+            steps += 1
+            if single_call:
+                y, x = stage.step(move, y, x)
+                last_move = move
+            else:
+                stage.move(move, stage.pl.y, stage.pl.x)
+
+        children, ends = node
+        if stage.outcome != Status.ONGOING or not children:
+            # no later move is played, so every sequence below ends here
+            if single_call:
+                stage.end_move(last_move, y, x)
+            state = stage.snapshot()
+            for index in trie_ends(node):
+                states[index] = state
+                scratch_steps += depth
+            continue
+
+        saved = stage.checkpoint() if len(children) > 1 or (ends and single_call) else None
+        if ends:
+            if single_call:
+                stage.end_move(last_move, y, x)
+            state = stage.snapshot()
+            for index in ends:
+                states[index] = state
+                scratch_steps += depth
+            if single_call:
+                stage.rollback(saved)
+        branches = list(children.items())
+        for k in range(len(branches) - 1, -1, -1):
+            # the first branch is played next, right from the state of this node
+            todo.append((saved if k else None, branches[k][0], branches[k][1], depth + 1, last_move, y, x))
+    stage.rollback(start)
+    return states, steps, scratch_steps
@@ -0,0 +1,94 @@
+import csv, glob, hashlib, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+try:
+    from main.Analyzer import Analyzer
+    from main.Processing import load_stage
+    from main.Status import Status
+except ModuleNotFoundError as m:
+    from Analyzer import Analyzer
+    from Processing import load_stage
+    from Status import Status
+
+# columns of the results written by write_results
+RESULT_FIELDS = ("stage", "moves", "outcome", "mushrooms", "grid_hash", "seconds", "error")
+
+# the Stages loaded by a worker process of run_corpus, keyed by stage file
+worker_stages = {}
+
+def grid_hash(stage):
+    '''Returns the SHA-256 hex digest of the grid of stage as the -o option writes it.'''
+    return hashlib.sha256("\n".join("".join(row) for row in stage.grid).encode()).hexdigest()
+
+def read_moves(moves_file):
+    '''Returns the string of player moves in moves_file, as it would be given to the -m option (line breaks are dropped).'''
+    with open(moves_file) as file:
+        return "".join(file.read().split())
+
+def run_pair(pair, stop_unwinnable=False):
+    '''
+    Plays the moves of a move file on a stage file as the -m option does, in a worker process of run_corpus.
+
+    Every worker loads a stage file once and resets the Stage before each later run. Returns the result as a dict of RESULT_FIELDS,
+    where seconds is the time spent playing and error describes why the run failed (empty if it did not).
+
+    If stop_unwinnable is True, the run stops as soon as an Analyzer finds that the stage can no longer be won, and its outcome is
+    UNWINNABLE (with the mushrooms and grid of the stage at that point). Undoing or resetting the stage can make it winnable again, so
+    this is only checked after the last !, U or R of the moves.
+    '''
+    stage_file, moves_file = pair
+    result = dict.fromkeys(RESULT_FIELDS, "")
+    result.update(stage=os.path.basename(stage_file), moves=os.path.basename(moves_file))
+    try:
+        moves = read_moves(moves_file)
+        stage = worker_stages.get(stage_file)
+        if stage is None:
+            stage = worker_stages[stage_file] = load_stage(stage_file)
+        started = time.perf_counter()
+        stage.reset()
+        unwinnable = False
+        if stop_unwinnable:
+            analyzer = Analyzer(stage)
+            last_rewind = max((n for n, move in enumerate(moves) if move.upper() in ("!", "U", "R")), default=-1)
+        for n, move in enumerate(moves):
+            stage.move(move, stage.pl.y, stage.pl.x)
+            if stop_unwinnable and n > last_rewind and analyzer.update() == Status.UNWINNABLE:
+                unwinnable = True
+                break
+        result["seconds"] = round(time.perf_counter() - started, 6)
+    except (OSError, ValueError) as e:
+        result["outcome"], result["error"] = "ERROR", str(e)
+        return result
+    result["outcome"] = "UNWINNABLE" if unwinnable else "CLEAR" if stage.outcome == Status.WIN else "NOT CLEAR"
+    result["mushrooms"] = stage.mushrooms
+    result["grid_hash"] = grid_hash(stage)
+    return result
+
+def run_corpus(stage_dir, moves_dir, workers=None, chunk_size=16, stop_unwinnable=False):
+    '''
+    Plays every move file (*.txt) in moves_dir on every stage file (*.txt) in stage_dir using a pool of worker processes.
+
+    Yields the run_pair result of every pair as soon as it is known, in order of stage file and then move file. The pairs are handed
+    out in chunks of chunk_size, so a worker usually plays many move files on a stage it has already loaded. stop_unwinnable is passed
+    on to run_pair.
+    '''
+    pairs = [(stage_file, moves_file) for stage_file in sorted(glob.glob(os.path.join(stage_dir, "*.txt")))
+        for moves_file in sorted(glob.glob(os.path.join(moves_dir, "*.txt")))]
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(partial(run_pair, stop_unwinnable=stop_unwinnable), pairs, chunksize=chunk_size)
+
+def write_results(results, output_file):
+    '''Writes results to output_file as JSON lines if its name ends in .jsonl, and as CSV otherwise. Returns the number of results.'''
+    count = 0
+    with open(output_file, "w", newline="") as file:
+        if output_file.endswith(".jsonl"):
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+                count += 1
+        else:
+            writer = csv.DictWriter(file, RESULT_FIELDS)
+            writer.writeheader()
+            for result in results:
+                writer.writerow(result)
+                count += 1
+    return count
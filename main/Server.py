@@ -0,0 +1,90 @@
+import asyncio, json, sys
+try:
+    from main.Engine import ChangeTracker, load_stage, tracked_changes, state_message
+except ModuleNotFoundError as m:
+    from Engine import ChangeTracker, load_stage, tracked_changes, state_message
+
+# longest line of moves a client may send; a longer one ends the session
+MAX_LINE = 64 * 1024
+
+class GameServer:
+    '''
+    Hosts many games of the same stage at once, one Stage per connection (a session), over TCP or a Unix socket.
+
+    Messages are JSON objects, one per line. On connecting, a client gets the whole stage ("rows", "cols" and "cells", the tiles row
+    after row) with the state_message of its Stage. Every line the client sends then is played as one call to Stage.move, as a line
+    entered at the prompt of the game would be, and the server answers with the new state_message and "changes", the [cell, tile]
+    pairs of the cells that changed (found from the journal of the Stage, with tracked_changes). A message with an "error" is the last one of a session.
+
+    A session reads its next line only once its last answer has been written out (see asyncio.StreamWriter.drain), so a client that
+    stops reading stops being served instead of making the server buffer its answers. Sessions that send nothing for idle_timeout
+    seconds are closed, and so are sessions whose client takes in none of its answers for as long (it might keep sending lines and
+    never read them). Clients that connect while max_sessions sessions are open are turned away.
+
+    Attributes:
+        - template (Stage) - the stage played in every session; it is never played itself
+        - max_sessions (int) - maximum number of sessions open at once
+        - idle_timeout (float) - seconds a session may stay silent before it is closed
+        - sessions (dict) - maps the StreamWriter of every open session to its Stage
+        - server (asyncio.Server or None) - the listening server, once started
+    '''
+    def __init__(self, template, max_sessions=64, idle_timeout=300):
+        self.template = template
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        '''Starts listening on a Unix socket at path if given, and on (host, port) otherwise. Returns the asyncio.Server.'''
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle, path, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        return self.server
+
+    async def send(self, writer, message):
+        '''
+        Writes message to writer as one line and waits until the client has taken in enough of what it was sent. Raises
+        asyncio.TimeoutError if it takes in nothing for idle_timeout seconds.
+        '''
+        writer.write(json.dumps(message).encode() + b"\n")
+        await asyncio.wait_for(writer.drain(), self.idle_timeout)
+
+    async def handle(self, reader, writer):
+        '''Plays one session, from the connection of the client until it leaves, idles out or breaks the protocol.'''
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                await self.send(writer, {"error": f"the server is full ({self.max_sessions} sessions)"})
+                return
+            stage = self.sessions[writer] = self.template.fresh()
+            tracker, known = ChangeTracker(stage), bytearray(stage.cells) # the cells as the client last saw them
+            await self.send(writer, state_message(stage, rows=stage.rows, cols=stage.cols, cells=stage.cells.decode()))
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    await self.send(writer, {"error": f"no moves for {self.idle_timeout} seconds"})
+                    return
+                except ValueError: # the line is longer than MAX_LINE
+                    await self.send(writer, {"error": f"lines of moves are limited to {MAX_LINE} bytes"})
+                    return
+                if not line:
+                    return
+                stage.move(line.decode(errors="replace").rstrip("\r\n"), stage.pl.y, stage.pl.x)
+                await self.send(writer, state_message(stage, changes=tracked_changes(tracker, known)))
+        except ConnectionError:
+            pass # the client left without reading its answers
+        except asyncio.TimeoutError:
+            writer.transport.abort() # the client stopped reading its answers, so they are dropped instead of flushed on close
+        finally:
+            self.sessions.pop(writer, None)
+            writer.close()
+
+async def serve(stage_file, host="127.0.0.1", port=8765, path=None, max_sessions=64, idle_timeout=300, use_cache=True):
+    '''Hosts sessions of stage_file until the process is stopped.'''
+    server = GameServer(load_stage(stage_file, use_cache), max_sessions, idle_timeout)
+    async with await server.start(host, port, path) as listening:
+        for socket in listening.sockets:
+            sys.stderr.write(f"[serve] listening on {socket.getsockname()}\n")
+        await listening.serve_forever()
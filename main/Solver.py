@@ -0,0 +1,168 @@
+import heapq, os, time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import count
+try:
+    from main.Stage import Stage, MUSHROOM
+    from main.Player import Player
+    from main.Status import Status
+except ModuleNotFoundError as m:
+    from Stage import Stage, MUSHROOM
+    from Player import Player
+    from Status import Status
+
+SEARCH_MOVES = ("W", "A", "S", "D", "P")
+
+def mushroom_distance(stage, mushroom_cells):
+    '''
+    Heuristic for the search: the Manhattan distance from the Player to the farthest mushroom that has not been collected yet.
+
+    Every move shifts the Player by at most one tile and every remaining mushroom has to be walked onto, so this never overestimates.
+    '''
+    farthest = 0
+    for i in mushroom_cells:
+        if stage.cells[i] == MUSHROOM:
+            y, x = divmod(i, stage.cols)
+            farthest = max(farthest, abs(y - stage.pl.y) + abs(x - stage.pl.x))
+    return farthest
+
+def successors(stage, state):
+    '''
+    Yields a (move, key, new_state) triple for every move in SEARCH_MOVES that can be played from state without losing, where key is
+    the Stage.state_key of new_state.
+
+    The moves are played with Stage.move, so the search follows exactly the same rules as the game. stage is left in new_state
+    right after each triple is yielded.
+    '''
+    for move in SEARCH_MOVES:
+        stage.restore(state)
+        if move == "P" and (stage.curr_tile not in ("x", "*") or stage.pl.inv):
+            # picking up only does something while standing on an item with empty hands
+            continue
+        stage.move(move, stage.pl.y, stage.pl.x)
+        if stage.outcome == Status.LOSE:
+            continue
+        yield move, stage.state_key(), stage.snapshot()
+
+def trace_moves(parent, key):
+    '''Rebuilds the move string that leads to the state with key by following parent, which maps a state key to its (previous key, move) pair.'''
+    moves = []
+    while parent[key] is not None:
+        key, move = parent[key]
+        moves.append(move)
+    return "".join(reversed(moves))
+
+def solve(stage, max_nodes=1_000_000, time_limit=None):
+    '''
+    Searches for the shortest move sequence that wins the stage, starting from the current state of stage.
+
+    It runs A* over game states (Stage.snapshot, identified by Stage.state_key) using mushroom_distance as its heuristic. Successors are generated by playing each move
+    with Stage.move one at a time (as the -m option does), so every sequence it finds plays out the same way in the game. The stage
+    is left in the state it was given in.
+
+    Returns a pair (moves, expanded) where moves is the winning move string (None if the search failed or ran out of nodes or time) and
+    expanded is the number of states that were expanded.
+    '''
+    start_key = stage.state_key()
+    start = stage.snapshot()
+    mushroom_cells = [i for i, tile in enumerate(stage.cells) if tile == MUSHROOM]
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    tie = count()
+
+    parent = {start_key: None} # maps a state key to the (previous key, move) pair that reached it with the lowest cost
+    cost = {start_key: 0}
+    frontier = [(mushroom_distance(stage, mushroom_cells), next(tie), 0, start_key, start)]
+    expanded = 0
+    try:
+        while frontier:
+            _, _, g, key, state = heapq.heappop(frontier)
+            if g > cost[key]:
+                # a cheaper path to this state was found after it was queued
+                continue
+            if state[4] == Status.WIN:
+                return trace_moves(parent, key), expanded
+            if expanded >= max_nodes or (deadline is not None and expanded % 256 == 0 and time.monotonic() > deadline):
+                break
+            expanded += 1
+            for move, new_key, new_state in successors(stage, state):
+                if g + 1 < cost.get(new_key, g + 2):
+                    cost[new_key] = g + 1
+                    parent[new_key] = (key, move)
+                    heapq.heappush(frontier, (g + 1 + mushroom_distance(stage, mushroom_cells), next(tie), g + 1, new_key, new_state))
+        return None, expanded
+    finally:
+        stage.restore(start)
+
+# the Stage used by a worker process of solve_parallel
+worker_stage = None
+
+def init_worker(rows, cols, cells, x, y):
+    '''Builds the Stage that the worker process expands states with.'''
+    global worker_stage
+    worker_stage = Stage.from_cells(rows, cols, cells, Player(x, y))
+
+def expand_chunk(states):
+    '''
+    Expands a chunk of states in a worker process.
+
+    Returns a triple (children, pid, seconds) where children lists an (index of the parent in states, move, key, new_state) tuple for
+    every successor, pid identifies the worker and seconds is the time spent expanding.
+    '''
+    started = time.perf_counter()
+    children = [(index, move, key, new_state) for index, state in enumerate(states)
+        for move, key, new_state in successors(worker_stage, state)]
+    return children, os.getpid(), time.perf_counter() - started
+
+def solve_parallel(stage, workers=None, max_nodes=1_000_000, time_limit=None, chunk_size=64):
+    '''
+    Searches for the shortest move sequence that wins the stage using a pool of worker processes.
+
+    It runs a breadth-first search one level at a time. Each level is cut into chunks of chunk_size states that are handed to whichever
+    worker is free next, so a worker that finishes early picks up the remaining work instead of idling. Workers generate successors
+    with Stage.move (through successors); the visited state keys are kept by the calling process in a single dict, which also
+    records how every state was reached. The time limit is checked whenever a chunk comes back (or would have), and the chunks not
+    started yet are cancelled once it has passed.
+
+    Returns a triple (moves, expanded, stats) where moves and expanded are as in solve, and stats maps the pid of each worker to the
+    (states expanded, seconds spent) pair it reported.
+    '''
+    start_key = stage.state_key()
+    start = stage.snapshot()
+    workers = workers or os.cpu_count()
+    parent = {start_key: None} # maps every state key visited to the (previous key, move) pair that reached it first
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    stats = {}
+    expanded = 0
+    if start[4] == Status.WIN:
+        return "", expanded, stats
+
+    frontier = [(start_key, start)]
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(stage.rows, stage.cols, stage.original_cells,
+        stage.original_pl.x, stage.original_pl.y)) as pool:
+        while frontier and expanded < max_nodes:
+            frontier = frontier[:max_nodes - expanded]
+            pending = {pool.submit(expand_chunk, [state for _, state in frontier[i:i + chunk_size]]): i
+                for i in range(0, len(frontier), chunk_size)}
+            next_frontier = []
+            while pending:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, _ = wait(pending, timeout, return_when=FIRST_COMPLETED)
+                if deadline is not None and time.monotonic() >= deadline:
+                    pool.shutdown(cancel_futures=True)
+                    return None, expanded, stats
+                for future in done:
+                    offset = pending.pop(future)
+                    children, pid, seconds = future.result()
+                    chunk = min(chunk_size, len(frontier) - offset)
+                    nodes, total = stats.get(pid, (0, 0.0))
+                    stats[pid] = (nodes + chunk, total + seconds)
+                    expanded += chunk
+                    for index, move, key, new_state in children:
+                        if key in parent:
+                            continue
+                        parent[key] = (frontier[offset + index][0], move)
+                        if new_state[4] == Status.WIN:
+                            pool.shutdown(cancel_futures=True)
+                            return trace_moves(parent, key), expanded, stats
+                        next_frontier.append((key, new_state))
+            frontier = next_frontier
+    return None, expanded, stats
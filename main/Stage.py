@@ -1,5 +1,8 @@
 import sys
-from copy import deepcopy
+from array import array
+from collections import deque
+from copy import copy
+from functools import lru_cache
 try:
     from main.Status import Status
 except ModuleNotFoundError as m:
@@ -9,13 +12,129 @@ def clamp(value, min_value, max_value):
     '''Returns value if min_value <= value <= max_value; min_value if value < min_value; and max_value if value > max_value.'''
     return max(min_value, min(value, max_value))
 
+# byte codes of the tiles stored in Stage.cells; each tile is stored as the ASCII code of its symbol in the stage file
+EMPTY, PLAYER, TREE, MUSHROOM, ROCK, WATER, PAVED, AXE, FLAMETHROWER = b".LT+R~-x*"
+
+MASK_64 = (1 << 64) - 1
+STATE_TAG = 1 << 63 # keeps the keys of the Player's position apart from the keys of the tiles
+
+def mix64(value):
+    '''Scrambles value into a well-spread 64-bit int (the splitmix64 finalizer), used to derive Zobrist keys without storing a table.'''
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+@lru_cache(maxsize=1 << 16)
+def tile_key(i, tile):
+    '''Zobrist key of tile being in cell i.'''
+    return mix64(i << 8 | tile)
+
+@lru_cache(maxsize=1 << 12)
+def under_key(i, tile):
+    '''Zobrist key of tile being under the rock in cell i (tile codes are ASCII, so setting the top bit keeps them apart from tile_key).'''
+    return mix64(i << 8 | 0x80 | tile)
+
+def find_all(cells, tile):
+    '''Returns the indices of every cell that holds tile.'''
+    found = []
+    i = cells.find(tile)
+    while i != -1:
+        found.append(i)
+        i = cells.find(tile, i + 1)
+    return found
+
+def neighbours(i, cols):
+    '''Returns the cells above, below, left and right of cell i; cells past the left or right edge are -1, the others may be out of range.'''
+    row_start = i - i % cols
+    return (i - cols, i + cols, i - 1 if i > row_start else -1, i + 1 if i + 1 < row_start + cols else -1)
+
+def label_trees(cells, cols):
+    '''
+    Labels the groups of orthogonally connected trees in cells, which are burned together by the flamethrower.
+
+    Returns a pair (labels, count) where labels is an array holding, for every cell, 0 if it is not a tree and otherwise the number
+    (from 1 to count) of the group the tree belongs to.
+    '''
+    labels = array("I", bytes(4 * len(cells)))
+    count = 0
+    for start in find_all(cells, TREE):
+        if labels[start]:
+            continue
+        count += 1
+        labels[start] = count
+        stack = [start]
+        while stack:
+            for j in neighbours(stack.pop(), cols):
+                if 0 <= j < len(cells) and cells[j] == TREE and not labels[j]:
+                    labels[j] = count
+                    stack.append(j)
+    return labels, count
+
+def group_trees(labels, count, cells):
+    '''Returns a list holding, for every label from 0 to count of label_trees, the cells of the trees with that label.'''
+    groups = [[] for _ in range(count + 1)]
+    for i in find_all(cells, TREE):
+        groups[labels[i]].append(i)
+    return groups
+
+# tiles that walking onto changes nothing but the Player's position and curr_tile, so runs of moves can skip over them
+TRIVIAL_TILES = bytes((EMPTY, PAVED, AXE, FLAMETHROWER, PLAYER))
+
+@lru_cache(maxsize=1 << 10)
+def compile_moves(move_sequence):
+    '''
+    Compiles a move string into a tuple of (move, count) runs of the same move in upper case, up to its first invalid move (where
+    Stage.move stops reading).
+    '''
+    runs = []
+    for move in move_sequence:
+        move = move.upper()
+        if move not in Stage.VALID_MOVES:
+            break
+        if runs and runs[-1][0] == move:
+            runs[-1][1] += 1
+        else:
+            runs.append([move, 1])
+    return tuple((move, count) for move, count in runs)
+
+def encode_grid(grid):
+    '''Converts a grid (2D list of str) into a flat bytearray of tile codes, indexed by y * cols + x.'''
+    return bytearray("".join("".join(row) for row in grid), "ascii")
+
 class Stage:
     '''
     Class for the Stage, the object of the Shroom Raider game.
 
+    The stage is stored as a flat bytearray of tile codes (cells), where the tile at (y, x) is cells[y * cols + x]. It is what is
+    shown on the screen and written by -o. The tile that each rock is on, which comes back when the rock is pushed away, is kept in
+    under_rock, a bytearray of the same size holding 0 where there is no rock, and the cells of the rocks are kept in rocks, so that
+    pushing a rock is a few array writes and the rocks can be listed without scanning the stage. grid and original_grid are built
+    from cells on request so that callers can keep treating the stage as a 2D list of str.
+
+    Every move is played as part of a turn: the moves between two calls to move (or up to an undo, redo or reset). Each turn is
+    journaled in history as a [before, changes, after] list, where before and after are the values of scalars around the turn and
+    changes lists the (is_under_rock, cell, old tile, new tile) writes made by set_tile and set_under_rock. Undoing, redoing and
+    resetting the stage replay these writes, so they cost O(changes) instead of O(rows * cols).
+
+    The groups of connected trees are indexed (tree_labels, tree_groups and tree_sizes) so that the flamethrower burns a whole group
+    without searching for it. Chopping a tree can split its group, which is handled in split_trees by searching only the smaller
+    pieces. Undoing, redoing or restoring a state can bring trees back, so the index is then dropped and rebuilt on its next use.
+
     Attributes:
-        - original_grid (2D list of str) - the original state of the stage
-        - grid (2D list of str) - the stage that the Player is currently playing
+        - original_cells (bytes) - the original state of the stage
+        - cells (bytearray) - the stage that the Player is currently playing
+        - grid (2D list of str) - read-only view of cells
+        - original_grid (2D list of str) - read-only view of original_cells
+        - original_rocks (sequence of int) - the cells of the rocks in the original stage
+        - original_under_rock (bytes) - the under_rock of the original stage
+        - original_tree_labels (array) - the label_trees labels of the original stage
+        - original_tree_groups (list of list) - the group_trees groups of the original stage
+        - tree_labels (array or None) - the group of every tree currently in the stage, as in label_trees (None if it has to be rebuilt)
+        - tree_groups (list of list) - the cells of every group; a cell whose tree_labels differs from the group is no longer in it
+        - tree_sizes (list of int) - number of trees in every group
+        - rows (int) - number of rows in the stage
+        - cols (int) - number of columns in the stage
         - original_pl (Player) - the original Player object containing details about the Player's initial position and inventory
         - pl (Player) - Player object, containing details about the Player's position and inventory
         - outcome (Status) - describes whether the game is still ongoing or has been won or lost
@@ -23,105 +142,470 @@ class Stage:
         - win_condition (int) - count of total mushrooms in the grid
         - curr_tile (str) - the tile that the Player is currently on
         - last_tile (str) - the previous tile that the Player was on
-        - rock_tile (dict) - the tiles under all rocks in the map
+        - under_rock (bytearray) - the tile under the rock in every cell that has one, 0 in the others
+        - rocks (set of int) - the cells of the rocks; kept up to date by set_under_rock
+        - zobrist (int or None) - XOR of the Zobrist keys of every tile and of the tile under every rock; kept up to date by set_tile and set_under_rock
+          once state_key has been called, and None before that
+        - turn (list or None) - the turn being played, if any
+        - history (deque of list) - the turns played, oldest first
+        - redo_stack (list of list) - the turns undone, most recently undone last
+        - history_size (int) - number of writes journaled in history
+        - history_limit (int) - maximum value of history_size; the oldest turns are forgotten past it
+        - history_complete (bool) - whether history goes back to the original state, so that reset can undo all of it
+        - forgotten_turns (int) - number of turns forgotten from the start of history since it was last cleared
         - EMOJIS (dict) - UI representation of the ASCII symbols used in the grid
-        - VALID_MOVES (set of str) - set of valid characters in the user's input for movement 
+        - VALID_MOVES (set of str) - set of valid characters in the user's input for movement
     '''
+    __slots__ = ("original_cells", "original_rocks", "original_under_rock", "original_tree_labels", "original_tree_groups", "cells", "rows", "cols", "original_pl", "pl", "outcome", "mushrooms", "win_condition",
+        "curr_tile", "last_tile", "under_rock", "rocks", "zobrist", "turn", "history", "redo_stack", "history_size", "history_limit",
+        "history_complete", "forgotten_turns", "tree_labels", "tree_groups", "tree_sizes")
+
     EMOJIS = {'.': '　', 'L': '👩', 'T': '🌲', '+': '🍄', 'R': '🪨', '~': '🟦', '-': '⬜', 'x': '🪓', '*': '🔥'}
-    VALID_MOVES = set(("W", "S", "A", "D", "P", "!"))
-    def __init__(self, grid, pl):
-        self.original_grid = grid
+    VALID_MOVES = set(("W", "S", "A", "D", "P", "!", "U", "R"))
+    def __init__(self, grid, pl, history_limit=1_000_000):
+        self.setup(len(grid), len(grid[0]), encode_grid(grid), pl, history_limit)
+
+    @classmethod
+    def from_cells(cls, rows, cols, cells, pl, history_limit=1_000_000, rocks=None, mushrooms=None, tree_labels=None, tree_groups=None):
+        '''
+        Builds a Stage straight from the tile codes of its rows (e.g. from Processing.read_stage_cells), without building a grid.
+
+        rocks (the cells of the rocks), mushrooms (the number of mushrooms), and tree_labels and tree_groups (see label_trees and
+        group_trees; either both or neither) can be given if they are already known, e.g. from the stage cache, so that the stage does
+        not have to be scanned for them.
+        '''
+        stage = cls.__new__(cls)
+        stage.setup(rows, cols, cells, pl, history_limit, rocks, mushrooms, tree_labels, tree_groups)
+        return stage
+
+    def fresh(self):
+        '''Returns a new Stage in the original state of this one, sharing its parsed original stage instead of scanning it again.'''
+        return Stage.from_cells(self.rows, self.cols, self.original_cells, copy(self.original_pl), self.history_limit, self.original_rocks,
+            self.win_condition, self.original_tree_labels, self.original_tree_groups)
+
+    def setup(self, rows, cols, cells, pl, history_limit, rocks=None, mushrooms=None, tree_labels=None, tree_groups=None):
+        '''Sets up the original stage and starts the game; see from_cells.'''
+        self.rows = rows
+        self.cols = cols
+        self.original_cells = bytes(cells)
+        self.original_rocks = rocks if rocks is not None else find_all(self.original_cells, ROCK)
+        under_rock = bytearray(len(self.original_cells))
+        for i in self.original_rocks:
+            under_rock[i] = EMPTY
+        self.original_under_rock = bytes(under_rock)
+        if tree_labels is None:
+            tree_labels, count = label_trees(self.original_cells, cols)
+            tree_groups = group_trees(tree_labels, count, self.original_cells)
+        self.original_tree_labels = tree_labels
+        self.original_tree_groups = tree_groups
+        self.win_condition = mushrooms if mushrooms is not None else self.original_cells.count(MUSHROOM)
         self.original_pl = pl
-        self.initialize_state(self.original_grid, self.original_pl)
-    
-    def initialize_state(self, grid, pl):
+        self.history_limit = history_limit
+        self.initialize_state(self.original_cells, self.original_pl)
+
+    @property
+    def grid(self):
+        return [list(self.cells[i:i + self.cols].decode()) for i in range(0, len(self.cells), self.cols)]
+
+    @property
+    def original_grid(self):
+        return [list(self.original_cells[i:i + self.cols].decode()) for i in range(0, len(self.original_cells), self.cols)]
+
+    def initialize_state(self, cells, pl):
         '''Initializes the game state.'''
-        self.grid = deepcopy(grid)
-        self.rows = len(self.grid)
-        self.cols = len(self.grid[0])
-        self.pl = deepcopy(pl)
-        self.grid[self.pl.y][self.pl.x] = "L"
+        self.cells = bytearray(cells)
+        self.pl = copy(pl)
+        self.cells[self.pl.y * self.cols + self.pl.x] = PLAYER
         self.outcome = Status.ONGOING
         self.mushrooms = 0
         self.curr_tile = self.last_tile = "."
-        self.rock_tile = {(y, x) : "." for y in range(self.rows) for x in range(self.cols) if self.grid[y][x] == "R"}
-        self.win_condition = sum(sum(tile == "+" for tile in row) for row in self.grid)
+        self.under_rock = bytearray(self.original_under_rock)
+        self.rocks = set(self.original_rocks)
+        self.zobrist = None
+        self.tree_labels = array("I", self.original_tree_labels)
+        self.tree_groups = list(self.original_tree_groups) # the groups themselves are never changed, only replaced
+        self.tree_sizes = [len(group) for group in self.tree_groups]
+        self.forget_history()
+        self.history_complete = True
+
+    def forget_history(self):
+        '''Clears the history, e.g. when the state is replaced by something that cannot be undone.'''
+        self.turn = None
+        self.history = deque()
+        self.redo_stack = []
+        self.history_size = 0
+        self.history_complete = False
+        self.forgotten_turns = 0
+
+    def compute_zobrist(self):
+        '''Computes the Zobrist hash of the tiles from scratch.'''
+        zobrist = 0
+        for i, tile in enumerate(self.cells):
+            zobrist ^= tile_key(i, tile)
+        for i in self.rocks:
+            zobrist ^= under_key(i, self.under_rock[i])
+        return zobrist
+
+    def state_key(self):
+        '''
+        Returns a 64-bit int identifying the current game state, so that two states can be compared in O(1).
+
+        The Zobrist hash of the tiles is computed on the first call and then updated by every tile change; the Player's position,
+        inventory, the tiles it is on and the outcome are mixed in on each call.
+        '''
+        if self.zobrist is None:
+            self.zobrist = self.compute_zobrist()
+        player = ord(self.pl.inv[:1] or "\0") << 24 | ord(self.curr_tile) << 16 | ord(self.last_tile) << 8 | self.outcome.value
+        return self.zobrist ^ mix64(mix64(STATE_TAG | self.pl.y * self.cols + self.pl.x) ^ player)
+
+    def set_tile(self, i, tile):
+        '''Writes tile into cell i, keeping the Zobrist hash up to date and journaling the write if a turn is being played.'''
+        if self.zobrist is not None:
+            self.zobrist ^= tile_key(i, self.cells[i]) ^ tile_key(i, tile)
+        if self.turn is not None:
+            self.turn[1].append((False, i, self.cells[i], tile))
+        self.cells[i] = tile
+
+    def set_under_rock(self, i, tile):
+        '''
+        Records tile as the tile under the rock in cell i (0 if the cell no longer has a rock), keeping rocks and the Zobrist hash up to
+        date and journaling the write if a turn is being played. Returns the tile that was under the rock before.
+        '''
+        old = self.under_rock[i]
+        if self.zobrist is not None:
+            self.zobrist ^= (under_key(i, old) if old else 0) ^ (under_key(i, tile) if tile else 0)
+        if self.turn is not None:
+            self.turn[1].append((True, i, old, tile))
+        self.under_rock[i] = tile
+        if tile:
+            self.rocks.add(i)
+        else:
+            self.rocks.discard(i)
+        return old
+
+    def scalars(self):
+        '''Returns the parts of the game state that are not stored in the grid.'''
+        return self.pl.x, self.pl.y, self.pl.inv, self.outcome, self.mushrooms, self.curr_tile, self.last_tile
+
+    def set_scalars(self, scalars):
+        '''Puts back the values returned by scalars.'''
+        self.pl.x, self.pl.y, self.pl.inv, self.outcome, self.mushrooms, self.curr_tile, self.last_tile = scalars
+
+    def end_turn(self, y, x):
+        '''Ends the turn being played, which started with the Player at (y, x): puts the Player back on the grid and journals the turn.'''
+        cells = self.cells
+        start = y * self.cols + x
+        if cells[start] != ROCK:
+            self.set_tile(start, ord(self.last_tile))
+        here = self.pl.y * self.cols + self.pl.x
+        self.last_tile = chr(cells[here])
+        self.set_tile(here, PLAYER)
+
+        turn, self.turn = self.turn, None
+        turn[2] = self.scalars()
+        self.history.append(turn)
+        self.history_size += len(turn[1])
+        self.redo_stack.clear()
+        while self.history and self.history_size > self.history_limit:
+            self.history_size -= len(self.history.popleft()[1])
+            self.history_complete = False
+            self.forgotten_turns += 1
+
+    def replay(self, changes, undo):
+        '''Writes the new tiles of changes, or the old tiles in reverse order if undo is True.'''
+        for under_rock, i, old, new in (reversed(changes) if undo else changes):
+            if under_rock:
+                self.set_under_rock(i, old if undo else new)
+            else:
+                if TREE in (old, new):
+                    self.tree_labels = None
+                self.set_tile(i, old if undo else new)
+
+    def undo(self):
+        '''Undoes the last turn in the history. Returns False if there is nothing to undo.'''
+        if not self.history:
+            return False
+        turn = self.history.pop()
+        self.history_size -= len(turn[1])
+        self.replay(turn[1], True)
+        self.set_scalars(turn[0])
+        self.redo_stack.append(turn)
+        return True
+
+    def redo(self):
+        '''Plays again the last turn that was undone. Returns False if there is nothing to redo.'''
+        if not self.redo_stack:
+            return False
+        turn = self.redo_stack.pop()
+        self.replay(turn[1], False)
+        self.set_scalars(turn[2])
+        self.history.append(turn)
+        self.history_size += len(turn[1])
+        return True
+
+    def reset(self):
+        '''Puts the Stage back into its original state by undoing the whole history, or with initialize_state if it is incomplete.'''
+        if self.history_complete:
+            while self.undo():
+                pass
+            self.redo_stack.clear()
+        else:
+            self.initialize_state(self.original_cells, self.original_pl)
+
+    def snapshot(self):
+        '''Returns a hashable tuple describing the whole game state, which can be given back to restore.'''
+        return (bytes(self.cells), self.pl.x, self.pl.y, self.pl.inv, self.outcome, self.mushrooms, self.curr_tile, self.last_tile,
+            frozenset((i, self.under_rock[i]) for i in self.rocks), self.zobrist)
+
+    def restore(self, state):
+        '''Puts the Stage back into a state returned by snapshot.'''
+        cells, self.pl.x, self.pl.y, self.pl.inv, self.outcome, self.mushrooms, self.curr_tile, self.last_tile, rocks, self.zobrist = state
+        self.cells = bytearray(cells)
+        for i in self.rocks:
+            self.under_rock[i] = 0
+        self.rocks = set()
+        for i, tile in rocks:
+            self.under_rock[i] = tile
+            self.rocks.add(i)
+        self.tree_labels = None
+        self.forget_history()
+
+    def checkpoint(self):
+        '''Returns what rollback needs to put the Stage back into its current state, including the history and an unfinished turn.'''
+        turn = self.turn and [self.turn[0], list(self.turn[1]), None]
+        return self.snapshot(), turn, tuple(self.history), tuple(self.redo_stack), self.history_size, self.history_complete
+
+    def rollback(self, checkpoint):
+        '''Puts the Stage back into a state returned by checkpoint.'''
+        state, turn, history, redo_stack, history_size, history_complete = checkpoint
+        self.restore(state)
+        self.turn = turn and [turn[0], list(turn[1]), None]
+        self.history = deque(history)
+        self.redo_stack = list(redo_stack)
+        self.history_size = history_size
+        self.history_complete = history_complete
 
     def move(self, move_sequence, y, x):
         '''
         Moves the character in the grid of Stage according to the input in move_sequence.
-        
+
         It iterates over each input and checks whether each movement/action is valid. If it is invalid, it halts. Otherwise, the iteration completes
-        and leads to a change in Stage outcome.
+        and leads to a change in Stage outcome. U undoes the last turn (the moves given in the last call, or since the last undo, redo or reset)
+        and R redoes the last turn that was undone.
+
+        The input is first compiled into runs of the same move (see compile_moves), and runs of moves that walk are played by run,
+        which skips over the tiles where walking changes nothing else.
         '''
         last_move = ""
-        for move in move_sequence:
-            if move.upper() not in Stage.VALID_MOVES:
-                # invalid move; stop iterating any further
-                break
+        for move, count in compile_moves(move_sequence):
             if self.outcome != Status.ONGOING:
                 # player has either won or lost; stop iterating any further
                 break
             last_move = move
-            if move.upper() in ("W", "S", "A", "D"):
-                if self.can_move_here(move.upper(), self.pl.x, self.pl.y):
-                    match move.upper():
-                        case 'W':
-                            self.pl.y = clamp(self.pl.y - 1, 0, self.rows - 1)
-                        case 'A':
-                            self.pl.x = clamp(self.pl.x - 1, 0, self.cols - 1)
-                        case 'S':
-                            self.pl.y = clamp(self.pl.y + 1, 0, self.rows - 1)
-                        case 'D':
-                            self.pl.x = clamp(self.pl.x + 1, 0, self.cols - 1)
-                        case _:
-                            pass
-                self.curr_tile = self.grid[self.pl.y][self.pl.x] if self.grid[self.pl.y][self.pl.x] != "L" else self.curr_tile
-            elif move.upper() == "P":
-                if self.curr_tile not in (".", "-") and not self.pl.inv:
-                    self.pl.inv = Stage.EMOJIS[self.curr_tile]
-                    self.grid[self.pl.y][self.pl.x] = "."
-                    self.curr_tile = "."
-                    self.last_tile = "."
-            elif move == "!":
-                self.initialize_state(self.original_grid, self.original_pl)
-                y, x = self.original_pl.y, self.original_pl.x
+            y, x = self.run(move, count, y, x) if count > 1 else self.step(move, y, x)
+        self.end_move(last_move, y, x)
+
+    def run(self, move, count, y, x):
+        '''
+        Plays move count times in a row as part of a call to move in which the Player started at (y, x), stopping if the game ends.
+        Returns the new starting point of the call (see step).
+
+        Walking over TRIVIAL_TILES is fast-forwarded by fast_forward. Once a move leaves the Player where it was without changing any
+        tile or the inventory (e.g. against a tree or the edge of the stage), playing it again would not change anything either, so
+        the rest of the run is skipped.
+        '''
+        walking = move in ("W", "S", "A", "D")
+        while count and self.outcome == Status.ONGOING:
+            if walking and count > 1:
+                count -= self.fast_forward(move, count)
+                if not count:
+                    break
+            before = (self.pl.x, self.pl.y, self.pl.inv, self.turn and len(self.turn[1]))
+            y, x = self.step(move, y, x)
+            count -= 1
+            if walking and before == (self.pl.x, self.pl.y, self.pl.inv, self.turn and len(self.turn[1])):
+                break
+        return y, x
+
+    def fast_forward(self, move, count):
+        '''
+        Walks the Player up to count tiles towards move for as long as the tiles ahead are TRIVIAL_TILES and the stage does not end,
+        scanning the row or column at once. Returns the number of moves played, which leave the game exactly as playing them one at a
+        time with step would.
+        '''
+        if self.turn is None:
+            self.turn = [self.scalars(), [], None]
+        match move:
+            case 'W':
+                delta, limit = -self.cols, self.pl.y
+            case 'S':
+                delta, limit = self.cols, self.rows - 1 - self.pl.y
+            case 'A':
+                delta, limit = -1, self.pl.x
+            case _:
+                delta, limit = 1, self.cols - 1 - self.pl.x
+        steps = min(count, limit)
+        if not steps:
+            return 0
+        i = self.pl.y * self.cols + self.pl.x
+        stop = i + delta * (steps + 1)
+        ahead = self.cells[i + delta:stop if stop >= 0 else None:delta]
+        walked = ahead[:len(ahead) - len(ahead.lstrip(TRIVIAL_TILES))]
+        if walked:
+            y, x = divmod(i + delta * len(walked), self.cols)
+            self.pl.y, self.pl.x = y, x
+            # the Player's own tile is the only one that does not change curr_tile
+            stepped = walked.rstrip(b"L")
+            if stepped:
+                self.curr_tile = chr(stepped[-1])
+        return len(walked)
+
+    def step(self, move, y, x):
+        '''
+        Plays a single valid move as part of a call to move in which the Player started at (y, x), where the Player stays on the grid
+        until the end of the call. Returns the starting point of the rest of the call, which is moved by !, U and R.
+        '''
+        if move in ("W", "S", "A", "D", "P") and self.turn is None:
+            self.turn = [self.scalars(), [], None]
+        if move in ("W", "S", "A", "D"):
+            if self.can_move_here(move, self.pl.x, self.pl.y):
+                match move:
+                    case 'W':
+                        self.pl.y = clamp(self.pl.y - 1, 0, self.rows - 1)
+                    case 'A':
+                        self.pl.x = clamp(self.pl.x - 1, 0, self.cols - 1)
+                    case 'S':
+                        self.pl.y = clamp(self.pl.y + 1, 0, self.rows - 1)
+                    case 'D':
+                        self.pl.x = clamp(self.pl.x + 1, 0, self.cols - 1)
+                    case _:
+                        pass
+            tile = self.cells[self.pl.y * self.cols + self.pl.x]
+            self.curr_tile = chr(tile) if tile != PLAYER else self.curr_tile
+        elif move == "P":
+            if self.curr_tile not in (".", "-") and not self.pl.inv:
+                self.pl.inv = Stage.EMOJIS[self.curr_tile]
+                self.set_tile(self.pl.y * self.cols + self.pl.x, EMPTY)
+                self.curr_tile = "."
+                self.last_tile = "."
+        elif move == "!":
+            if self.turn is not None:
+                # roll back the unfinished turn, which is not in the history yet
+                turn, self.turn = self.turn, None
+                self.replay(turn[1], True)
+                self.set_scalars(turn[0])
+            self.reset()
+            y, x = self.original_pl.y, self.original_pl.x
+        elif move in ("U", "R"):
+            if self.turn is not None:
+                self.end_turn(y, x)
+            self.undo() if move == "U" else self.redo()
+            y, x = self.pl.y, self.pl.x
+        return y, x
+
+    def end_move(self, last_move, y, x):
+        '''Ends a call to move in which the Player started at (y, x) and last_move was the last move played.'''
         if last_move != "!":
             # update the state of the grid
             if self.mushrooms == self.win_condition:
                 self.outcome = Status.WIN # player has collected all mushrooms in the stage
-            self.grid[y][x] = self.last_tile if self.grid[y][x] != "R" else "R"
-            self.last_tile = self.grid[self.pl.y][self.pl.x]
-            self.grid[self.pl.y][self.pl.x] = "L"
-        
+            if self.turn is not None:
+                self.end_turn(y, x)
+
     def clear_modify(self, new_grid, first):
         '''Formats the terminal to display the state of the new grid by clearing lines.'''
         if not first:
-            for _ in range(len(self.grid) + 16):
+            for _ in range(len(new_grid) + 16):
                 sys.stdout.write("\033[F")  # Move cursor up one line
                 sys.stdout.write("\033[K")  # Clear line from cursor to end
         nice = [[Stage.EMOJIS[a] for a in b] for b in new_grid]
         for line in nice:
             sys.stdout.write("".join(line) + "\n")
         sys.stdout.flush()
-        
+
     def scorch(self, y, x):
         '''
         Activates when Player runs into a tree with a flamethrower in inventory.
-        
-        It scans for all trees connected to the initial tree using iterative depth-first search and converts them to empty tiles.
-        '''
-        stack = [(y, x)]
-        visited = {(y, x)}
-        possible_moves = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-        while len(stack) > 0:
-            starting_y, starting_x = stack.pop()
-            self.grid[starting_y][starting_x] = '.'
-            for dy, dx in possible_moves:
-                current_y, current_x = starting_y + dy, starting_x + dx
-                if 0 <= current_y < self.rows and 0 <= current_x < self.cols and self.grid[current_y][current_x] == 'T' and (current_y, current_x) not in visited:
-                    visited.add((current_y, current_x))
-                    stack.append((current_y, current_x))
+
+        It converts all trees connected to the initial tree to empty tiles, taking them from the tree index instead of searching for them.
+        '''
+        labels = self.tree_index()
+        label = labels[y * self.cols + x]
+        for i in self.tree_groups[label]:
+            if labels[i] == label:
+                labels[i] = 0
+                self.set_tile(i, EMPTY)
+        self.tree_sizes[label] = 0
+
+    def chop(self, i):
+        '''Activates when Player runs into a tree with an axe in inventory: converts the tree in cell i to an empty tile.'''
+        if self.tree_labels is not None:
+            label = self.tree_labels[i]
+            self.tree_labels[i] = 0
+            self.tree_sizes[label] -= 1
+            self.split_trees(i, label)
+        self.set_tile(i, EMPTY)
+
+    def tree_index(self):
+        '''Returns tree_labels, rebuilding the tree index from the current stage first if it was dropped.'''
+        if self.tree_labels is None:
+            labels, count = label_trees(self.cells, self.cols)
+            self.tree_groups = group_trees(labels, count, self.cells)
+            self.tree_sizes = [len(group) for group in self.tree_groups]
+            self.tree_labels = labels
+        return self.tree_labels
+
+    def split_trees(self, i, label):
+        '''
+        Updates the tree index after the tree in cell i was removed from the group with label, which may have split it.
+
+        A search is started from every tree next to cell i and the searches take one step each in turn. Two searches that meet are
+        merged, and a search that runs out of trees has found a separate piece, which gets a new label. Once a single search is left,
+        it is the rest of the group and keeps label, so the cost is proportional to the pieces split off rather than the whole group.
+        '''
+        labels, cols = self.tree_labels, self.cols
+        pieces = [] # a (stack, seen) pair for every search still running
+        for j in neighbours(i, cols):
+            if 0 <= j < len(labels) and labels[j] == label and not any(j in seen for _, seen in pieces):
+                pieces.append(([j], {j}))
+        while len(pieces) > 1:
+            for piece in list(pieces):
+                if not any(other is piece for other in pieces) or len(pieces) == 1:
+                    continue
+                stack, seen = piece
+                if not stack:
+                    # this piece is no longer connected to the rest of the group
+                    pieces.remove(piece)
+                    new_label = len(self.tree_groups)
+                    self.tree_groups.append(list(seen))
+                    self.tree_sizes.append(len(seen))
+                    self.tree_sizes[label] -= len(seen)
+                    for j in seen:
+                        labels[j] = new_label
+                    continue
+                for j in neighbours(stack.pop(), cols):
+                    if 0 <= j < len(labels) and labels[j] == label and j not in seen:
+                        other = next((other for other in pieces if j in other[1]), None)
+                        if other is not None:
+                            # both searches are in the same piece; carry on with the other one
+                            pieces.remove(piece)
+                            other[0].extend(stack)
+                            other[1].update(seen)
+                            stack, seen = piece = other
+                        else:
+                            seen.add(j)
+                            stack.append(j)
+
+    def tree_group(self, y, x):
+        '''Returns the cells of the trees that the flamethrower would burn from the tree at (y, x) (none if there is no tree there).'''
+        labels = self.tree_index()
+        label = labels[y * self.cols + x]
+        return [i for i in self.tree_groups[label] if labels[i] == label] if label else []
+
+    def tree_group_size(self, y, x):
+        '''Returns the number of trees that the flamethrower would burn from the tree at (y, x), without changing the stage.'''
+        label = self.tree_index()[y * self.cols + x]
+        return self.tree_sizes[label] if label else 0
 
     def can_move_here(self, direction, x, y):
         '''Analyzes the move to be committed by Player and checks its validity according to tile value and context.'''
@@ -141,46 +625,114 @@ class Stage:
                 y_chk = clamp(y - 1, 0, self.rows - 1)
             case _:
                 pass
-        match self.grid[y][x]:
-            case '.' | '-' | 'x' | '*' | 'L':
+        cells = self.cells
+        i, i_chk = y * self.cols + x, y_chk * self.cols + x_chk
+        tile = cells[i]
+        if tile in (EMPTY, PAVED, AXE, FLAMETHROWER, PLAYER):
+            return True
+        elif tile == TREE:
+            # can move to Tree tile if Player has an axe
+            if self.pl.inv in ("x", "🪓"):
+                self.chop(i)
+                self.pl.inv = ''
                 return True
-            case 'T':
-                # can move to Tree tile if Player has an axe 
-                if self.pl.inv in ("x", "🪓"):
-                    self.grid[y][x] = '.'
-                    self.pl.inv = ''
-                    return True
-                # can move to Tree tile if Player has a flamethrower; if so, burn the trees connected to the tile the Player is moving to 
-                if self.pl.inv in ("*", "🔥"):
-                    self.scorch(y, x)
-                    self.pl.inv = ''
-                    return True
-                return False
-            case '~':
-                # Player loses
-                self.outcome = Status.LOSE
-                return True       
-            case 'R':
-                # check if the tile the rock will be moved to is empty, paved, or water
-                if self.grid[y_chk][x_chk] in ('.', '-', 'L'):
-                    self.grid[y][x] = self.rock_tile[(y, x)]
-                    self.rock_tile.pop((y, x))
-                    self.rock_tile[(y_chk, x_chk)] = self.grid[y_chk][x_chk]
-                    self.grid[y_chk][x_chk] = 'R'
-                    return True
-                elif self.grid[y_chk][x_chk] == '~':
-                    self.grid[y][x] = self.rock_tile[(y, x)]
-                    self.rock_tile.pop((y, x))
-                    self.grid[y_chk][x_chk] = '-'
-                    return True
-                else:
-                    return False
-            case '+':
-                # pick up the mushroom
-                self.mushrooms += 1
-                if self.mushrooms == self.win_condition:
-                    self.outcome = Status.WIN
-                self.grid[y][x] = '.'
+            # can move to Tree tile if Player has a flamethrower; if so, burn the trees connected to the tile the Player is moving to
+            if self.pl.inv in ("*", "🔥"):
+                self.scorch(y, x)
+                self.pl.inv = ''
+                return True
+            return False
+        elif tile == WATER:
+            # Player loses
+            self.outcome = Status.LOSE
+            return True
+        elif tile == ROCK:
+            # check if the tile the rock will be moved to is empty, paved, or water
+            if cells[i_chk] in (EMPTY, PAVED, PLAYER):
+                self.set_tile(i, self.set_under_rock(i, 0))
+                self.set_under_rock(i_chk, cells[i_chk])
+                self.set_tile(i_chk, ROCK)
+                return True
+            elif cells[i_chk] == WATER:
+                self.set_tile(i, self.set_under_rock(i, 0))
+                self.set_tile(i_chk, PAVED)
                 return True
-            case _: # default case; should never be reached
-                sys.exit()
\ No newline at end of file
+            else:
+                return False
+        elif tile == MUSHROOM:
+            # pick up the mushroom
+            self.mushrooms += 1
+            if self.mushrooms == self.win_condition:
+                self.outcome = Status.WIN
+            self.set_tile(i, EMPTY)
+            return True
+        else: # default case; should never be reached
+            sys.exit()
+
+class ChangeTracker:
+    '''
+    Follows the journal of a Stage to tell which cells were written since it last looked, so that whatever is kept up to date with
+    the cells (Analyzer, DistanceField) only has to look at those instead of comparing the whole stage.
+
+    It keeps its own copy of the turns in the history as it was when it last looked. The turns now in the history that are not in the
+    copy were played or redone since then, and the turns of the copy that are no longer in the history were undone, even if the redo
+    stack was cleared since (as ! does). Both are found from the newest turn down, so looking costs O(writes of those turns) rather
+    than O(rows * cols). The writes of an unfinished turn are reported too, and again on the next look in case it was rolled back.
+
+    It cannot tell what changed if the cells were replaced without being journaled (restore, rollback, or a reset that calls
+    initialize_state), which replaces the history, or if none of the turns it had are left and turns were forgotten since, as they
+    may have been forgotten rather than undone (and turns played since may have been forgotten before it saw them).
+
+    Attributes:
+        - stage (Stage) - the stage followed
+        - history (deque of list) - the Stage.history it last looked at
+        - turns (deque of list) - the turns of that history when it last looked, oldest first
+        - seen (set of int) - the id of every turn in turns
+        - forgotten_turns (int) - the Stage.forgotten_turns when it last looked
+        - pending (list or None) - the unfinished turn when it last looked, if any
+    '''
+    __slots__ = ("stage", "history", "turns", "seen", "forgotten_turns", "pending")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.mark()
+
+    def mark(self):
+        '''Starts following the journal from its current state, e.g. once whatever follows it was brought up to date from scratch.'''
+        self.history = self.stage.history
+        self.turns = deque(self.history)
+        self.seen = set(map(id, self.turns))
+        self.forgotten_turns = self.stage.forgotten_turns
+        self.pending = self.stage.turn
+
+    def written_cells(self):
+        '''
+        Returns the set of cells that may have been written since the last call (or mark), or None if that cannot be told, in which
+        case the caller has to start over from the current cells and call mark.
+        '''
+        stage, turns, seen = self.stage, self.turns, self.seen
+        if stage.history is not self.history:
+            return None
+        played, last = [], None
+        for turn in reversed(stage.history):
+            if id(turn) in seen:
+                last = turn
+                break
+            played.append(turn)
+        if last is None and stage.forgotten_turns != self.forgotten_turns:
+            return None
+        undone = []
+        while turns and turns[-1] is not last:
+            undone.append(turns.pop())
+            seen.discard(id(undone[-1]))
+        for turn in reversed(played):
+            turns.append(turn)
+            seen.add(id(turn))
+        while len(turns) > len(stage.history):
+            seen.discard(id(turns.popleft())) # forgotten at the other end of the history
+        written = {i for turn in played + undone for under_rock, i, old, new in turn[1] if not under_rock}
+        for turn in (self.pending, stage.turn):
+            if turn is not None:
+                written.update(i for under_rock, i, old, new in turn[1] if not under_rock)
+        self.forgotten_turns, self.pending = stage.forgotten_turns, stage.turn
+        return written
@@ -4,4 +4,5 @@ class Status(Enum):
     '''Enum describing the current state of the Game.'''
     WIN = auto()
     LOSE = auto()
-    ONGOING = auto()
\ No newline at end of file
+    ONGOING = auto()
+    UNWINNABLE = auto() # still ongoing, but no longer winnable; only reported by Analyzer, never stored in Stage.outcome
\ No newline at end of file
@@ -1,20 +1,19 @@
-from termcolor import colored
-import argparse
+import argparse, os, sys, time
 
-from Player import Player
-from Stage import Stage
-from Processing import read_stage_file
+# only the headless engine is imported up front; the terminal UI, the solver and the batch tools are imported by the commands that
+# use them, so that non-interactive runs (-m, -o) start as fast as possible
+from Processing import load_stage
 from Status import Status
 
-def main_menu(stage_file, moves, output_file):
+def main_menu(stage_file, moves, output_file, use_cache = True):
     if not stage_file:
         stage_file = r"stage-files/stage-file-default.txt"
 
-    player_location, stage = read_stage_file(stage_file)
-    level = Stage(stage, Player(*player_location))
+    level = load_stage(stage_file, use_cache)
     
     skipped = False
     first = True
+    amount_moves = 0
 
     if moves:
         for move in moves:
@@ -24,8 +23,16 @@ def main_menu(stage_file, moves, output_file):
             level.move(a, level.pl.y, level.pl.x)
             first = False
     else:
+        from termcolor import colored
+        from Renderer import Renderer
+        from Analyzer import Analyzer
+        renderer = Renderer(lines_below=19)
+        analyzer = Analyzer(level)
+        field = None # the DistanceField behind H, built the first time a hint is asked for
+        hint = ""
+
         while not skipped and level.outcome == Status.ONGOING:
-            level.clear_modify(level.grid, first)
+            renderer.draw(level, first)
             
             a = input(f"""
 Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold", "underline"])}
@@ -37,20 +44,36 @@ Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold
 4. D - Move {colored("Right", "cyan", attrs=["bold"])}
 5. P - Pick Up Item
 6. ! - {colored("Reset Stage", "yellow", attrs=["bold"])}
+7. U - Undo Last Moves
+8. R - Redo Last Undone Moves
+9. H - {colored("Hint", "magenta", attrs=["bold"])}
                 
 {colored("[i] Number of Mushrooms Collected:", "red", attrs=["bold"])} {level.mushrooms} / {level.win_condition} 🍄
 {colored(f"[i] Item Currently Standing On: {level.EMOJIS[level.curr_tile] if level.curr_tile in "x*" else ""}", "blue", attrs=["bold"])}
 [i] Currently Holding: {level.pl.inv}
-    
+{hint or (colored("[!] Not every mushroom can be collected any more: press ! to reset or U to undo", "red", attrs=["bold"]) if analyzer.unwinnable else "")}
 {colored("Enter moves:", "green", attrs=["bold"])} """)
+            first = False
+            if a.upper() == "H":
+                # a hint is shown instead of playing a move, so it does not count as one
+                if field is None:
+                    from Hint import DistanceField
+                    field = DistanceField(level)
+                move, distance = field.hint()
+                hint = colored(f"[i] Hint: {move} ({distance} {"move" if distance == 1 else "moves"} to the nearest mushroom)" if move
+                    else "[i] Hint: no mushroom can be reached by walking; try pushing a rock or cutting a tree", "magenta", attrs=["bold"])
+                continue
+            hint = ""
             amount_moves += 1
             skipped = True if a.upper() == "E" else False
+            if "!" in a:
+                renderer.invalidate()
             
             level.move(a, level.pl.y, level.pl.x)
-            first = False
+            analyzer.update()
         else:
             if not skipped:
-                level.clear_modify(level.grid, False)
+                renderer.draw(level, False)
                 
                 print(f"\nYou {colored("won!", "green", attrs=["bold", "underline"])}\n" if level.outcome == Status.WIN else f"\nYou {colored("lost!", "red", attrs=["underline"])}\n")
                 print(f"{colored("[i] Number of Mushrooms Collected:", "red", attrs=["bold"])} {level.mushrooms} / {level.win_condition} 🍄")
@@ -64,16 +87,214 @@ Welcome to the Main Menu of {colored("\"Shroom Runner!\"", "green", attrs=["bold
 
             file.write("\n".join(("".join(i) for i in level.grid)))
             
+def solve_stage(stage_file, max_nodes, time_limit, workers, use_cache = True):
+    if not stage_file:
+        stage_file = r"stage-files/stage-file-default.txt"
+
+    from Solver import solve, solve_parallel
+    level = load_stage(stage_file, use_cache)
+    if workers:
+        moves, expanded, stats = solve_parallel(level, workers, max_nodes, time_limit)
+        for pid, (nodes, seconds) in sorted(stats.items()):
+            sys.stderr.write(f"[worker {pid}] {nodes} states in {seconds:.2f}s ({nodes / seconds if seconds else 0:.0f} states/s)\n")
+    else:
+        moves, expanded = solve(level, max_nodes, time_limit)
+
+    if moves is None:
+        print(f"No solution found ({expanded} states searched)")
+    else:
+        print(moves)
+
+def replay_stage(stage_file, moves_file, output_file, use_cache = True):
+    if not stage_file:
+        stage_file = r"stage-files/stage-file-default.txt"
+
+    from Replay import replay_batch
+    level = load_stage(stage_file, use_cache)
+    with open(moves_file) as file:
+        move_sequences = file.read().splitlines()
+
+    # every line is played as the -m option would play it
+    states, steps, scratch_steps = replay_batch(level, move_sequences, False)
+    for state in states:
+        print("CLEAR" if state[4] == Status.WIN else "NOT CLEAR")
+    sys.stderr.write(f"[replay] {steps} moves simulated instead of {scratch_steps} ({scratch_steps - steps} saved by shared prefixes)\n")
+
+    if output_file:
+        with open(output_file, "w") as file:
+            results = []
+            for state in states:
+                grid = "\n".join(state[0][i:i + level.cols].decode() for i in range(0, len(state[0]), level.cols))
+                results.append(("CLEAR \n" if state[4] == Status.WIN else "NOT CLEAR \n") + grid)
+            file.write("\n\n".join(results))
+
+def bot_stage(stage_file, use_cache = True):
+    if not stage_file:
+        stage_file = r"stage-files/stage-file-default.txt"
+
+    from Bot import serve_jsonl
+    level = load_stage(stage_file, use_cache)
+    # os.read returns whatever the bot has sent so far, so a batch of commands is answered as soon as it arrives
+    serve_jsonl(level, iter(lambda: os.read(sys.stdin.fileno(), 1 << 16), b""), sys.stdout.buffer)
+
+def batch_stages(stage_dir, moves_dir, output_file, workers, stop_unwinnable = False):
+    from Runner import run_corpus, write_results
+    started = time.perf_counter()
+    count = write_results(run_corpus(stage_dir, moves_dir, workers, stop_unwinnable=stop_unwinnable), output_file)
+    sys.stderr.write(f"[batch] {count} runs written to {output_file} in {time.perf_counter() - started:.2f}s\n")
+
+def serve_stage(stage_file, host, port, path, max_sessions, idle_timeout, use_cache = True):
+    if not stage_file:
+        stage_file = r"stage-files/stage-file-default.txt"
+
+    import asyncio
+    from Server import serve
+    try:
+        asyncio.run(serve(stage_file, host, port, path, max_sessions, idle_timeout, use_cache))
+    except KeyboardInterrupt:
+        pass
+
+def generate_stage(output_file, rows, cols, moves_file, **options):
+    from Generator import StageGenerator
+    started = time.perf_counter()
+    generator = StageGenerator(rows, cols, **options)
+    generator.write(output_file)
+    if moves_file:
+        generator.write_moves(moves_file)
+    sys.stderr.write(f"[generate] {rows}x{cols} stage written to {output_file} in {time.perf_counter() - started:.2f}s (seed {generator.seed})\n")
+
+def bench_stages(output_file, size, repeat, seed, only, baseline_file, threshold):
+    from Benchmark import run_benchmarks, write_results
+    results = run_benchmarks(size, repeat, seed, only,
+        lambda name, result: sys.stderr.write(f"[bench] {name}: {result['seconds'] * 1000:.3f}ms for {result['operations']} ({result['per_second']:.0f}/s)\n"))
+    write_results(results, output_file)
+    sys.stderr.write(f"[bench] results written to {output_file}\n")
+    if baseline_file:
+        compare_benchmarks(baseline_file, output_file, threshold)
+
+def compare_benchmarks(baseline_file, results_file, threshold):
+    from Benchmark import read_results, compare_results, format_comparison
+    rows = compare_results(read_results(baseline_file), read_results(results_file), threshold)
+    print(format_comparison(rows, threshold))
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        sys.stderr.write(f"[bench] {len(regressions)} regression(s): {', '.join(regressions)}\n")
+        sys.exit(1)
+
+def connect(host, port, path):
+    from Client import play_remote
+    play_remote(host, port, path)
+
 def main():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-o", "--output", help="Returns the results of the game in a text file")
     parser.add_argument("-m", "--move", help="String of player moves")
     parser.add_argument("-f", "--stage", help="Use a stage file")
+    parser.add_argument("--no-cache", action="store_true", help="Parses the stage file again instead of using its cached copy")
+    parser.add_argument("--replay-batch", metavar="MOVES_FILE", help="Plays every line of MOVES_FILE as a string of player moves and prints whether each clears the stage")
+    parser.add_argument("--jsonl", action="store_true", help="Reads JSON commands (move, reset, state, snapshot, restore) from stdin, one per line, and writes a JSON response to stdout for each")
+    parser.add_argument("--solve", action="store_true", help="Prints the shortest move sequence that clears the stage")
+    parser.add_argument("--max-nodes", type=int, default=1_000_000, help="Maximum number of states searched by --solve")
+    parser.add_argument("--time-limit", type=float, help="Maximum number of seconds spent by --solve")
+    parser.add_argument("--workers", type=int, help="Number of processes used by --solve (searches in a single process if not given)")
+    parser.add_argument("--profile", choices=("summary", "cprofile"), help="Writes a profile of the run to stderr when it ends: the calls, times and tile events of the Stage methods (summary), or cProfile statistics (cprofile); worker processes are not profiled")
+    parser.add_argument("--profile-file", metavar="PSTATS_FILE", help="With --profile cprofile, also saves the statistics to PSTATS_FILE")
+
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser("batch", help="Plays every move file in a directory on every stage file in another directory")
+    batch.add_argument("stage_dir", help="Directory of stage files (*.txt)")
+    batch.add_argument("moves_dir", help="Directory of move files (*.txt), each holding a string of player moves")
+    batch.add_argument("-o", "--output", default="results.csv", help="Results file; written as JSON lines if it ends in .jsonl, as CSV otherwise")
+    batch.add_argument("--workers", type=int, help="Number of processes (one per CPU if not given)")
+    batch.add_argument("--stop-unwinnable", action="store_true", help="Stops a run as soon as the stage can no longer be won and reports it as UNWINNABLE")
+
+    serve = commands.add_parser("serve", help="Hosts games of a stage for clients connecting over TCP or a Unix socket")
+    serve.add_argument("-f", "--stage", help="Use a stage file")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    serve.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket at PATH instead of TCP")
+    serve.add_argument("--max-sessions", type=int, default=64, help="Maximum number of games played at once")
+    serve.add_argument("--idle-timeout", type=float, default=300, help="Seconds without moves after which a game is closed")
+    serve.add_argument("--no-cache", action="store_true", help="Parses the stage file again instead of using its cached copy")
+    remote = commands.add_parser("connect", help="Plays a game hosted by the serve command")
+    remote.add_argument("--host", default="127.0.0.1", help="Address of the server")
+    remote.add_argument("--port", type=int, default=8765, help="TCP port of the server")
+    remote.add_argument("--unix", metavar="PATH", help="Connect to the Unix socket at PATH instead of TCP")
+
+    generate = commands.add_parser("generate", help="Writes a random stage file, the same one for the same seed")
+    generate.add_argument("output", help="Stage file to write")
+    generate.add_argument("--rows", type=int, default=30, help="Number of rows")
+    generate.add_argument("--cols", type=int, default=30, help="Number of columns")
+    generate.add_argument("--seed", type=int, help="Seed of the random numbers (printed to stderr if not given)")
+    generate.add_argument("--forest", type=float, default=0.15, help="Probability that a cell starts a tree")
+    generate.add_argument("--cluster", type=float, default=0.5, help="Probability that a cell next to a tree continues it (below 1); the higher, the larger the groups of trees")
+    generate.add_argument("--rocks", type=float, default=0.03, help="Probability that a cell without a tree holds a rock")
+    generate.add_argument("--water", type=float, default=0.03, help="Probability that a cell without a tree holds water")
+    generate.add_argument("--mushrooms", type=int, default=10, help="Number of mushrooms")
+    generate.add_argument("--axes", type=int, default=0, help="Number of axes")
+    generate.add_argument("--flamethrowers", type=int, default=0, help="Number of flamethrowers")
+    generate.add_argument("--carve", action="store_true", help="Generates the stage around a path from the Player that collects every mushroom, so that it can be cleared")
+    generate.add_argument("--wander", type=int, default=3, help="Most columns the carved path moves sideways in a row")
+    generate.add_argument("--moves", metavar="MOVES_FILE", help="With --carve, also writes the moves that walk the path (and clear the stage) to MOVES_FILE")
+
+    bench = commands.add_parser("bench", help="Measures the engine on small and generated huge stages, or compares two such measurements")
+    bench_commands = bench.add_subparsers(dest="bench_command", required=True)
+    bench_run = bench_commands.add_parser("run", help="Runs the benchmarks and writes their results to a JSON file")
+    bench_run.add_argument("-o", "--output", default="bench.json", help="Results file")
+    bench_run.add_argument("--size", type=int, default=1000, help="Number of rows and columns of the generated huge stages")
+    bench_run.add_argument("--repeat", type=int, default=5, help="Number of times every benchmark is run (the fastest run is kept)")
+    bench_run.add_argument("--seed", type=int, default=0, help="Seed of the generated stages")
+    bench_run.add_argument("--only", help="Only runs the benchmarks whose names contain ONLY (e.g. move/ or huge)")
+    bench_run.add_argument("--baseline", metavar="BASELINE_FILE", help="Then compares the results with BASELINE_FILE, as bench compare does")
+    bench_run.add_argument("--threshold", type=float, default=0.25, help="Largest slowdown per operation, as a fraction, that is not a regression")
+    bench_compare = bench_commands.add_parser("compare", help="Compares results with a baseline; exits with status 1 if any benchmark regressed")
+    bench_compare.add_argument("baseline", help="Results file of the baseline")
+    bench_compare.add_argument("results", help="Results file to compare with it")
+    bench_compare.add_argument("--threshold", type=float, default=0.25, help="Largest slowdown per operation, as a fraction, that is not a regression")
 
     args = parser.parse_args()
 
-    main_menu(args.stage, args.move, args.output)
+    if args.profile:
+        from Profiler import profiled
+        with profiled(args.profile, args.profile_file):
+            run_command(parser, args)
+    else:
+        run_command(parser, args)
+
+def run_command(parser, args):
+    '''Runs the command or mode chosen by the arguments.'''
+    if args.command == "batch":
+        batch_stages(args.stage_dir, args.moves_dir, args.output, args.workers, args.stop_unwinnable)
+    elif args.command == "serve":
+        serve_stage(args.stage, args.host, args.port, args.unix, args.max_sessions, args.idle_timeout, not args.no_cache)
+    elif args.command == "generate":
+        if args.moves and not args.carve:
+            parser.error("--moves needs --carve")
+        try:
+            generate_stage(args.output, args.rows, args.cols, args.moves, seed=args.seed, forest=args.forest, cluster=args.cluster,
+                rocks=args.rocks, water=args.water, mushrooms=args.mushrooms, axes=args.axes, flamethrowers=args.flamethrowers,
+                carve=args.carve, wander=args.wander)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == "bench":
+        try:
+            if args.bench_command == "run":
+                bench_stages(args.output, args.size, args.repeat, args.seed, args.only, args.baseline, args.threshold)
+            else:
+                compare_benchmarks(args.baseline, args.results, args.threshold)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.command == "connect":
+        connect(args.host, args.port, args.unix)
+    elif args.solve:
+        solve_stage(args.stage, args.max_nodes, args.time_limit, args.workers, not args.no_cache)
+    elif args.jsonl:
+        bot_stage(args.stage, not args.no_cache)
+    elif args.replay_batch:
+        replay_stage(args.stage, args.replay_batch, args.output, not args.no_cache)
+    else:
+        main_menu(args.stage, args.move, args.output, not args.no_cache)
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
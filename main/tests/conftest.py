@@ -0,0 +1,37 @@
+import pytest
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file
+from main.Replay import replay_batch
+from main.Engine import play_moves as play # gives the moves to a stage one at a time, like the -m option does
+
+def find_stage_file(name):
+    '''Returns the path of the shipped stage file name, whether the tests are run from main/tests, main or the repository.'''
+    for directory in ("../stage-files/", "./stage-files/", "./main/stage-files/"):
+        try:
+            read_stage_file(directory + name)
+            return directory + name
+        except FileNotFoundError as e:
+            pass
+
+def make_stage(rows):
+    '''Returns a Stage of rows (a list of str), with the Player where its L is.'''
+    grid = [list(row) for row in rows]
+    y = next(y for y, row in enumerate(grid) if "L" in row)
+    return Stage(grid, Player(grid[y].index("L"), y))
+
+@pytest.fixture(scope="session")
+def replayed():
+    '''
+    Returns a function replay(stage_file, move_sequences) that plays every sequence on a fresh stage from stage_file, as the
+    test_stage fixtures do, with Replay.replay_batch. It returns the list of Stage.snapshot states along with the steps and
+    scratch_steps counts, and the results are kept so that every test of the same sequences can share them.
+    '''
+    results = {}
+    def replay(stage_file, move_sequences):
+        key = (stage_file, tuple(move_sequences))
+        if key not in results:
+            player, grid = read_stage_file(stage_file)
+            results[key] = replay_batch(Stage(grid, Player(*player)), move_sequences)
+        return results[key]
+    return replay
@@ -0,0 +1,56 @@
+import pytest, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Status import Status
+from main.Processing import read_stage_file
+from main.Analyzer import Analyzer
+from main.Runner import run_pair
+from main.tests import test_stage1, test_stage3
+from main.tests.conftest import find_stage_file, make_stage
+
+# To add a test case, add a new (stage rows, moves, expected status after the moves) here
+test_cases = [(["L.+"], "", Status.ONGOING), (["LT+"], "", Status.UNWINNABLE), (["LTx+"], "", Status.UNWINNABLE),
+    (["xLT+"], "", Status.ONGOING), (["xLT+"], "AP", Status.ONGOING), (["xLT+"], "APDDD", Status.WIN),
+    (["L~+"], "", Status.UNWINNABLE), (["L~+", "R.."], "", Status.UNWINNABLE), (["L~+", ".R.", "..."], "", Status.ONGOING),
+    ([".R.", "L~+"], "", Status.ONGOING), ([".R.", "L~+"], "WD", Status.UNWINNABLE), (["R+", "LR"], "", Status.UNWINNABLE),
+    (["L+"], "D", Status.WIN), (["L~+"], "D", Status.LOSE)]
+
+@pytest.mark.parametrize("rows, moves, status", test_cases)
+def test_status(rows, moves, status):
+    stage = make_stage(rows)
+    analyzer = Analyzer(stage)
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+        analyzer.update()
+    assert analyzer.status() == status
+    assert Analyzer(stage).status() == status
+
+# To add a test case, add a new (stage rows, expected dead rocks) here
+dead_rock_cases = [(["RR.", "..L", "R.R"], {0, 1, 6, 8}), (["RR.", "R.L"], {0, 1, 3}), (["R.R", "RLR"], {0, 2, 3, 5}),
+    (["...", "RRR", "L.."], set()), (["TR.", ".L."], {1}), (["TR.", "xL."], set()), (["TRR.", "...L"], {1, 2})]
+
+@pytest.mark.parametrize("rows, dead", dead_rock_cases)
+def test_dead_rocks(rows, dead):
+    assert Analyzer(make_stage(rows)).dead_rocks == dead
+
+@pytest.mark.parametrize("history_limit", [1_000_000, 3])
+@pytest.mark.parametrize("name, move_sequences", [("stage1.txt", test_stage1.test_cases), ("stage3.txt", test_stage3.test_cases)])
+def test_updates_match_fresh_analyses(name, move_sequences, history_limit):
+    player, grid = read_stage_file(find_stage_file(name))
+    for moves in move_sequences:
+        stage = Stage(copy.deepcopy(grid), Player(*player), history_limit)
+        analyzer = Analyzer(stage)
+        for move in moves + "UUR!":
+            stage.move(move, stage.pl.y, stage.pl.x)
+            assert analyzer.update() == Analyzer(stage).status()
+            assert analyzer.unreachable == Analyzer(stage).unreachable
+
+# To add a test case, add a new (moves, expected outcome) here; the stage has one axe for the two trees on either side of the Player
+runner_cases = [("DDD", "NOT CLEAR"), ("DPDD", "CLEAR"), ("DPAADDD", "UNWINNABLE"), ("DPAAU", "NOT CLEAR"), ("DPAA!DPDD", "CLEAR")]
+
+@pytest.mark.parametrize("moves, outcome", runner_cases)
+def test_runs_stop_when_unwinnable(tmp_path, moves, outcome):
+    (tmp_path / "stage.txt").write_text("1 5\nTLxT+")
+    (tmp_path / "moves.txt").write_text(moves)
+    result = run_pair((str(tmp_path / "stage.txt"), str(tmp_path / "moves.txt")), stop_unwinnable=True)
+    assert result["outcome"] == outcome
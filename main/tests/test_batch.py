@@ -0,0 +1,43 @@
+import pytest, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Status import Status
+from main.Processing import read_stage_file
+from main.tests.test_stage1 import test_cases as stage1_cases
+
+np = pytest.importorskip("numpy")
+from main.Batch import BatchStage
+
+try:
+    player, path = read_stage_file("../stage-files/stage1.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage1.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage1.txt")
+
+# every lane plays its own calls to move; a lane of "" plays nothing in that call
+# To add a test case, add a new list of calls (one list of move sequences per call) here
+test_cases = [[stage1_cases], [["DPDDDWWW", "", "SSs!DD", "DDxDD"], ["WAS", "DD", "U", "R"], ["", "p", "R", "DD"]],
+    [["DDDD"] * 3, ["SSSS", "U", "!"], ["AAAA", "R", "SSSS"]]]
+
+@pytest.mark.parametrize("calls", test_cases)
+def test_batch_matches_stage(calls):
+    stages = [Stage(copy.deepcopy(path), Player(*player)) for _ in calls[0]]
+    batch = BatchStage(Stage(copy.deepcopy(path), Player(*player)), len(stages))
+    for move_sequences in calls:
+        batch.move(move_sequences)
+        for stage, move_sequence in zip(stages, move_sequences):
+            stage.move(move_sequence, stage.pl.y, stage.pl.x)
+        for lane, stage in enumerate(stages):
+            assert batch.grid(lane) == stage.grid
+            assert batch.snapshot(lane)[:9] == stage.snapshot()[:9]
+        assert batch.statuses() == [stage.outcome for stage in stages]
+
+def test_scorch_in_one_lane_only():
+    grid = [list("*LT"), list(".TT"), list("+..")]
+    batch = BatchStage(Stage(grid, Player(1, 0)), 2)
+    batch.move(["APDD", "APSS"])
+    assert batch.grid(0) == [list("..L"), list("..."), list("+..")]
+    assert batch.grid(1) == [list("..T"), list(".TT"), list("L..")]
+    assert batch.statuses() == [Status.ONGOING, Status.WIN]
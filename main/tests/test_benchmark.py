@@ -0,0 +1,48 @@
+import pytest, copy
+from main.Benchmark import BENCHMARKS, run_benchmarks, write_results, read_results, compare_results, format_comparison
+
+@pytest.fixture(scope="module")
+def results():
+    return run_benchmarks(size=30, repeat=1)
+
+def test_every_benchmark_is_measured(results, tmp_path):
+    assert list(results["benchmarks"]) == [name for name, function, stage in BENCHMARKS]
+    for name, result in results["benchmarks"].items():
+        assert result["seconds"] > 0 and result["operations"] > 0, name
+    write_results(results, tmp_path / "bench.json")
+    assert read_results(tmp_path / "bench.json") == results
+
+def test_benchmarks_do_something(results):
+    # the moves of the huge stage stop before clearing it, so that the ones measured are all played
+    assert results["benchmarks"]["move/huge"]["operations"] > 30
+    assert results["benchmarks"]["scorch/forest"]["operations"] == 30 * 30 - 3
+
+def test_only():
+    assert list(run_benchmarks(size=30, repeat=1, only="parse/")["benchmarks"]) == ["parse/small", "parse/huge"]
+
+# To add a test case, add a new (baseline seconds, current seconds, threshold, expected regressed) here
+test_cases = [(1.0, 1.0, 0.25, False), (1.0, 1.2, 0.25, False), (1.0, 1.3, 0.25, True), (1.0, 0.5, 0.25, False), (1.0, 1.05, 0, True)]
+
+@pytest.mark.parametrize("before, after, threshold, regressed", test_cases)
+def test_compare(results, before, after, threshold, regressed):
+    baseline, current = copy.deepcopy(results), copy.deepcopy(results)
+    baseline["benchmarks"]["move/walk"]["seconds"] = before
+    current["benchmarks"]["move/walk"]["seconds"] = after
+    rows = {row[0]: row for row in compare_results(baseline, current, threshold)}
+    assert rows["move/walk"][4] == regressed
+    assert rows["move/walk"][3] == pytest.approx(after / before - 1)
+    assert ("REGRESSION" in format_comparison(rows.values(), threshold)) == regressed
+
+def test_compare_per_operation(results):
+    baseline, current = copy.deepcopy(results), copy.deepcopy(results)
+    current["benchmarks"]["move/walk"]["seconds"] *= 2
+    current["benchmarks"]["move/walk"]["operations"] *= 2
+    del current["benchmarks"]["parse/small"]
+    rows = {row[0]: row for row in compare_results(baseline, current)}
+    assert "parse/small" not in rows and not rows["move/walk"][4]
+
+def test_compare_needs_the_same_stages(results):
+    other = copy.deepcopy(results)
+    other["size"] = 31
+    with pytest.raises(ValueError):
+        compare_results(results, other)
@@ -0,0 +1,57 @@
+import pytest, copy, io, json
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file
+from main.Bot import BotSession, serve_jsonl
+
+try:
+    player, path = read_stage_file("../stage-files/stage1.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage1.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage1.txt")
+
+# To add a test case, add a new list of lines of moves here; each line is sent as one move command
+test_cases = [["D", "P", "DAAD", "DwDDSSpS"], ["SaDswWpSDassSDDDd", "!", "dP"], ["WWwwwwwWDDdSSSsssWWWsPWW"], ["DDdPsdaWWDSDDPDd", "U", "R"]]
+
+def run(commands, chunk_size=7):
+    '''Sends commands to serve_jsonl in chunks of chunk_size bytes (splitting lines) and returns the responses.'''
+    data = "".join(json.dumps(command) + "\n" for command in commands).encode()
+    out = io.BytesIO()
+    serve_jsonl(Stage(copy.deepcopy(path), Player(*player)), (data[i:i + chunk_size] for i in range(0, len(data), chunk_size)), out)
+    return [json.loads(line) for line in out.getvalue().decode().splitlines()]
+
+@pytest.mark.parametrize("lines", test_cases)
+def test_moves_play_like_the_game(lines):
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    cells = bytearray(stage.cells)
+    responses = run([{"cmd": "move", "moves": line, "diff": True, "id": n} for n, line in enumerate(lines)] + [{"cmd": "state", "grid": True}])
+    for n, (line, response) in enumerate(zip(lines, responses)):
+        stage.move(line, stage.pl.y, stage.pl.x)
+        for i, tile in response["changes"]:
+            cells[i] = ord(tile)
+        assert response["id"] == n and "cells" not in response
+        assert (response["x"], response["y"], response["inv"], response["outcome"], response["mushrooms"]) == \
+            (stage.pl.x, stage.pl.y, stage.pl.inv, stage.outcome.name, stage.mushrooms)
+        assert cells == stage.cells
+    assert responses[-1]["cells"] == stage.cells.decode() and "changes" not in responses[-1]
+
+def test_snapshot_restore_and_reset():
+    responses = run([{"cmd": "snapshot"}, {"cmd": "move", "moves": "SSAAW"}, {"cmd": "snapshot"}, {"cmd": "move", "moves": "D"},
+        {"cmd": "restore", "snapshot": 2, "grid": True}, {"cmd": "move", "moves": "SSAAW", "grid": True}, {"cmd": "reset", "grid": True},
+        {"cmd": "restore", "snapshot": 1, "grid": True, "forget": True}, {"cmd": "restore", "snapshot": 1}])
+    start = run([{"cmd": "state", "grid": True}])[0]
+    moved = run([{"cmd": "move", "moves": "SSAAW", "grid": True}])[0]
+    assert responses[0]["snapshot"] == 1 and responses[2]["snapshot"] == 2
+    assert responses[4]["cells"] == moved["cells"] and (responses[4]["x"], responses[4]["y"]) == (moved["x"], moved["y"])
+    assert responses[6] == start and responses[7] == start
+    assert "error" in responses[8]
+
+def test_bad_commands():
+    session = BotSession(Stage(copy.deepcopy(path), Player(*player)))
+    assert "error" in json.loads(session.handle_line(b"not json"))
+    assert "error" in json.loads(session.handle_line(b"[1, 2]"))
+    assert json.loads(session.handle_line(b'{"cmd": "jump", "id": "a"}'))["id"] == "a"
+    assert "error" in session.handle({"cmd": "move", "moves": 3})
+    assert "error" in session.handle({"cmd": "restore", "snapshot": [1]})
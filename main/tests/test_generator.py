@@ -0,0 +1,65 @@
+import pytest
+from main.Stage import TREE, label_trees
+from main.Processing import read_stage_file, load_stage
+from main.Status import Status
+from main.Generator import StageGenerator, chance_table
+
+# To add a test case, add a new (rows, cols, seed, generator options) here
+test_cases = [(1, 1, 0, {"mushrooms": 0}), (1, 30, 1, {}), (30, 1, 2, {}), (25, 40, 3, {"forest": 0.4, "cluster": 0.8}),
+    (40, 25, 4, {"rocks": 0.3, "water": 0.3, "mushrooms": 50, "axes": 5, "flamethrowers": 5}), (20, 20, 5, {"forest": 0, "rocks": 0}),
+    (30, 30, 6, {"forest": 0.3, "rocks": 0.1, "water": 0.1, "carve": True, "mushrooms": 20, "axes": 2, "wander": 6}),
+    (50, 3, 7, {"forest": 0.9, "cluster": 0.9, "carve": True}), (2, 60, 8, {"rocks": 0, "water": 1, "carve": True, "mushrooms": 2})]
+
+@pytest.mark.parametrize("rows, cols, seed, options", test_cases)
+def test_generated_stage(rows, cols, seed, options, tmp_path):
+    generator = StageGenerator(rows, cols, seed, **options)
+    generator.write(tmp_path / "stage.txt")
+    (x, y), grid = read_stage_file(tmp_path / "stage.txt")
+    tiles = "".join("".join(row) for row in grid)
+    assert len(grid) == rows and all(len(row) == cols for row in grid)
+    assert set(tiles) <= set(".LT+R~x*") and tiles.count("L") == 1 and (y, x) == generator.player
+    assert tiles.count("+") == options.get("mushrooms", 10)
+    assert tiles.count("x") == options.get("axes", 0) and tiles.count("*") == options.get("flamethrowers", 0)
+
+    StageGenerator(rows, cols, seed, **options).write(tmp_path / "again.txt")
+    assert (tmp_path / "again.txt").read_bytes() == (tmp_path / "stage.txt").read_bytes()
+
+    if options.get("carve"):
+        generator.write_moves(tmp_path / "moves.txt")
+        stage = load_stage(tmp_path / "stage.txt", False)
+        stage.move((tmp_path / "moves.txt").read_text().strip(), stage.pl.y, stage.pl.x)
+        assert stage.outcome == Status.WIN
+
+def test_seeds_differ(tmp_path):
+    StageGenerator(20, 20, 1).write(tmp_path / "one.txt")
+    StageGenerator(20, 20, 2).write(tmp_path / "two.txt")
+    assert (tmp_path / "one.txt").read_bytes() != (tmp_path / "two.txt").read_bytes()
+
+def test_densities():
+    generator = StageGenerator(200, 200, 9, forest=0.1, cluster=0, rocks=0.25, water=0.5, mushrooms=0)
+    tiles = b"".join(generator.iter_rows())
+    assert abs(tiles.count(b"T") / len(tiles) - 0.1) < 0.01
+    assert abs(tiles.count(b"R") / len(tiles) - 0.9 * 0.25) < 0.01
+    assert abs(tiles.count(b"~") / len(tiles) - 0.9 * 0.5) < 0.01
+
+def test_cluster_grows_groups_of_trees():
+    sizes = []
+    for cluster in (0, 0.5, 0.8):
+        tiles = b"".join(StageGenerator(100, 100, 10, forest=0.02, cluster=cluster, mushrooms=0).iter_rows())
+        labels, count = label_trees(tiles, 100)
+        sizes.append(tiles.count(TREE) / count)
+    assert sizes == sorted(sizes) and sizes[0] < 2 < sizes[-1]
+
+def test_chance_table():
+    assert chance_table([(1, 0.25), (2, 0.5)], 3) == bytes([1]) * 64 + bytes([2]) * 128 + bytes([3]) * 64
+    assert chance_table([(1, 1), (2, 1)]) == bytes([1]) * 256
+
+@pytest.mark.parametrize("rows, cols, options", [(0, 5, {}), (5, 5, {"cluster": 1}), (5, 5, {"forest": -0.1}),
+    (5, 5, {"rocks": 0.6, "water": 0.6}), (2, 2, {"mushrooms": 4}), (3, 3, {"carve": True, "wander": 0, "mushrooms": 3})])
+def test_invalid_options(rows, cols, options):
+    with pytest.raises(ValueError):
+        StageGenerator(rows, cols, 0, **options)
+
+def test_moves_need_carve():
+    with pytest.raises(ValueError):
+        list(StageGenerator(5, 5, 0).moves())
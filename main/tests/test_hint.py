@@ -0,0 +1,43 @@
+import pytest, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file
+from main.Hint import DistanceField
+from main.tests import test_stage1, test_stage3
+from main.tests.conftest import find_stage_file, make_stage
+
+# To add a test case, add a new (stage rows, moves played before asking, expected (move, distance)) here
+test_cases = [(["L.+"], "", ("D", 2)), (["+.L"], "", ("A", 2)), (["L", ".", "+"], "", ("S", 2)), (["+T", "..", "L."], "", ("W", 2)),
+    (["LT+"], "", (None, None)), (["LR.", "T.+"], "", (None, None)), (["LR.", "T.+"], "D", ("S", 2)), (["+..L.+"], "D", ("D", 1)),
+    (["+..L.+"], "DD", ("A", 5)), (["xLT+"], "APDD", ("D", 1)), (["xLT+", "...."], "APD", ("S", 4)), (["L~+", "..."], "", ("S", 4))]
+
+@pytest.mark.parametrize("rows, moves, expected", test_cases)
+def test_hint(rows, moves, expected):
+    stage = make_stage(rows)
+    field = DistanceField(stage)
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+        field.update()
+    assert field.hint() == expected
+    assert DistanceField(stage).hint() == expected
+
+@pytest.mark.parametrize("history_limit", [1_000_000, 3])
+@pytest.mark.parametrize("name, move_sequences", [("stage1.txt", test_stage1.test_cases), ("stage3.txt", test_stage3.test_cases)])
+def test_updates_match_rebuilds(name, move_sequences, history_limit):
+    player, grid = read_stage_file(find_stage_file(name))
+    for moves in move_sequences:
+        stage = Stage(copy.deepcopy(grid), Player(*player), history_limit)
+        field = DistanceField(stage)
+        for move in moves + "UUR!":
+            stage.move(move, stage.pl.y, stage.pl.x)
+            field.update()
+            assert field.dist == DistanceField(stage).dist
+
+def test_update_after_restore():
+    stage = make_stage(["L..", ".R.", "..+"])
+    state = stage.snapshot()
+    field = DistanceField(stage)
+    stage.move("SD", stage.pl.y, stage.pl.x)
+    assert field.hint() == DistanceField(stage).hint()
+    stage.restore(state)
+    assert field.hint() == ("S", 4)
@@ -0,0 +1,96 @@
+import pytest, copy
+from main.Stage import Stage, ChangeTracker
+from main.Player import Player
+from main.Processing import read_stage_file
+from main.tests.conftest import play
+
+try:
+    player, path = read_stage_file("../stage-files/stage1.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage1.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage1.txt")
+
+# pairs of moves to play before and after the undone moves; the undone moves are played then undone with U
+# To add a test case, add a new triple of moves here
+test_cases = [("dP", "DD", "s"), ("dPDA", "ADDwDDS", "Sp"), ("", "DWDdSaAPww", "W"), ("DWDDSPSSWWWA", "SSASDDDD", "A")]
+
+@pytest.mark.parametrize("before, undone, after", test_cases)
+def test_undo_redo(before, undone, after):
+    expected, stage = Stage(copy.deepcopy(path), Player(*player)), Stage(copy.deepcopy(path), Player(*player))
+    play(expected, before)
+    play(stage, before)
+    stage.move(undone, stage.pl.y, stage.pl.x)
+    stage.move("U", stage.pl.y, stage.pl.x)
+    assert stage.snapshot()[:9] == expected.snapshot()[:9]
+
+    play(expected, after)
+    play(stage, after)
+    assert stage.grid == expected.grid and stage.pl.inv == expected.pl.inv
+
+    # redoing right after an undo puts the moves back
+    replayed = Stage(copy.deepcopy(path), Player(*player))
+    replayed.move(before + "U" + "R", replayed.pl.y, replayed.pl.x)
+    play(expected := Stage(copy.deepcopy(path), Player(*player)), before)
+    assert replayed.grid == expected.grid
+
+def test_undo_each_move():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    play(stage, "dPDDSSWW")
+    play(stage, "UUUUU")
+    expected = Stage(copy.deepcopy(path), Player(*player))
+    play(expected, "dPD")
+    assert stage.grid == expected.grid and stage.pl.inv == expected.pl.inv
+
+    # a new move drops the moves that could be redone
+    play(stage, "SR")
+    play(expected, "S")
+    assert stage.grid == expected.grid
+
+@pytest.mark.parametrize("history_limit", [1_000_000, 3])
+def test_reset_rewinds_history(history_limit):
+    stage = Stage(copy.deepcopy(path), Player(*player), history_limit)
+    key = stage.state_key()
+    play(stage, "DWDDSPSSWWWASSASDDD")
+    stage.move("Dd!", stage.pl.y, stage.pl.x)
+    assert stage.grid == path
+    assert stage.state_key() == key
+    assert stage.history_size <= history_limit
+
+# To add a test case, add a new (lines of moves, history limit, whether the tracker can tell which cells were written) here
+tracker_cases = [(["DWDDS", "U", "U", "R"], 1_000_000, True), (["DWDDS", "DdS!"], 1_000_000, True), (["DWDDS", "U", "SS"], 1_000_000, True),
+    (["DWDDS", "UUU", "R"], 1_000_000, True), (["D", "W", "D", "D"], 8, True), (["DWDDSPSSWWW"], 3, False)]
+
+@pytest.mark.parametrize("lines, history_limit, known", tracker_cases)
+def test_change_tracker(lines, history_limit, known):
+    stage = Stage(copy.deepcopy(path), Player(*player), history_limit)
+    tracker, cells = ChangeTracker(stage), bytearray(stage.cells)
+    for line in lines:
+        stage.move(line, stage.pl.y, stage.pl.x)
+    written = tracker.written_cells()
+    assert (written is not None) == known
+    if known:
+        for i in written:
+            cells[i] = stage.cells[i]
+        assert cells == stage.cells
+
+def test_change_tracker_after_restore():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    state = stage.snapshot()
+    tracker = ChangeTracker(stage)
+    play(stage, "DWD")
+    stage.restore(state)
+    assert tracker.written_cells() is None
+    tracker.mark()
+    play(stage, "DWD")
+    assert tracker.written_cells() is not None
+
+def test_fresh():
+    stage = Stage(copy.deepcopy(path), Player(*player), 50)
+    play(stage, "DWDDSPSS")
+    fresh = stage.fresh()
+    assert fresh.grid == path and (fresh.pl.x, fresh.pl.y, fresh.pl.inv) == tuple(player) + ("",)
+    assert fresh.history_limit == 50 and fresh.original_tree_groups is stage.original_tree_groups
+    play(fresh, "DWDDSPSS")
+    assert fresh.snapshot() == stage.snapshot()
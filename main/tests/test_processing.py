@@ -0,0 +1,66 @@
+import pytest
+from main.Stage import Stage, label_trees
+from main.Player import Player
+from main.Processing import read_stage_file, read_stage_cells, iter_stage_grids, load_stage, CACHE_DIRECTORY
+
+def test_cells_match_grid(tmp_path):
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_text("3 4\nT..T\n.L+~\nTRxT")
+    player, rows, cols, cells = read_stage_cells(stage_file)
+    assert (player, rows, cols, cells) == ((1, 1), 3, 4, b"T..T.L+~TRxT")
+    assert read_stage_file(stage_file) == ((1, 1), [list("T..T"), list(".L+~"), list("TRxT")])
+
+    stage = Stage.from_cells(rows, cols, cells, Player(*player))
+    assert stage.grid == Stage(read_stage_file(stage_file)[1], Player(*player)).grid
+
+@pytest.mark.parametrize("contents", [b"1 3\r\nL.+\r\n", b"1 3\r\nL.+", b"2 3\r\nL.+\r\n.~T", b"2 3\nL.+\r\n.~T\n"])
+def test_windows_line_breaks(tmp_path, contents):
+    # stage files saved on Windows end their lines with \r\n, which is not part of the rows
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_bytes(contents)
+    rows = contents.replace(b"\r", b"").decode().split("\n")[1:3]
+    rows = [row for row in rows if row]
+    assert read_stage_cells(stage_file) == ((0, 0), len(rows), 3, "".join(rows).encode())
+    assert read_stage_file(stage_file) == ((0, 0), [list(row) for row in rows])
+    assert load_stage(stage_file, False).grid == [list(row) for row in rows]
+
+def test_windows_line_breaks_between_grids(tmp_path):
+    stage_file = tmp_path / "tests.txt"
+    stage_file.write_bytes(b"L.\r\n..\r\n\r\n.L\r\n..")
+    assert list(iter_stage_grids(stage_file)) == [[list("L."), list("..")], [list(".L"), list("..")]]
+
+@pytest.mark.parametrize("contents", ["3 4\nT..T\n.L+~", "3 4\nT..T\n.L+~\nTRxT\nTTTT", "3 4\nT..T\n.L+\nTRxTT", "2 2\n..\n.."])
+def test_bad_stage_file(tmp_path, contents):
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_text(contents)
+    with pytest.raises(ValueError):
+        read_stage_cells(stage_file)
+
+def test_grids_are_read_lazily(tmp_path):
+    stage_file = tmp_path / "tests.txt"
+    stage_file.write_text("L.\n..\n\n.L\n..\n\n..\nL.")
+    grids = iter_stage_grids(stage_file)
+    assert next(grids) == [list("L."), list("..")]
+    assert list(grids) == [[list(".L"), list("..")], [list(".."), list("L.")]]
+    assert read_stage_file(stage_file, True) == [[list("L."), list("..")], [list(".L"), list("..")], [list(".."), list("L.")]]
+
+def test_cached_stage_matches_parsed_stage(tmp_path):
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_text("3 4\nTT.T\n.L+~\nTRxR")
+    parsed = load_stage(stage_file, False)
+    for _ in range(2): # the first call writes the cache entry, the second one reads it
+        stage = load_stage(stage_file)
+        assert stage.snapshot() == parsed.snapshot()
+        assert list(stage.original_rocks) == list(parsed.original_rocks)
+        assert list(stage.original_tree_labels) == list(label_trees(parsed.original_cells, parsed.cols)[0])
+        assert stage.original_tree_groups == parsed.original_tree_groups
+        assert stage.win_condition == parsed.win_condition
+    assert len(list((tmp_path / CACHE_DIRECTORY).iterdir())) == 1
+
+def test_edited_stage_file_is_parsed_again(tmp_path):
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_text("1 3\nL+.")
+    assert load_stage(stage_file).grid == [list("L+.")]
+    stage_file.write_text("1 3\n.L+")
+    assert load_stage(stage_file).grid == [list(".L+")]
+    assert len(list((tmp_path / CACHE_DIRECTORY).iterdir())) == 1
@@ -0,0 +1,56 @@
+import pytest, io
+from main.Stage import Stage
+from main.Renderer import Renderer
+from main.Profiler import Instrumentation, INSTRUMENTED, profiled
+from main.tests.conftest import make_stage, play
+
+# To add a test case, add a new (stage rows, moves played one at a time, expected events) here
+test_cases = [(["LR.+"], "D", {"rock pushes": 1}), (["LR~+"], "DD", {"pavings": 1}), (["LT+"], "D", {"blocked moves": 1}),
+    (["LxT+."], "DPDD", {"item pickups": 1, "chops": 1, "mushroom pickups": 1}),
+    (["L*T+", "..TT"], "DPD", {"item pickups": 1, "burns": 1}), (["L~+"], "D", {"drownings": 1}),
+    (["L.+", "..."], "DD", {"mushroom pickups": 1}), (["L.+", "..."], "P", {})]
+
+@pytest.mark.parametrize("rows, moves, events", test_cases)
+def test_events(rows, moves, events):
+    stage, plain = make_stage(rows), make_stage(rows)
+    with Instrumentation() as instrumentation:
+        play(stage, moves)
+    play(plain, moves)
+    assert dict(instrumentation.events) == events
+    assert (stage.cells, stage.pl.inv, stage.outcome, stage.mushrooms) == (plain.cells, plain.pl.inv, plain.outcome, plain.mushrooms)
+
+def test_calls_and_times():
+    stage = make_stage(["L....", ".R...", "....+"])
+    with Instrumentation() as instrumentation:
+        play(stage, "DDSS!")
+        stage.move("DDDD", stage.pl.y, stage.pl.x)
+        Renderer(out=io.StringIO()).draw(stage, True)
+    assert instrumentation.calls["Stage.move"] == 6 and instrumentation.calls["Stage.reset"] == 1
+    assert instrumentation.calls["Stage.fast_forward"] == 1 and instrumentation.calls["Renderer.draw"] == 1
+    assert all(instrumentation.seconds[name] > 0 for name in instrumentation.calls)
+    summary = instrumentation.summary()
+    assert "Stage.move" in summary and "rock pushes" not in summary
+
+def test_disabling_puts_the_methods_back():
+    originals = [(cls, name, cls.__dict__[name]) for cls, names in INSTRUMENTED for name in names]
+    instrumentation = Instrumentation()
+    with instrumentation:
+        assert instrumentation.enabled and Stage.__dict__["move"] is not originals[0][2]
+        instrumentation.enable() # enabling twice does not wrap the wrappers
+    assert not instrumentation.enabled
+    assert all(cls.__dict__[name] is method for cls, name, method in originals)
+    play(make_stage(["L.+"]), "DD")
+    assert instrumentation.calls["Stage.move"] == 0
+
+@pytest.mark.parametrize("mode", ["summary", "cprofile"])
+def test_profiled(mode, tmp_path):
+    out = io.StringIO()
+    with profiled(mode, tmp_path / "run.prof", out):
+        play(make_stage(["L.+"]), "DD")
+    assert "move" in out.getvalue()
+    assert (tmp_path / "run.prof").exists() == (mode == "cprofile")
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        with profiled("perf"):
+            pass
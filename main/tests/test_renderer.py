@@ -0,0 +1,79 @@
+import pytest, io, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Renderer import Renderer
+from main.Processing import read_stage_file
+
+try:
+    player, path = read_stage_file("../stage-files/stage1.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage1.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage1.txt")
+
+@pytest.fixture(autouse=True)
+def terminal_size(monkeypatch):
+    # a terminal big enough for the whole stage unless a test says otherwise
+    monkeypatch.setenv("LINES", "100")
+    monkeypatch.setenv("COLUMNS", "200")
+
+def draw(renderer, stage, first=False):
+    renderer.out = io.StringIO()
+    renderer.draw(stage, first)
+    return renderer.out.getvalue()
+
+def test_first_frame_is_full():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    frame = draw(Renderer(), stage, True)
+    assert frame.count("\n") == stage.rows
+    assert frame.split("\n")[0] == "".join(Stage.EMOJIS[tile] for tile in path[0])
+
+def test_only_changed_cells_are_written():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    renderer = Renderer()
+    draw(renderer, stage, True)
+
+    stage.move("d", stage.pl.y, stage.pl.x) # moves onto the axe
+    frame = draw(renderer, stage)
+    assert frame.count("\033[") == 6 # move up, 2 cells, move down to the line after the grid, clear the menu
+    assert Stage.EMOJIS["L"] in frame and "\n" not in frame
+
+    # pushing a rock changes 3 cells
+    stage = Stage([list("L.R.."), list("..~..")], Player(0, 0))
+    draw(renderer, stage, True)
+    stage.move("dd", stage.pl.y, stage.pl.x)
+    frame = draw(renderer, stage)
+    assert frame.count(Stage.EMOJIS["R"]) == 1 and frame.count(Stage.EMOJIS["L"]) == 1 and frame.count(Stage.EMOJIS["."]) == 1
+
+def test_invalidate_redraws_everything():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    renderer = Renderer()
+    draw(renderer, stage, True)
+    stage.move("!", stage.pl.y, stage.pl.x)
+    renderer.invalidate()
+    assert draw(renderer, stage).count("\n") == stage.rows
+
+def test_viewport_follows_player(monkeypatch):
+    monkeypatch.setenv("LINES", "22") # 5 lines for the grid, with 16 for the menu and 1 for the input
+    monkeypatch.setenv("COLUMNS", "10")
+    stage = Stage([list("." * 20) for _ in range(19)] + [list("." * 19 + "+")], Player(0, 0))
+    renderer = Renderer()
+    frame = draw(renderer, stage, True)
+    assert frame.count("\n") == 5 and frame.split("\n")[0] == Stage.EMOJIS["L"] + Stage.EMOJIS["."] * 4
+
+    # moving inside the viewport only redraws the 2 cells that changed
+    for move in "dd":
+        stage.move(move, stage.pl.y, stage.pl.x)
+    assert "\n" not in draw(renderer, stage) and renderer.left == 0
+
+    # moving close to the edge scrolls the viewport so that it is centred on the Player
+    for move in "dd":
+        stage.move(move, stage.pl.y, stage.pl.x)
+    frame = draw(renderer, stage)
+    assert renderer.left == 2 and frame.count("\n") == 5
+    assert frame.split("\n")[0].endswith(Stage.EMOJIS["."] * 2 + Stage.EMOJIS["L"] + Stage.EMOJIS["."] * 2)
+
+    # stepping back does not scroll right away
+    stage.move("a", stage.pl.y, stage.pl.x)
+    assert "\n" not in draw(renderer, stage) and renderer.left == 2
@@ -0,0 +1,42 @@
+import pytest, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file
+from main.Replay import replay_batch, build_trie
+from main.tests import test_stage1, test_stage3
+from main.tests.conftest import find_stage_file
+
+# every stage file along with the move sequences its tests play
+stage_tests = [("stage1.txt", test_stage1.test_cases), ("stage3.txt", test_stage3.test_cases)]
+
+@pytest.mark.parametrize("name, move_sequences", stage_tests)
+def test_replay_matches_fresh_stages(replayed, name, move_sequences):
+    stage_file = find_stage_file(name)
+    states, steps, scratch_steps = replayed(stage_file, move_sequences)
+    player, path = read_stage_file(stage_file)
+    for moves, state in zip(move_sequences, states):
+        stage = Stage(copy.deepcopy(path), Player(*player))
+        stage.move(moves, stage.pl.y, stage.pl.x)
+        assert state[:9] == stage.snapshot()[:9]
+    assert steps <= scratch_steps
+
+def test_shared_prefixes_are_played_once():
+    grid = [list("L.+"), list("...")]
+    # "DS" is shared by the first two sequences and "DD" wins the game, so "DDSA" stops after two moves
+    states, steps, scratch_steps = replay_batch(Stage(grid, Player(0, 0)), ["DSA", "DSD", "DDSA", ""])
+    assert (steps, scratch_steps) == (5, 8)
+    assert [state[4].name for state in states] == ["ONGOING", "ONGOING", "WIN", "ONGOING"]
+
+def test_moves_given_one_at_a_time():
+    grid = [list("L.+"), list("...")]
+    stage = Stage(grid, Player(0, 0))
+    states, steps, scratch_steps = replay_batch(stage, ["DEDP", "DDWA", "DEx"], False)
+    assert [state[4].name for state in states] == ["WIN", "WIN", "ONGOING"]
+    assert (steps, scratch_steps) == (5, 8)
+    assert stage.snapshot() == Stage(grid, Player(0, 0)).snapshot()
+
+def test_trie_stops_at_invalid_moves():
+    children, ends = build_trie(["ddZW", "DD", "dS"])
+    assert list(children) == ["D"]
+    assert sorted(children["D"][0]) == ["D", "S"]
+    assert children["D"][0]["D"][1] == [0, 1]
@@ -0,0 +1,41 @@
+import pytest, csv, json
+from main.Stage import Stage
+from main.Player import Player
+from main.Status import Status
+from main.Processing import read_stage_file
+from main.Runner import run_corpus, write_results, grid_hash
+
+# To add a test case, add a new pair of (stage file contents, move file contents) here
+stages = {"a.txt": "2 3\nL+.\n.+.", "b.txt": "1 3\nL~+"}
+moves = {"clear.txt": "DSA", "lose.txt": "D\nD", "empty.txt": ""}
+
+def expected_result(stage_file, moves_file):
+    player, grid = read_stage_file(stage_file)
+    stage = Stage(grid, Player(*player))
+    for move in moves_file.read_text():
+        stage.move(move, stage.pl.y, stage.pl.x)
+    return "CLEAR" if stage.outcome == Status.WIN else "NOT CLEAR", stage.mushrooms, grid_hash(stage)
+
+@pytest.fixture
+def corpus(tmp_path):
+    for directory, files in (("stages", stages), ("moves", moves)):
+        (tmp_path / directory).mkdir()
+        for name, contents in files.items():
+            (tmp_path / directory / name).write_text(contents)
+    return tmp_path
+
+@pytest.mark.parametrize("output", ["results.csv", "results.jsonl"])
+def test_every_pair_is_played(corpus, output):
+    output_file = str(corpus / output)
+    assert write_results(run_corpus(corpus / "stages", corpus / "moves", workers=2, chunk_size=2), output_file) == 6
+    with open(output_file) as file:
+        results = list(csv.DictReader(file)) if output.endswith(".csv") else [json.loads(line) for line in file]
+    assert [(result["stage"], result["moves"]) for result in results] == [(stage, move) for stage in sorted(stages) for move in sorted(moves)]
+    for result in results:
+        outcome, mushrooms, digest = expected_result(corpus / "stages" / result["stage"], corpus / "moves" / result["moves"])
+        assert (result["outcome"], int(result["mushrooms"]), result["grid_hash"]) == (outcome, mushrooms, digest)
+
+def test_bad_stage_file_is_reported(corpus):
+    (corpus / "stages" / "c.txt").write_text("2 2\n..\n..")
+    results = [result for result in run_corpus(corpus / "stages", corpus / "moves", workers=1) if result["stage"] == "c.txt"]
+    assert [result["outcome"] for result in results] == ["ERROR"] * 3
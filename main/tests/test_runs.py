@@ -0,0 +1,40 @@
+import pytest, copy
+from main.Stage import Stage, compile_moves
+from main.Player import Player
+from main.Status import Status
+from main.Processing import read_stage_file
+
+try:
+    player, path = read_stage_file("../stage-files/stage3.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage3.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage3.txt")
+
+def play_stepwise(stage, move_sequence):
+    # plays move_sequence one move at a time with Stage.step, as Stage.move did before runs were fast-forwarded
+    y, x, last_move = stage.pl.y, stage.pl.x, ""
+    for move in move_sequence:
+        move = move.upper()
+        if move not in Stage.VALID_MOVES or stage.outcome != Status.ONGOING:
+            break
+        last_move = move
+        y, x = stage.step(move, y, x)
+    stage.end_move(last_move, y, x)
+
+def test_compile_moves():
+    assert compile_moves("ddDSSpwZDD") == (("D", 3), ("S", 2), ("P", 1), ("W", 1))
+
+# To add a test case, add a new string of moves here
+test_cases = ["DDDDDDDDDDDD", "SSSSSSSSSSSSSSSSSSSSSSSSSSSSSSAAAAAAAAAAAAAAAAAAAAA", "AAAAWWWWWWWWWWWWWWWWWWWWDDDDDDDDDDDDDDDDDD",
+    "DdDSSSSSSPAAAAAAAAAAWWWWW", "ssssssssddddddddddddddddwwwwwwwwwwwwwaaaaaaaaaaaaaaaaaaaaaaaa", "DDDDDDDDDDDDDDDDDDDDD!SSSSSSSSS",
+    "DDDDDDDDDDDDDUUUUUUSSSSSSRRRR", "WWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWW"]
+
+@pytest.mark.parametrize("moves", test_cases)
+def test_runs_match_stepwise_play(moves):
+    stage, expected = Stage(copy.deepcopy(path), Player(*player)), Stage(copy.deepcopy(path), Player(*player))
+    for _ in range(2):
+        stage.move(moves, stage.pl.y, stage.pl.x)
+        play_stepwise(expected, moves)
+        assert stage.snapshot()[:9] == expected.snapshot()[:9]
@@ -0,0 +1,119 @@
+import pytest, asyncio, json, socket
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file, load_stage
+from main.Server import GameServer, MAX_LINE
+from main.Engine import ChangeTracker, changed_cells, tracked_changes
+from main.Client import Connection, RemoteStage
+
+try:
+    stage_file = "../stage-files/stage1.txt"
+    player, path = read_stage_file(stage_file)
+except FileNotFoundError as e:
+    try:
+        stage_file = "./stage-files/stage1.txt"
+        player, path = read_stage_file(stage_file)
+    except FileNotFoundError as f:
+        stage_file = "./main/stage-files/stage1.txt"
+        player, path = read_stage_file(stage_file)
+
+# To add a test case, add a new list of lines of moves here; every list is played by a client of its own, all at the same time
+test_cases = [["D", "P", "DAAD", "DwDDSSpS"], ["SaDswWpSDassSDDDd", "!", "dP"], ["WWwwwwwWDDdSSSsssWWWsPWW"], ["DDdPsdaWWDSDDPDd", "U", "R"]]
+
+@pytest.mark.parametrize("history_limit", [1_000_000, 3])
+@pytest.mark.parametrize("lines", test_cases)
+def test_tracked_changes(lines, history_limit):
+    stage = Stage(path, Player(*player), history_limit)
+    tracker, known = ChangeTracker(stage), bytearray(stage.cells)
+    for line in lines:
+        before = bytes(stage.cells)
+        stage.move(line, stage.pl.y, stage.pl.x)
+        assert tracked_changes(tracker, known) == changed_cells(before, stage.cells, stage.cols)
+        assert known == stage.cells
+
+def run_server(test, max_sessions=16, idle_timeout=30, path=None):
+    '''Starts a GameServer for stage_file on localhost (or on the Unix socket at path), runs test(address) and stops the server.'''
+    async def main():
+        server = GameServer(load_stage(stage_file, False), max_sessions, idle_timeout)
+        async with await server.start(path=path) as listening:
+            address = {"path": path} if path else {"port": listening.sockets[0].getsockname()[1]}
+            return await test(server, address)
+    return asyncio.run(main())
+
+def play_lines(address, lines):
+    with Connection(timeout=10, **address) as connection:
+        stage = RemoteStage(connection.receive())
+        for line in lines:
+            stage.update(connection.play(line))
+        return stage
+
+def play_lines_locally(lines):
+    stage = Stage(path, Player(*player))
+    for line in lines:
+        stage.move(line, stage.pl.y, stage.pl.x)
+    return stage
+
+def test_sessions_play_like_stages():
+    async def test(server, address):
+        return await asyncio.gather(*(asyncio.to_thread(play_lines, address, lines) for lines in test_cases))
+    for lines, remote in zip(test_cases, run_server(test)):
+        stage = play_lines_locally(lines)
+        assert (remote.cells, remote.pl.x, remote.pl.y, remote.pl.inv, remote.outcome, remote.mushrooms) == \
+            (stage.cells, stage.pl.x, stage.pl.y, stage.pl.inv, stage.outcome.name, stage.mushrooms)
+
+def test_unix_socket(tmp_path):
+    async def test(server, address):
+        return await asyncio.to_thread(play_lines, address, test_cases[0])
+    assert run_server(test, path=str(tmp_path / "game.sock")).cells == play_lines_locally(test_cases[0]).cells
+
+def test_max_sessions():
+    async def test(server, address):
+        reader, writer = await asyncio.open_connection("127.0.0.1", address["port"])
+        json.loads(await reader.readline()) # the first session is open once its stage has been sent
+        other_reader, other_writer = await asyncio.open_connection("127.0.0.1", address["port"])
+        refused = json.loads(await other_reader.readline())
+        assert await other_reader.readline() == b""
+        writer.close()
+        other_writer.close()
+        return refused, len(server.sessions)
+    refused, sessions = run_server(test, max_sessions=1)
+    assert "error" in refused and sessions == 1
+
+def test_idle_sessions_are_closed():
+    async def test(server, address):
+        reader, writer = await asyncio.open_connection("127.0.0.1", address["port"])
+        await reader.readline()
+        evicted = json.loads(await reader.readline())
+        assert await reader.readline() == b""
+        await asyncio.sleep(0)
+        writer.close()
+        return evicted, len(server.sessions)
+    evicted, sessions = run_server(test, idle_timeout=0.2)
+    assert "error" in evicted and sessions == 0
+
+def test_clients_that_never_read_are_closed():
+    async def test(server, address):
+        client = socket.socket()
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        client.connect(("127.0.0.1", address["port"]))
+        client.setblocking(False)
+        reader, writer = await asyncio.open_connection(sock=client)
+        writer.write(b"DA\n" * 100_000) # many more answers than the sockets can hold, none of which is read
+        for _ in range(100):
+            await asyncio.sleep(0.1)
+            if not server.sessions:
+                break
+        writer.transport.abort()
+        return len(server.sessions)
+    assert run_server(test, idle_timeout=0.5) == 0
+
+def test_long_lines_are_refused():
+    async def test(server, address):
+        reader, writer = await asyncio.open_connection("127.0.0.1", address["port"])
+        await reader.readline()
+        writer.write(b"D" * (MAX_LINE + 1) + b"\n")
+        await writer.drain()
+        refused = json.loads(await reader.readline())
+        writer.close()
+        return refused
+    assert "error" in run_server(test)
@@ -0,0 +1,71 @@
+import pytest, itertools, time
+from main.Stage import Stage
+from main.Player import Player
+from main.Status import Status
+from main.Processing import read_stage_file
+from main.Solver import solve, solve_parallel
+
+def load(stage_name):
+    try:
+        return read_stage_file("../stage-files/" + stage_name)
+    except FileNotFoundError as e:
+        try:
+            return read_stage_file("./stage-files/" + stage_name)
+        except FileNotFoundError as f:
+            return read_stage_file("./main/stage-files/" + stage_name)
+
+# pairs of stage files and the length of their shortest winning move sequence
+# To add a test case, add the stage file and its par score here
+test_cases = [("stage-file-default.txt", 3), ("stage1.txt", 23)]
+
+@pytest.mark.parametrize("stage_name, par", test_cases)
+def test_solve(stage_name, par):
+    player, path = load(stage_name)
+    stage = Stage(path, Player(*player))
+    moves, expanded = solve(stage)
+
+    assert moves is not None and len(moves) == par
+    assert stage.grid == path # the stage is left untouched
+
+    # the sequence should also clear the stage when given one move at a time, like the -m option does
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+    assert stage.outcome == Status.WIN
+
+def test_unsolvable():
+    stage = Stage([list("L.T"), list("TTT"), list("..+")], Player(0, 0))
+    assert solve(stage)[0] is None
+
+def test_node_limit():
+    player, path = load("stage2.txt")
+    moves, expanded = solve(Stage(path, Player(*player)), max_nodes=100)
+    assert moves is None and expanded == 100
+
+@pytest.mark.parametrize("stage_name, par", test_cases)
+def test_solve_parallel(stage_name, par):
+    player, path = load(stage_name)
+    stage = Stage(path, Player(*player))
+    moves, expanded, stats = solve_parallel(stage, workers=2)
+
+    assert moves is not None and len(moves) == par
+    assert sum(nodes for nodes, seconds in stats.values()) == expanded
+
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+    assert stage.outcome == Status.WIN
+
+class TickingClock:
+    '''Stands in for the time module in Solver: every call to monotonic is one second later than the one before.'''
+    def __init__(self):
+        self.ticks = itertools.count()
+        self.perf_counter = time.perf_counter
+
+    def monotonic(self):
+        return next(self.ticks)
+
+def test_solve_parallel_time_limit(monkeypatch):
+    monkeypatch.setattr("main.Solver.time", TickingClock())
+    player, path = load("stage3.txt")
+    moves, expanded, stats = solve_parallel(Stage(path, Player(*player)), workers=2, time_limit=100, chunk_size=1)
+    # the deadline is checked after every chunk, so the search stops within a few levels instead of after 100 of them
+    assert moves is None and expanded < 1000
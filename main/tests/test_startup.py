@@ -0,0 +1,31 @@
+import pytest, os, subprocess, sys
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# modules that only the interactive game or the other commands need; a headless start must not import them
+UI_MODULES = ("termcolor", "Renderer", "Solver", "Replay", "Runner", "Batch", "Server", "Client", "Bot", "Analyzer", "Hint", "Generator", "Benchmark", "Profiler", "cProfile", "asyncio", "numpy", "concurrent.futures")
+
+def imported_modules(module):
+    '''
+    Imports module in a new interpreter with -X importtime and returns the names of every module it imported. How long that takes is
+    measured by the startup/ benchmarks of Benchmark, not here.
+    '''
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=MAIN_DIR, capture_output=True,
+        text=True, check=True)
+    lines = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+    return {name.strip() for _, cumulative, name in lines if cumulative.strip().isdigit()} # skips the header line
+
+# To add a test case, add the name of a module that must start headless here
+test_cases = ["shroom_raider", "Engine"]
+
+@pytest.mark.parametrize("module", test_cases)
+def test_headless_start(module):
+    modules = imported_modules(module)
+    assert module in modules
+    assert not [name for name in modules if name.split(".")[0] in UI_MODULES or name in UI_MODULES]
+
+def test_engine_plays_like_the_game(tmp_path):
+    from main.Engine import play
+    stage_file = tmp_path / "stage.txt"
+    stage_file.write_text("1 3\nL++")
+    assert play(stage_file, "D").grid == [list(".L+")]
+    assert play(stage_file, "DD").outcome.name == "WIN"
@@ -0,0 +1,47 @@
+import pytest, copy
+from main.Stage import Stage
+from main.Player import Player
+from main.Processing import read_stage_file
+
+try:
+    player, path = read_stage_file("../stage-files/stage3.txt")
+except FileNotFoundError as e:
+    try:
+        player, path = read_stage_file("./stage-files/stage3.txt")
+    except FileNotFoundError as f:
+        player, path = read_stage_file("./main/stage-files/stage3.txt")
+
+# moves that push rocks, pave water, chop and burn trees and pick up mushrooms and items
+test_cases = ["ddDsSaspWWdwwaaSAAsSdWDdDdAWWAsAsdDdDAAWWaAaSaSdddDdDd",
+    "AssDSPDDPDDdWSsaSaaAwAasSWWdWWAwwwAASWDddDddWwpDddSSpSS",
+    "wdAAasAAaaDSSaaPWSDddDSPWaAAawWwWpPpPpPADDDdSSDWDaWWdDDdSsSAWdWWaaaASSDDDDddDd",
+    "DdDSsAWWWwwwwwWwWDWaaAAaAAadDDddDdDPSSDPdDPSddDDWDDPAAsaAWDdDddDDDWsaAWWdaSsSsSPpPPPp"]
+
+@pytest.mark.parametrize("moves", test_cases)
+def test_incremental_hash(moves):
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    stage.state_key()
+    for move in moves:
+        stage.move(move, stage.pl.y, stage.pl.x)
+        assert stage.zobrist == stage.compute_zobrist()
+
+def test_same_state_same_key():
+    first, second = Stage([list("L.."), list("..."), list("..+")], Player(0, 0)), Stage([list("L.."), list("..."), list("..+")], Player(0, 0))
+    second.state_key()
+    for move in "ds":
+        first.move(move, first.pl.y, first.pl.x)
+    for move in "sd":
+        second.move(move, second.pl.y, second.pl.x)
+    assert first.grid == second.grid
+    assert first.state_key() == second.state_key()
+
+    second.move("a", second.pl.y, second.pl.x)
+    assert first.state_key() != second.state_key()
+
+def test_reset_key():
+    stage = Stage(copy.deepcopy(path), Player(*player))
+    key = stage.state_key()
+    stage.move("ddDsSasp", stage.pl.y, stage.pl.x)
+    assert stage.state_key() != key
+    stage.move("!", stage.pl.y, stage.pl.x)
+    assert stage.state_key() == key
@@ -0,0 +1,31 @@
+import pytest
+from main.Stage import Stage
+from main.Player import Player
+from main.tests.conftest import play
+
+# chopping the tree at (2, 2) splits its group into the top (5 trees), the right (2 trees) and the bottom (4 trees)
+grid = [list("TTT.."), list("T.T+."), list("xLTTT"), list("*.T.."), list("TTT..")]
+
+def test_group_sizes_do_not_change_the_stage():
+    stage = Stage(grid, Player(1, 2))
+    cells = bytes(stage.cells)
+    assert stage.tree_group_size(0, 0) == 12
+    assert stage.tree_group_size(1, 1) == 0
+    assert sorted(stage.tree_group(2, 4)) == sorted(stage.tree_group(4, 0))
+    assert bytes(stage.cells) == cells
+
+# To add a test case, add a new triple of (moves, tree, expected size of its group) here
+test_cases = [("", (2, 4), 12), ("APDD", (0, 0), 5), ("APDD", (2, 4), 2), ("APDD", (4, 0), 4), ("APDD", (2, 2), 0),
+    ("APDDU", (4, 0), 12), ("APDDUR", (0, 2), 5)]
+
+@pytest.mark.parametrize("moves, tree, size", test_cases)
+def test_chopping_splits_groups(moves, tree, size):
+    stage = Stage(grid, Player(1, 2))
+    play(stage, moves)
+    assert stage.tree_group_size(*tree) == size
+
+def test_scorch_burns_only_the_connected_piece():
+    stage = Stage(grid, Player(1, 2))
+    play(stage, "APDDASAPS") # chop the tree at (2, 2), then burn the bottom group from (4, 0)
+    assert stage.grid == [list("TTT.."), list("T.T+."), list("...TT"), list("....."), list("L....")]
+    assert stage.tree_group_size(0, 0) == 5
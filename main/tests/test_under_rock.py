@@ -0,0 +1,37 @@
+import pytest
+from main.Stage import Stage, EMPTY, PAVED, PLAYER
+from main.Player import Player
+from main.tests.conftest import play
+
+# To add a test case, add a new triple of (moves, expected row, expected tile under the rock) here
+test_cases = [("", "LR.-.+", EMPTY), ("D", ".LR-.+", EMPTY), ("DD", "..LR.+", PAVED), ("DDD", "...LR+", EMPTY), ("DDDA", "..L-R+", EMPTY),
+    ("DDU", ".LR-.+", EMPTY)]
+
+@pytest.mark.parametrize("moves, row, under", test_cases)
+def test_rocks_keep_their_tile(moves, row, under):
+    stage = Stage([list("LR.-.+")], Player(0, 0))
+    play(stage, moves)
+    assert stage.grid == [list(row)]
+    rock = row.index("R")
+    assert stage.under_rock[rock] == under
+    assert [i for i, tile in enumerate(stage.under_rock) if tile] == [rock] and stage.rocks == {rock}
+
+def test_rock_pushed_over_the_player_tile():
+    # within a single call the Player's tile stays where the call started, and a rock pushed onto it keeps it as the tile under it
+    stage = Stage([list("..."), list("LR."), list("+..")], Player(0, 1))
+    stage.move("WDDSA", stage.pl.y, stage.pl.x)
+    assert stage.grid == [list("..."), list("RL."), list("+..")]
+    assert stage.under_rock[3] == PLAYER
+
+
+def test_snapshot_and_restore_keep_the_rocks():
+    stage = Stage([list("LR.~"), list(".R.."), list("...+")], Player(0, 0))
+    start = stage.snapshot()
+    play(stage, "DD")
+    pushed = stage.snapshot()
+    assert stage.rocks == {5} and stage.grid[0] == list("..L-")
+    stage.restore(start)
+    assert stage.rocks == {1, 5} and [i for i, tile in enumerate(stage.under_rock) if tile] == [1, 5]
+    stage.restore(pushed)
+    assert stage.rocks == {5} and [i for i, tile in enumerate(stage.under_rock) if tile] == [5]
+    assert stage.snapshot() == pushed